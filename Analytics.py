@@ -1,111 +1,127 @@
 import datetime
+import weakref
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from User import HabitList
+from HabitSet import HabitSet
+from Streak import Streak
+from Period import count_missed, period_indexes, week_index, month_index, week_start, month_start
+
+# The periods the completions can be counted by (see get_counts_per_period), index function and start date of an index
+COUNT_PERIODS = {'weekly' : (week_index, week_start), 'monthly' : (month_index, month_start)}
+
+def calculate_days(frequency, start_day, day_numbers, today) :
+    """Returns the current streak, longest streak and missed periods of a habit from its columns (see the habit-set-class) :
+    the frequency, the start day number and the sorted completion day numbers, the same numbers as get_current_streak,
+    get_longest_streak and get_missed_habits return for a habit-object."""
+    periods = period_indexes(frequency, day_numbers)
+    missed = count_missed(frequency, start_day, periods, today.toordinal())
+    if not day_numbers :
+        return 0, 0, missed
+    streak = Streak.from_day_numbers(frequency, day_numbers) if periods is None else Streak.from_periods(frequency, periods)
+    return streak.get_current(today), streak.get_longest(), missed
 
 class Analytics :
     def __init__(self, habits) :
         """Constructor to initialize the habits."""
         self.habits = habits
+        # The results of every habit, saved until the habit changes or the day changes,
+        # a "weak" dictionary, so a removed habit isn't kept in memory by this dictionary
+        self._results = weakref.WeakKeyDictionary()
+        # the results of a habit-set, which holds no habit-objects to save them for, see _get_set_results
+        self._set_results = None
+
+    def _get_results(self, habit) :
+        """Returns the current streak, longest streak and missed periods of a habit.
+        They're only calculated if the habit changed since the last time, or if it's a new day."""
+        key = self._result_key(habit)
+        saved = self._results.get(habit)
+        if saved is not None and saved[0] == key :
+            return saved[1]
+        results = {
+            'current_streak' : self.get_current_streak(habit),
+            'longest_streak' : self.get_longest_streak(habit),
+            'missed' : self.get_missed_habits(habit)
+        }
+        self._save_results(habit, key, results)
+        return results
+
+    def _save_results(self, habit, key, results) :
+        """Saving the results of a habit for its result key, with an empty dictionary for its newest dates
+        (see _get_newest)."""
+        self._results[habit] = (key, results, {})
+
+    def _get_newest(self, habit, recent) :
+        """Returns the newest "recent" completion dates of a habit (all of them without "recent"), newest first.
+        They're saved with the results of the habit, so a habit whose history was unloaded again
+        (see the history-cache-class) isn't loaded from the database for every view, only after it changed."""
+        self._get_results(habit)
+        newest = self._results[habit][2]
+        if recent not in newest :
+            newest[recent] = habit.completed_dates.newest(recent)
+        return list(newest[recent])
+
+    def _result_key(self, habit) :
+        """Returns what the saved results of a habit depend on, they're outdated when it changes."""
+        return habit.get_version(), habit.frequency, habit.start_date, datetime.date.today()
+
+    def _get_set_results(self) :
+        """Returns the current streak, longest streak and missed periods of every habit of a habit-set, in its order,
+        calculated straight from its columns, without creating habit-objects.
+        They're only calculated again after habits were added to the set, or if it's a new day."""
+        key = (len(self.habits), datetime.date.today())
+        if self._set_results is None or self._set_results[0] != key :
+            self._set_results = (key, [{'current_streak' : current, 'longest_streak' : longest, 'missed' : missed}
+                                       for current, longest, missed in self._calculate_set(key[1])])
+        return self._set_results[1]
+
+    def _calculate_set(self, today) :
+        """Calculating the results of every habit of a habit-set, as (current streak, longest streak, missed)."""
+        return [calculate_days(frequency, start_day, day_numbers, today)
+                for name, frequency, start_day, day_numbers in self.habits.rows()]
+
+    def invalidate(self, habit_names = None) :
+        """Forgetting the saved results of the habits with these names, or of all habits,
+        used e.g. when the database changes (see Database.add_listener)."""
+        self._set_results = None
+        if habit_names is None :
+            self._results.clear()
+            return
+        habit_names = set(habit_names)
+        for habit in [habit for habit in self._results if habit.name in habit_names] :
+            del self._results[habit]
 
     def list_current_habits(self) :
         """This method returns all currently tracked habits."""
+        if isinstance(self.habits, HabitSet) :
+            return list(self.habits.names)
         return [habit.name for habit in self.habits]
 
     def list_habits_by_periodicity(self, frequency) :
-        """This method returns habits with a given frequency, using list comprehension."""
+        """This method returns habits with a given frequency,
+        using the frequency index of a user's habit list, or list comprehension for any other list."""
+        if isinstance(self.habits, HabitList) :
+            return [habit.name for habit in self.habits.get_by_frequency(frequency)]
+        if isinstance(self.habits, HabitSet) :
+            return self.habits.names_by_frequency(frequency)
         return [habit.name for habit in self.habits if habit.frequency == frequency]
 
     def get_current_streak(self, habit) :
-        """This method calculates the current streak for a habit,
-        daily, weekly and monthly streaks have to be calculated separately."""
+        """This method returns the current streak for a habit,
+        the streak only counts if the habit has been completed in the current day/week/month.
+        The streak itself is kept up to date by the habit, every time it's marked as done (see the streak-class),
+        so this doesn't have to go through all completed dates again."""
         if not habit.completed_dates : # in case there are no completed dates
             return 0
-
-        completed_dates = sorted(habit.completed_dates) # creates and ascending list of the completed dates
-        today = datetime.date.today() # today's date
-        current_streak = 0
-
-
-        # Gets the current streak for a daily habit using a for-loop, starting with the most recent entry -> "reversed",
-        # and adding 1 every time there is a completed date for the day before, "breaks" if there isn't
-        if habit.frequency == 'daily' :
-            for date in reversed(completed_dates) :
-                if (today - date).days == current_streak :
-                    current_streak += 1
-                else :
-                    break
-
-        # calculation for weekly habits
-        elif habit.frequency == 'weekly' :
-            current_week = today - datetime.timedelta(days = today.weekday()) # gets the start of the current week -> Monday
-            for date in reversed(completed_dates) :
-                week_start = date - datetime.timedelta(days = date.weekday()) # gets the start of the week for each completed date
-                if week_start == current_week :
-                    current_streak = 1 # adds 1 if there is a completed date for this week
-                elif week_start == current_week - datetime.timedelta(weeks = current_streak) :
-                    current_streak += 1 # adds 1 each time there is a(nother) completed date in the week before
-                else :
-                    break
-
-        # This calculates the method for monthly habits, but on a 30-day-basis
-        # To use calendar months, you'd have to include the "relativedelta"-package
-        elif habit.frequency == 'monthly' :
-            current_month = today.replace(day = 1) # get the beginning of the month
-            for date in reversed(completed_dates) :
-                month_start = date.replace(day = 1)
-                if month_start == current_month :
-                    current_streak = 1
-                    # Can't use "months" the same way "weeks" were used above, so have to multiply by 30 to jump 30 days
-                elif month_start == current_month - datetime.timedelta(days = 30 * current_streak) :
-                    current_streak += 1
-                else :
-                    break
-
-        return current_streak
+        return habit.get_streak().get_current(datetime.date.today())
 
     def get_longest_streak(self, habit) :
-        """This method calculates the longest streak for a habit and again,
-        daily, weekly and monthly habits have to be treated separately.
-        Unlike in the method above, it starts with the oldest entries, since it has to go through all dates anyway.
-        Within the for-loops, it checks whether there is a completed date
-        for the day/week/month after the currently looked at date"""
+        """This method returns the longest streak for a habit,
+        again kept up to date by the habit itself, instead of going through all completed dates.
+        Several completions within the same day/week/month count as 1 period of the streak."""
         if not habit.completed_dates :
             return 0
-
-        completed_dates = sorted(habit.completed_dates)
-        longest_streak = 1 # if there are no completed dates, it returns 0, that's why 1 is assigned
-        ongoing_streak = 1 # assigned 1, because the tested object is the first "completed" date of a possible new streak
-
-        for i in range(1, len(completed_dates)) :
-            if habit.frequency == "daily" :
-                if (completed_dates[i] - completed_dates[i - 1]).days == 1 :
-                    ongoing_streak += 1
-                else :
-                    # Using the max-function to compare the newest calculated streak,
-                    # to the, so far, longest calculated streak, and replacing the value of the longest streak
-                    # with the ongoing streak if the 2nd one is bigger.
-                    longest_streak = max(longest_streak, ongoing_streak)
-                    ongoing_streak = 1
-
-            elif habit.frequency == "weekly" :
-                # Calculating the start of the week for the ongoing and previous week, for easier comparison
-                week_start_ongoing = completed_dates[i] - datetime.timedelta(completed_dates[i].weekday())
-                week_start_previous = completed_dates[i - 1] - datetime.timedelta(completed_dates[i - 1].weekday())
-                if (week_start_ongoing - week_start_previous).days == 7 :
-                    ongoing_streak += 1
-                else :
-                    longest_streak = max(longest_streak, ongoing_streak)
-                    ongoing_streak = 1
-
-            elif habit.frequency == "monthly" :
-                # Calculating the start of the month for the ongoing and previous month, month = 30 days
-                month_start_ongoing = completed_dates[i].replace(day = 1)
-                month_start_previous = completed_dates[i - 1].replace(day = 1)
-                if (month_start_ongoing - month_start_previous).days == 30 :
-                    ongoing_streak += 1
-                else :
-                    longest_streak = max(longest_streak, ongoing_streak)
-                    ongoing_streak = 1
-
-        return max(longest_streak,ongoing_streak)
+        return habit.get_streak().get_longest()
 
     def get_longest_streak_for_all(self) :
         """Calculate and return the longest streak across all habits, and the habit itself,
@@ -114,9 +130,18 @@ class Analytics :
         longest_streak = 0
         longest_streak_habit = None
 
+        if isinstance(self.habits, HabitSet) :
+            # only the habit with the longest streak becomes a habit-object
+            results = self._get_set_results()
+            best = max(range(len(results)), key = lambda index : results[index]['longest_streak'], default = None)
+            if best is None or results[best]['longest_streak'] == 0 :
+                return None, 0
+            return self.habits[best], results[best]['longest_streak']
+
         for habit in self.habits:
             # This is where the above-method is being used, getting the longest streak of one/each habit in the habit-list.
-            current_longest_streak = self.get_longest_streak(habit)
+            # The results are saved, so unchanged habits don't have to be calculated again
+            current_longest_streak = self._get_results(habit)['longest_streak']
             if current_longest_streak > longest_streak :
                 longest_streak = current_longest_streak
                 longest_streak_habit = habit
@@ -125,96 +150,120 @@ class Analytics :
     def longest_streak_for_specific_habit(self, habit_name) :
         """Return the longest streak for a specific habit,
         accessible through the CLI under "View statistics"""
-        for habit in self.habits:
-            if habit.name == habit_name:
-                return self.get_longest_streak(habit)
-        return None  # Added return for non-existent habits
+        if isinstance(self.habits, (HabitList, HabitSet)) :
+            habit = self.habits.get(habit_name)
+        else :
+            habit = next((habit for habit in self.habits if habit.name == habit_name), None)
+        if habit is None :
+            return None  # Added return for non-existent habits
+        return self.get_longest_streak(habit)
 
     def get_missed_habits(self, habit) :
         """Returns the number of missed habits based on frequency,
         taking into account, that the current day/week/month should NOT
         be shown or calculated as a missed day yet, but should be calculated
-        as a completed date, if marked as done"""
-        today = datetime.date.today()
-        missed = 0
-        if habit.frequency == 'daily' :
-            # gets the number of dates since the start, "+ 1" to include today's date.
-            # Could theoretically add it within the else-case :
-            # "days + 1 if today in habit.completed_dates else days"
-            days = (today - habit.start_date).days + 1
-            if days == 0 :
-                missed = 0
-            else :
-                counted_days = days if today in habit.completed_dates else days - 1
-                # a safeguard, in case there would e.g. suddenly be
-                # more completed_dates than counted_days, don't want a negative result
-                missed = max(0, counted_days - len(habit.completed_dates))
-        elif habit.frequency == 'weekly' :
-            weeks = (today - habit.start_date).days // 7
-            # includes the current partial week
-            total_weeks = weeks + 1
-            if total_weeks == 0 :
-                missed = 0
-            else :
-                # creates a set of week-"indices", so if completed 3 times in 3 weeks - {0, 1, 2}
-                completed_weeks = {
-                    (date - habit.start_date).days // 7 for date in habit.completed_dates
-                }
-                # checks whether the current week (or rather it's index) is in the completed_weeks-list or not
-                counted_weeks = total_weeks if weeks in completed_weeks else total_weeks - 1
-                missed = max(0, counted_weeks - len(completed_weeks))
-        elif habit.frequency == 'monthly' :
-            months = (today - habit.start_date).days // 30
-            total_months = months + 1
-            if total_months == 0 :
-                missed = 0
-            else :
-                completed_months = {
-                    (date - habit.start_date).days // 30 for date in habit.completed_dates
-                }
-                counted_months = total_months if months in completed_months else total_months - 1
-                missed = max(0, counted_months - len(completed_months))
-        return missed
+        as a completed date, if marked as done.
+        Weeks are calendar weeks (Monday to Sunday) and months are calendar months, counted from the
+        period of the start date (see the period-module), the completed periods are saved by the habit."""
+        return count_missed(habit.frequency, habit.start_date.toordinal(), habit.get_periods(),
+                            datetime.date.today().toordinal())
 
     def get_all_missed_habits(self) :
         """Return the total number of missed habits/dates across all existing habits"""
+        if isinstance(self.habits, HabitSet) :
+            return sum(results['missed'] for results in self._get_set_results())
         total_missed = 0
         for habit in self.habits :
-            total_missed += self.get_missed_habits(habit)
+            total_missed += self._get_results(habit)['missed']
         return total_missed
 
-    def get_statistics(self) :
+    def get_statistics(self, recent = None) :
         """Returns statistics for all habits, like the current streak, longest streak,
-        whether it's been missed recently and the completed_dates"""
+        whether it's been missed recently and the completed_dates (newest first),
+        only the newest "recent" completed dates if "recent" is given, e.g. the ones a view shows"""
         stats = {}
         try :
+            if isinstance(self.habits, HabitSet) :
+                for index, (name, results) in enumerate(zip(self.habits.names, self._get_set_results())) :
+                    stats[name] = dict(results)
+                    stats[name]['completed_dates'] = self.habits.newest(index, recent)
+                return stats
             for habit in self.habits :
-                # Converting potential strings into datetime.date objects.
-                completed_dates = []
-                for date in habit.completed_dates :
-                    # checking whether the "date" is a string, converting to datetime object in case it is
-                    if isinstance(date, str) :
-                        try :
-                            date_object = datetime.datetime.strptime(date, '%Y-%m-%d').date()
-                            completed_dates.append(date_object)
-                        except ValueError :
-                            print(f"Warning : Invalid date format found : {date}")
-                            continue
-                    # Checking whether it's already a datetime.date object, in this case it'll get directly appended
-                    elif isinstance(date, datetime.date) :
-                        completed_dates.append(date)
-
-                # Update a habit's completed dates with converted dates
-                habit.completed_dates = completed_dates
-                # calling the methods needed to get the desired statistics/numbers for each line,
-                # dates are sorted in reverse, to show the newest date first, not the oldest
-                stats[habit.name] = {
-                    'current_streak' : self.get_current_streak(habit),
-                    'longest_streak': self.get_longest_streak(habit),
-                    'missed' : self.get_missed_habits(habit),
-                    'completed_dates' : sorted(habit.completed_dates, reverse = True)
-                }
+                # the saved results of each habit (see _get_results), in a new dictionary per call
+                stats[habit.name] = dict(self._get_results(habit))
+                stats[habit.name]['completed_dates'] = self._get_newest(habit, recent)
             return stats
         except Exception as e :
             print(f"Error generating statistics : {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def _days_between(self, habit, since, until) :
+        """Returns the sorted completion day numbers of a habit from "since" until "until" (day numbers, both included),
+        found with 2 binary searches in the sorted completions, without going through the others."""
+        day_numbers = habit.completed_dates.day_numbers
+        return day_numbers[bisect_left(day_numbers, since):bisect_right(day_numbers, until)]
+
+    def _rolling_rates(self, habit, window, since, until) :
+        """Returns the share of days with a completion in the "window" days up to each day from "since" until "until"
+        (day numbers), using the prefix sums of the completed days, so every day takes the same time,
+        whatever the size of the window."""
+        if window < 1 :
+            raise ValueError(f"the window has to be at least 1 day, not {window}")
+        if since > until :
+            return []
+        first = since - window + 1
+        completed = bytearray(until - first + 1) # 1 for every day with a completion, the completions are distinct days
+        for day in self._days_between(habit, first, until) :
+            completed[day - first] = 1
+        # prefix[i] is the number of completed days before the i-th day
+        prefix = [0, *accumulate(completed)]
+        return [(prefix[i + window] - prefix[i]) / window for i in range(until - since + 1)]
+
+    def get_rolling_rates(self, habit, window = 7, since = None, until = None) :
+        """Returns the completion rate of a habit for every day from "since" (default : the start date) until "until"
+        (default : today), as a list of (date, rate), the rate being the share of the last "window" days
+        (e.g. 7, 30 or 365) with a completion."""
+        until = until if until else datetime.date.today()
+        since = since if since else min(habit.start_date, until)
+        rates = self._rolling_rates(habit, window, since.toordinal(), until.toordinal())
+        return [(since + datetime.timedelta(days = offset), rate) for offset, rate in enumerate(rates)]
+
+    def get_counts_per_period(self, habit, period = "weekly", since = None, until = None) :
+        """Returns the number of completions of a habit in every calendar week ("weekly") or month ("monthly")
+        from "since" (default : the start date) until "until" (default : today), including the ones without
+        completions, as a list of (first day of the week/month, count), in a single pass over the completions.
+        The first week/month only counts the completions from "since" on."""
+        index, start = COUNT_PERIODS[period]
+        until = until if until else datetime.date.today()
+        since = since if since else min(habit.start_date, until)
+        first = index(since.toordinal())
+        counts = [0] * max(0, index(until.toordinal()) - first + 1)
+        for day in self._days_between(habit, since.toordinal(), until.toordinal()) :
+            counts[index(day) - first] += 1
+        return [(start(first + offset), count) for offset, count in enumerate(counts)]
+
+    def get_weekday_histogram(self, habit, since = None, until = None) :
+        """Returns the number of completions of a habit on every weekday, Monday first,
+        from "since" until "until" (default : all completions)."""
+        histogram = [0] * 7
+        for day in self._days_between(habit, since.toordinal() if since else 0,
+                                      until.toordinal() if until else datetime.date.max.toordinal()) :
+            histogram[(day - 1) % 7] += 1 # day number 1 was a Monday
+        return histogram
+
+    def get_time_series(self, window = 7, since = None, until = None) :
+        """Returns the time series of all habits at once, e.g. for a dashboard, for every day from "since"
+        (default : a year ago) until "until" (default : today) : the dates once, and for every habit the rolling rates
+        (in the order of the dates), the weekly and monthly counts and the weekday histogram."""
+        until = until if until else datetime.date.today()
+        since = since if since else until - datetime.timedelta(days = 364)
+        series = {'dates' : [since + datetime.timedelta(days = offset) for offset in range((until - since).days + 1)],
+                  'habits' : {}}
+        for habit in self.habits :
+            series['habits'][habit.name] = {
+                'rates' : self._rolling_rates(habit, window, since.toordinal(), until.toordinal()),
+                'weekly' : self.get_counts_per_period(habit, "weekly", since, until),
+                'monthly' : self.get_counts_per_period(habit, "monthly", since, until),
+                'weekdays' : self.get_weekday_histogram(habit, since, until)
+            }
+        return series
@@ -0,0 +1,119 @@
+"""These classes make the database and the analytics usable from asyncio, e.g. for a small service with many users :
+    async with AsyncDatabase(Database("habits.db")) as db :
+        habits = await db.load_habit()
+        await db.save_completion(habits[0], datetime.date.today())
+The blocking sqlite3 calls run on a bounded pool of worker threads, so the event loop never waits for the database.
+Every worker thread reads through its own connection (see the connection-pool class), writes go through the writer.
+Identical reads that are running at the same time are only sent to the database once, every caller gets the result,
+which means callers that get the same habits shouldn't change them. A write makes the next reads ask the database again.
+An object is meant to be used from one event loop."""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class AsyncDatabase :
+    def __init__(self, db, max_workers = 4) :
+        """Constructor, "max_workers" is the number of worker threads, and so the number of read connections."""
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix = "habit-tracker-db")
+        self._in_flight = {} # the reads that are running : (method, arguments) -> future
+
+    async def __aenter__(self) :
+        return self
+
+    async def __aexit__(self, *exc_info) :
+        await self.close()
+
+    async def close(self) :
+        """Waiting for the running calls, then closing the worker threads and the database."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.db.close()
+
+    async def run(self, function, *args, **kwargs) :
+        """Running a blocking function on a worker thread and returning its result."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def read(self, key, function, *args, **kwargs) :
+        """Running a blocking read on a worker thread, unless a read with the same key is already running,
+        then its result is returned instead. "key" has to be hashable and tell the reads apart."""
+        future = self._in_flight.get(key)
+        if future is None :
+            future = asyncio.ensure_future(self.run(function, *args, **kwargs))
+            self._in_flight[key] = future
+            future.add_done_callback(functools.partial(self._forget, key))
+        # a cancelled caller mustn't cancel the read of the other callers
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future) :
+        """Called when a read is done, later reads with the same key ask the database again."""
+        if self._in_flight.get(key) is future :
+            del self._in_flight[key]
+
+    async def write(self, function, *args, **kwargs) :
+        """Running a blocking write on a worker thread. The reads that are running might not include the write,
+        so they aren't shared with the reads that start after it."""
+        try :
+            return await self.run(function, *args, **kwargs)
+        finally :
+            self._in_flight.clear()
+
+    async def load_habit(self, max_histories = 100) :
+        """Loading all habits of the user with their completions, see Database.load_habit.
+        The completions are loaded right away, so using them later never blocks the event loop."""
+        return await self.read(("load_habit", max_histories), self.db.load_habit, False, max_histories)
+
+    async def get_completions(self, habit, date = None, **options) :
+        """The completed dates of a habit, with the options of Database.get_completions (since, until, limit, ...)."""
+        key = ("get_completions", habit.habit_id, habit.name, date, tuple(sorted(options.items())))
+        return await self.read(key, self.db.get_completions, habit, date, **options)
+
+    async def get_statistics_in_database(self, today = None) :
+        """The statistics of all habits, calculated inside the database, see Database.get_statistics_in_database."""
+        return await self.read(("get_statistics_in_database", today), self.db.get_statistics_in_database, today)
+
+    async def save_habit(self, habit) :
+        return await self.write(self.db.save_habit, habit)
+
+    async def save_completion(self, habit, date) :
+        return await self.write(self.db.save_completion, habit, date)
+
+    async def save_completions(self, completions) :
+        """Saving many completions at once, see Database.save_completions."""
+        return await self.write(self.db.save_completions, list(completions))
+
+    async def delete_habit(self, habit_name) :
+        return await self.write(self.db.delete_habit, habit_name)
+
+class AsyncAnalytics :
+    def __init__(self, analytics, db) :
+        """Constructor, running the reports of an analytics-object on the worker threads of an async database.
+        The analytics-object isn't thread-safe, so only one report is calculated at a time, and its saved results
+        are forgotten whenever a habit changes in the database (instead of registering Analytics.invalidate)."""
+        self.analytics = analytics
+        self.db = db
+        self._lock = threading.Lock()
+        db.db.add_listener(self._invalidate)
+
+    def _invalidate(self, habit_names) :
+        """Called by the database (on a worker thread) with the names of the changed habits."""
+        with self._lock :
+            self.analytics.invalidate(habit_names)
+
+    def _locked(self, method, *args) :
+        """Calling a method of the analytics-object on a worker thread."""
+        with self._lock :
+            return method(*args)
+
+    async def _report(self, name, *args) :
+        return await self.db.read(("Analytics", id(self), name) + args, self._locked, getattr(self.analytics, name), *args)
+
+    async def get_statistics(self, recent = None) :
+        """The streaks and missed periods of all habits, see Analytics.get_statistics."""
+        return await self._report("get_statistics", recent)
+
+    async def get_longest_streak_for_all(self) :
+        return await self._report("get_longest_streak_for_all")
+
+    async def get_all_missed_habits(self) :
+        return await self._report("get_all_missed_habits")
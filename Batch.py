@@ -0,0 +1,446 @@
+"""This class runs the habit tracker without the menu, e.g. from scripts or scheduled jobs :
+    python Main.py add "Exercise" --frequency daily
+    python Main.py done "Exercise" --date 2024-01-31
+    python Main.py remove "Exercise"
+    python Main.py stats --format json
+    python Main.py completions "Exercise" --limit 7
+    python Main.py import completions.csv
+    python Main.py export backup.jsonl
+    python Main.py run commands.txt   (or "-" to read the commands from the standard input)
+    python Main.py --user alice stats (the habits of another user of the same database file)
+    python Main.py stats --all-users  (the statistics of every user, calculated on all CPU cores)
+    python Main.py merge alice.db     (folds a single-user database file in, as the habits of the user "alice")
+    python Main.py rebuild-summary    (calculates the summary-table from all completions again)
+    python Main.py list               (the habits with their completed days and streaks, starts fastest)
+    python Main.py series --window 30 (the rolling completion rates and counts of all habits as JSON, e.g. for charts)
+    python Main.py --timings stats    (shows how long every method and SQL statement took, see the instrumentation-class)
+A command file has one command per line, written like on the command line (e.g. 'done "Exercise" --date 2024-01-31'),
+empty lines and lines starting with "#" are skipped. All commands use the same database connection,
+and are saved in transactions of "--batch-size" commands, instead of one commit per command."""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import shlex
+import sqlite3
+import sys
+from contextlib import nullcontext
+from Period import FREQUENCIES
+from User import DEFAULT_USER
+import Snapshot
+# Database, Habit and ImportExport are only imported when a command needs them,
+# so "list" can print the snapshot without loading them (see run_command)
+
+def parse_date(text) :
+    """Converting a date argument like '2024-01-31' to a datetime.date object."""
+    try :
+        return datetime.date.fromisoformat(text)
+    except ValueError :
+        raise argparse.ArgumentTypeError(f"invalid date '{text}', expected YYYY-MM-DD")
+
+def create_parser() :
+    """Creating the parser for all commands, the same parser is used for every line of a command file."""
+    parser = argparse.ArgumentParser(prog = "Main.py", description = "Habit tracker without the menu. "
+                                     "Without a command, the menu is started.")
+    parser.add_argument("--db", default = "habits.db", help = "the database file (default : habits.db)")
+    parser.add_argument("--user", default = DEFAULT_USER, help = f"whose habits to use (default : {DEFAULT_USER})")
+    parser.add_argument("--timings", action = "store_true",
+                        help = "count and time every database and analytics method and every SQL statement, "
+                               "and show the results at the end")
+    parser.add_argument("--profile", metavar = "FILE", default = None,
+                        help = "run the whole session with cProfile and save the profile to FILE")
+    commands = parser.add_subparsers(dest = "command")
+
+    add = commands.add_parser("add", help = "add a new habit")
+    add.add_argument("name")
+    add.add_argument("--frequency", choices = list(FREQUENCIES), default = "daily")
+    add.add_argument("--start-date", type = parse_date, default = None, help = "YYYY-MM-DD, default : today")
+
+    done = commands.add_parser("done", help = "mark a habit as done")
+    done.add_argument("name")
+    done.add_argument("--date", type = parse_date, default = None, help = "YYYY-MM-DD, default : today")
+
+    remove = commands.add_parser("remove", help = "remove a habit and its completions")
+    remove.add_argument("name")
+
+    stats = commands.add_parser("stats", help = "show the streaks and missed periods of all habits")
+    stats.add_argument("--format", choices = ["text", "json"], default = "text")
+    stats.add_argument("--backend", choices = ["python", "numpy", "sql", "parallel"], default = "python",
+                       help = "python : the analytics-class, numpy : NumpyAnalytics, sql : calculated inside the database, "
+                              "parallel : ParallelAnalytics, on all CPU cores")
+    stats.add_argument("--all-users", action = "store_true",
+                       help = "the statistics of every user of the database file, one user per CPU core")
+
+    completions = commands.add_parser("completions", help = "show the completed dates of a habit, newest first")
+    completions.add_argument("name")
+    completions.add_argument("--since", type = parse_date, default = None, help = "YYYY-MM-DD, the oldest date to show")
+    completions.add_argument("--until", type = parse_date, default = None, help = "YYYY-MM-DD, the newest date to show")
+    completions.add_argument("--limit", type = int, default = None, help = "the number of dates to show")
+    completions.add_argument("--offset", type = int, default = 0, help = "the number of dates to skip")
+    completions.add_argument("--after", type = parse_date, default = None,
+                             help = "YYYY-MM-DD, the last date of the previous page, only older dates are shown")
+    completions.add_argument("--oldest-first", action = "store_true")
+
+    import_file = commands.add_parser("import", help = "import habits and completions from a CSV or JSON Lines file")
+    import_file.add_argument("file", help = "the file, or - for the standard input")
+    import_file.add_argument("--format", default = None, help = "csv or jsonl, default : from the file extension")
+    import_file.add_argument("--batch-size", type = int, default = 5000, help = "rows per transaction (default : 5000)")
+    import_file.add_argument("--progress", action = "store_true", help = "show the number of imported rows")
+
+    export_file = commands.add_parser("export", help = "export habits and completions to a CSV or JSON Lines file")
+    export_file.add_argument("file", help = "the file, or - for the standard output")
+    export_file.add_argument("--format", default = None, help = "csv or jsonl, default : from the file extension")
+    export_file.add_argument("--what", choices = ["all", "habits", "completions"], default = "all",
+                             help = "a CSV file holds either the habits or the completions (default : completions)")
+    export_file.add_argument("--batch-size", type = int, default = 5000)
+    export_file.add_argument("--progress", action = "store_true", help = "show the number of exported rows")
+
+    run = commands.add_parser("run", help = "run the commands of a file, one command per line")
+    run.add_argument("file", help = "the command file, or - for the standard input")
+    run.add_argument("--batch-size", type = int, default = 1000, help = "commands per transaction (default : 1000)")
+
+    series = commands.add_parser("series", help = "print the rolling completion rates, weekly and monthly counts "
+                                                  "and weekday histograms of all habits as JSON, e.g. for charts")
+    series.add_argument("--window", type = int, default = 7, help = "the days of a rolling rate (default : 7)")
+    series.add_argument("--since", type = parse_date, default = None, help = "YYYY-MM-DD, default : a year ago")
+    series.add_argument("--until", type = parse_date, default = None, help = "YYYY-MM-DD, default : today")
+
+    merge = commands.add_parser("merge", help = "add the habits and completions of another database file to a user")
+    merge.add_argument("file", help = "the database file, e.g. the file of a single user")
+    merge.add_argument("--into", default = None, help = "the user that gets the habits (default : the file name, "
+                                                          "e.g. alice for alice.db)")
+
+    commands.add_parser("rebuild-summary", help = "calculate the streaks in the summary-table of the database "
+                                                  "from all completions again, e.g. after a damaged file was repaired")
+
+    list_habits = commands.add_parser("list", help = "list the habits with their completed days and streaks, "
+                                                     "from a snapshot file while the database is unchanged")
+    list_habits.add_argument("--format", choices = ["text", "json"], default = "text")
+    return parser
+
+def open_input(path) :
+    """Opening a file for reading, or the standard input for "-"."""
+    return sys.stdin if path == "-" else open(path, newline = "", encoding = "utf-8")
+
+def open_output(path) :
+    """Opening a file for writing, or the standard output for "-"."""
+    return sys.stdout if path == "-" else open(path, "w", newline = "", encoding = "utf-8")
+
+def print_progress(rows) :
+    """Showing the number of processed rows on the standard error, overwriting the last number."""
+    print(f"\r{rows} rows", end = "", file = sys.stderr, flush = True)
+
+class Batch :
+    def __init__(self, db, batch_size = 1000, instrumentation = None) :
+        """Constructor, "batch_size" is the number of commands or rows that are saved in one transaction,
+        "instrumentation" also times the analytics-objects created for the statistics."""
+        self.db = db
+        self.batch_size = batch_size
+        self.instrumentation = instrumentation
+        self.parser = create_parser()
+        self._pending_completions = [] # completions from "done"-commands that haven't been saved yet
+        self.unsaved_completions = 0 # how many completions of "done"-commands couldn't be saved, e.g. of unknown habits
+
+    def execute(self, args) :
+        """Running one parsed command, returns whether it worked."""
+        # completions are collected and saved together, but have to be saved before any other command runs
+        if args.command != "done" :
+            self.flush()
+        if args.command == "add" :
+            from Habit import Habit
+            return self.db.save_habit(Habit(args.name, args.frequency, args.start_date))
+        elif args.command == "done" :
+            self._pending_completions.append((args.name, args.date if args.date else datetime.date.today()))
+            if len(self._pending_completions) >= self.batch_size :
+                self.flush()
+            return True
+        elif args.command == "remove" :
+            return self.db.delete_habit(args.name)
+        elif args.command == "stats" :
+            if args.all_users :
+                return self.print_statistics_for_users(args.format)
+            return self.print_statistics(args.format, args.backend)
+        elif args.command == "completions" :
+            return self.print_completions(args)
+        elif args.command == "import" :
+            return self.import_file(args.file, args.format, args.batch_size, args.progress)
+        elif args.command == "export" :
+            return self.export_file(args.file, args.format, args.what, args.batch_size, args.progress)
+        elif args.command == "run" :
+            with open_input(args.file) as file :
+                return self.run(file) == 0
+        elif args.command == "series" :
+            return self.print_time_series(args.window, args.since, args.until)
+        elif args.command == "merge" :
+            return self.merge_file(args.file, args.into)
+        elif args.command == "rebuild-summary" :
+            return self.rebuild_summary()
+        elif args.command == "list" :
+            return print_summaries(Snapshot.save(self.db), args.format)
+        return False
+
+    def flush(self) :
+        """Saving the collected completions, with a single statement,
+        returns how many of them couldn't be saved (e.g. of habits that don't exist)."""
+        if not self._pending_completions :
+            return 0
+        # every "done"-command has a valid date, so only the completions of unknown habits can't be saved,
+        # a day the habit was already completed on isn't saved again, but isn't an error
+        habit_ids = self.db.get_habit_ids(name for name, date in self._pending_completions)
+        self.db.save_completions(self._pending_completions, habit_ids)
+        unsaved = sum(1 for name, date in self._pending_completions if name not in habit_ids)
+        self._pending_completions = []
+        self.unsaved_completions += unsaved
+        return unsaved
+
+    def run(self, lines) :
+        """Running the commands of a command file, returns the number of lines that failed."""
+        commands = ((number, line.strip()) for number, line in enumerate(lines, 1))
+        commands = ((number, line) for number, line in commands if line and not line.startswith("#"))
+        failed = 0
+        # the "done"-commands are only saved later, the ones that couldn't be saved count as failed lines at the end
+        unsaved = self.unsaved_completions
+        # the lines are read and saved in chunks, so even a huge file is never held in memory completely
+        while True :
+            chunk = list(itertools.islice(commands, self.batch_size))
+            if not chunk :
+                break
+            parsed = [self.parse_line(number, line) for number, line in chunk]
+            failed += parsed.count(None)
+            # SQLite can't attach another database file inside a transaction, so the commands before a merge
+            # are committed first, and the merge runs on its own
+            for merging, group in itertools.groupby((args for args in parsed if args is not None),
+                                                    key = lambda args : args.command == "merge") :
+                if merging :
+                    failed += sum(1 for args in group if not self.execute(args))
+                    continue
+                with self.db.transaction() :
+                    for args in group :
+                        if not self.execute(args) :
+                            failed += 1
+                    self.flush()
+        return failed + self.unsaved_completions - unsaved
+
+    def parse_line(self, number, line) :
+        """Parsing one line of a command file, returns the parsed arguments,
+        or None after printing the error, if the line isn't a command that can run from a command file."""
+        try :
+            args = self.parser.parse_args(["--db", self.db.pool.db_name, "--user", self.db.user_name] + shlex.split(line))
+        # argparse exits after printing the error, which shouldn't stop the other commands
+        except (SystemExit, ValueError) :
+            print(f"Error in line {number} : {line}", file = sys.stderr)
+            return None
+        if args.command is None :
+            print(f"Error in line {number} : no command", file = sys.stderr)
+            return None
+        if args.command == "run" :
+            print(f"Error in line {number} : a command file can't run another command file", file = sys.stderr)
+            return None
+        # all lines run on the database file and user of the command file itself, with its timings and profile
+        if args.db != self.db.pool.db_name or args.user != self.db.user_name or args.timings or args.profile :
+            print(f"Error in line {number} : --db, --user, --timings and --profile can only be given "
+                  f"for the whole command file", file = sys.stderr)
+            return None
+        return args
+
+    def print_completions(self, args) :
+        """Printing one page of the completed dates of a habit, only reading that page from the database."""
+        from Habit import Habit
+        habit = Habit(args.name, "daily")
+        if not self.db.get_habit_ids([args.name]) :
+            print(f"Habit '{args.name}' not found in database !", file = sys.stderr)
+            return False
+        for date in self.db.get_completions(habit, since = args.since, until = args.until, limit = args.limit,
+                                            offset = args.offset, newest_first = not args.oldest_first, after = args.after) :
+            print(date.isoformat())
+        return True
+
+    def import_file(self, path, file_format = None, batch_size = 5000, progress = False) :
+        """Importing a CSV or JSON Lines file, see the import-export-class."""
+        from ImportExport import ImportExport, guess_format
+        importer = ImportExport(self.db, batch_size, print_progress if progress else None)
+        try :
+            with open_input(path) as file :
+                counts = importer.import_file(file, file_format if file_format else guess_format(path))
+        except (OSError, ValueError) as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        if progress :
+            print(file = sys.stderr)
+        print(f"Imported {counts['habits']} habits and {counts['completions']} completions, "
+              f"skipped {counts['skipped']} records.")
+        return True
+
+    def export_file(self, path, file_format = None, what = "all", batch_size = 5000, progress = False) :
+        """Exporting to a CSV or JSON Lines file, see the import-export-class."""
+        from ImportExport import ImportExport, FORMATS, guess_format
+        file_format = file_format if file_format else guess_format(path)
+        # checked before the file is created, ImportExport.export_file would only refuse it after
+        if file_format not in FORMATS :
+            print(f"Error : unknown format '{file_format}', expected one of {', '.join(FORMATS)}", file = sys.stderr)
+            return False
+        exporter = ImportExport(self.db, batch_size, print_progress if progress else None)
+        try :
+            file = open_output(path)
+            try :
+                exporter.export_file(file, file_format, what)
+            finally :
+                if file is not sys.stdout :
+                    file.close()
+        except (OSError, ValueError) as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        if progress :
+            print(file = sys.stderr)
+        return True
+
+    def merge_file(self, path, user_name = None) :
+        """Adding the habits and completions of another database file to a user, see Database.merge_file."""
+        if user_name is None :
+            user_name = os.path.splitext(os.path.basename(path))[0]
+        # checked before for_user, which would create the user
+        if not os.path.isfile(path) :
+            print(f"Error : No such database file : '{path}'", file = sys.stderr)
+            return False
+        try :
+            counts = self.db.for_user(user_name).merge_file(path)
+        except (OSError, sqlite3.Error) as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        print(f"Merged {counts['habits']} habits and {counts['completions']} completions into the user '{user_name}'.")
+        return True
+
+    def rebuild_summary(self) :
+        """Calculating the summary-table of the database from the completions again, see Database.rebuild_summary."""
+        try :
+            habits = self.db.rebuild_summary()
+        except sqlite3.Error as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        print(f"Rebuilt the summary of {habits} habits with completions.")
+        return True
+
+    def get_statistics(self, backend) :
+        """Returns the statistics of all habits, as a dictionary with
+        habit name -> frequency, current_streak, longest_streak and missed."""
+        if backend == "sql" :
+            return self.db.get_statistics_in_database()
+        habits = self.db.load_habit()
+        if backend == "numpy" :
+            # NumPy takes a while to import, so it's only imported when it's used
+            from NumpyAnalytics import NumpyAnalytics
+            analytics = NumpyAnalytics(habits)
+        elif backend == "parallel" :
+            from ParallelAnalytics import ParallelAnalytics
+            analytics = ParallelAnalytics(habits)
+        else :
+            from Analytics import Analytics
+            analytics = Analytics(habits)
+        if self.instrumentation :
+            self.instrumentation.instrument_analytics(analytics)
+        stats = analytics.get_statistics()
+        return {habit.name : {'frequency' : habit.frequency, 'current_streak' : stats[habit.name]['current_streak'],
+                              'longest_streak' : stats[habit.name]['longest_streak'], 'missed' : stats[habit.name]['missed']}
+                for habit in habits}
+
+    def print_statistics(self, output_format, backend) :
+        """Printing the statistics of all habits, as text or as JSON."""
+        stats = self.get_statistics(backend)
+        if output_format == "json" :
+            print(json.dumps(stats, indent = 2))
+            return True
+        for name, data in stats.items() :
+            print(f"{name} ({data['frequency']}) : current streak {data['current_streak']}, "
+                  f"longest streak {data['longest_streak']}, missed {data['missed']}")
+        return True
+
+    def print_time_series(self, window, since, until) :
+        """Printing the time series of all habits as JSON (see Analytics.get_time_series), with the dates as text."""
+        from Analytics import Analytics
+        try :
+            series = Analytics(self.db.load_habit()).get_time_series(window, since, until)
+        except ValueError as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        habits = {name : {'rates' : data['rates'],
+                          'weekly' : [[start.isoformat(), count] for start, count in data['weekly']],
+                          'monthly' : [[start.isoformat(), count] for start, count in data['monthly']],
+                          'weekdays' : data['weekdays']}
+                  for name, data in series['habits'].items()}
+        print(json.dumps({'dates' : [date.isoformat() for date in series['dates']], 'habits' : habits}))
+        return True
+
+    def print_statistics_for_users(self, output_format) :
+        """Printing the statistics of every user of the database file, calculated in a process pool."""
+        from ParallelAnalytics import get_statistics_for_users
+        try :
+            results = get_statistics_for_users(self.db.pool.db_name, recent = 0)
+        except ValueError as e :
+            print(f"Error : {e}", file = sys.stderr)
+            return False
+        stats = {user : {name : {key : value for key, value in data.items() if key != 'completed_dates'}
+                         for name, data in habits.items()}
+                 for user, habits in results.items()}
+        if output_format == "json" :
+            print(json.dumps(stats, indent = 2))
+            return True
+        for user, habits in stats.items() :
+            for name, data in habits.items() :
+                print(f"{user} : {name} : current streak {data['current_streak']}, "
+                      f"longest streak {data['longest_streak']}, missed {data['missed']}")
+        return True
+
+def print_summaries(summaries, output_format) :
+    """Printing the summaries of the habits (see Database.get_summaries)."""
+    if output_format == "json" :
+        print(json.dumps({name : {key : value.isoformat() if isinstance(value, datetime.date) else value
+                                  for key, value in summary.items()}
+                          for name, summary in summaries.items()}, indent = 2))
+        return True
+    for name, summary in summaries.items() :
+        last = summary['last_completion'].isoformat() if summary['last_completion'] else "never"
+        print(f"{name} ({summary['frequency']}) : {summary['completed_days']} completed days, "
+              f"current streak {summary['current_streak']}, longest streak {summary['longest_streak']}, "
+              f"last completion {last}")
+    return True
+
+def run_command(args) :
+    """Running one parsed command, returns the exit code (0 if it worked)."""
+    # "list" is answered from the snapshot file while it's up to date, without opening the database (see the snapshot-module)
+    if args.command == "list" and not args.timings and not args.profile :
+        summaries = Snapshot.load(args.db, args.user)
+        if summaries is not None :
+            return 0 if print_summaries(summaries, args.format) else 1
+    from Database import Database
+    db = Database(args.db, args.user)
+    # the instrumentation and cProfile are only imported when they're used, so a command starts faster
+    instrumentation = None
+    if args.timings :
+        from Instrumentation import Instrumentation
+        instrumentation = Instrumentation()
+        instrumentation.instrument_database(db)
+    profile = nullcontext()
+    if args.profile :
+        from Instrumentation import profiling
+        profile = profiling(args.profile)
+    try :
+        with profile :
+            batch = Batch(db, getattr(args, "batch_size", 1000), instrumentation)
+            worked = batch.execute(args)
+            batch.flush()
+            # a "done"-command is only saved by flush, so an unknown habit only shows up there
+            worked = worked and batch.unsaved_completions == 0
+        return 0 if worked else 1
+    finally :
+        db.close()
+        if instrumentation :
+            print(instrumentation.report(), file = sys.stderr)
+
+def main(argv) :
+    """Running one command from the command line, returns the exit code (0 if it worked)."""
+    args = create_parser().parse_args(argv)
+    if args.command is None :
+        create_parser().print_usage(sys.stderr)
+        return 2
+    return run_command(args)
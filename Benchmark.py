@@ -0,0 +1,257 @@
+"""This module is measuring how long the database and the analytics-class need for their most used operations,
+run it with "python Benchmark.py" to see how the times grow with the number of habits and completions,
+and how long "python Main.py" needs to start, list the habits and save a completion.
+The data comes from a seeded random generator, so every run measures exactly the same data,
+and "--json results.json" saves the results, so the results of 2 commits can be compared :
+    python Benchmark.py --json before.json
+    (checking out the other commit)
+    python Benchmark.py --json after.json --compare before.json"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from Database import Database
+from Analytics import Analytics
+from ImportExport import ImportExport
+
+# (number of habits, completions per habit) - every scale point is filled into a fresh in-memory database
+SCALE_POINTS = [(10, 100), (100, 100), (1000, 100), (1000, 300)]
+# number of completion rows in the files for the import/export benchmark
+IMPORT_SIZES = [100000, 1000000]
+# the days between 2 periods of each frequency, for creating the completions
+PERIOD_DAYS = {'daily' : 1, 'weekly' : 7, 'monthly' : 30}
+# how many calls of save_completion and delete_habit are measured per run
+WRITE_CALLS = 50
+# (number of habits, completions per habit) in the database file for the startup benchmark
+STARTUP_SIZE = (1000, 100)
+
+def fill_database(db, habit_count, completions_per_habit, seed = 42) :
+    """Filling a database with habits of mixed frequencies and their completions, using a seeded random generator,
+    so every run creates exactly the same data. Like real habits, the completions come in streaks of consecutive
+    periods, with gaps of missed periods in between, going back from today."""
+    generator = random.Random(seed)
+    today = datetime.date.today().toordinal()
+    for i in range(habit_count) :
+        frequency = generator.choice(["daily", "weekly", "monthly"])
+        step = PERIOD_DAYS[frequency]
+        days = []
+        period = today
+        done = True # whether the habit is currently on a streak
+        while len(days) < completions_per_habit :
+            if done :
+                # any day of a week or month counts for that period
+                days.append(period - generator.randrange(step))
+            # a streak usually goes on, a gap usually ends after a few periods
+            done = generator.random() < (0.85 if done else 0.35)
+            period -= step
+        start_day = period - generator.randrange(3 * step)
+        db.cursor.execute("INSERT INTO habits (name, frequency, start_day) VALUES (?, ?, ?)",
+                          (f"Habit {i}", frequency, start_day))
+        habit_id = db.cursor.lastrowid
+        db.cursor.executemany("INSERT INTO completions (habit_id, completion_day) VALUES (?, ?)",
+                              [(habit_id, day) for day in days])
+    db.connection.commit()
+    # the completions were written without the database-class, so the summary-table is calculated once at the end
+    db.rebuild_summary()
+
+def time_call(function, repeat = 3, setup = None) :
+    """Calling a function several times and returning the fastest run in seconds.
+    "setup" is called with the number of the run before every run, without being measured,
+    and its result is passed to the function."""
+    best = None
+    for run in range(repeat) :
+        if setup :
+            argument = setup(run)
+            start = time.perf_counter()
+            function(argument)
+        else :
+            start = time.perf_counter()
+            function()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+def benchmark_scale_point(habit_count, completions_per_habit, repeat = 3, seed = 42) :
+    """Measuring the database- and analytics-methods on one scale point, returns one result per method,
+    with the seconds of the fastest run and the seconds per call."""
+    db = Database(":memory:")
+    fill_database(db, habit_count, completions_per_habit, seed)
+    results = []
+
+    def add(name, seconds, calls = 1) :
+        results.append({'benchmark' : name, 'habits' : habit_count, 'completions' : habit_count * completions_per_habit,
+                        'calls' : calls, 'seconds' : seconds, 'seconds_per_call' : seconds / calls})
+
+    add("Database.load_habit", time_call(db.load_habit, repeat))
+
+    # the analytics-class saves its results, and the habits their streaks,
+    # so every run gets freshly loaded habits and a new analytics-object, to measure the calculation itself
+    def fresh_analytics(run) :
+        return Analytics(db.load_habit())
+    add("Analytics.get_statistics", time_call(lambda analytics : analytics.get_statistics(), repeat, fresh_analytics))
+    add("Analytics.get_longest_streak_for_all",
+        time_call(lambda analytics : analytics.get_longest_streak_for_all(), repeat, fresh_analytics))
+    add("Database.get_longest_streak_in_database", time_call(db.get_longest_streak_in_database, repeat))
+    add("Analytics.get_all_missed_habits",
+        time_call(lambda analytics : analytics.get_all_missed_habits(), repeat, fresh_analytics))
+
+    habits = db.load_habit()
+    calls = min(WRITE_CALLS, habit_count)
+    tomorrow = datetime.date.today() + datetime.timedelta(days = 1)
+    # save_completion and delete_habit print a line per call, which isn't part of the measurement
+    with contextlib.redirect_stdout(io.StringIO()) :
+        # every run saves completions on another new day, and deletes other habits
+        def save_completions(run) :
+            for habit in habits[:calls] :
+                db.save_completion(habit, tomorrow + datetime.timedelta(days = run))
+        add("Database.save_completion", time_call(save_completions, repeat, lambda run : run), calls)
+
+        def delete_habits(run) :
+            for habit in habits[run * calls:(run + 1) * calls] :
+                db.delete_habit(habit.name)
+        add("Database.delete_habit", time_call(delete_habits, max(1, min(repeat, habit_count // calls)), lambda run : run),
+            calls)
+    db.close()
+    return results
+
+def write_completion_file(path, rows, habit_count = 100, seed = 42) :
+    """Writing a CSV file with "rows" completions of "habit_count" habits, row by row,
+    so even a file with millions of rows is never held in memory."""
+    generator = random.Random(seed)
+    start = datetime.date.today() - datetime.timedelta(days = rows // habit_count + 1)
+    with open(path, "w", encoding = "utf-8") as file :
+        for i in range(habit_count) :
+            file.write(f"Habit {i},daily,{start.isoformat()}\n")
+        for row in range(rows) :
+            day = start + datetime.timedelta(days = row // habit_count + generator.randrange(2))
+            file.write(f"Habit {row % habit_count},{day.isoformat()}\n")
+
+def benchmark_import_export(sizes = IMPORT_SIZES) :
+    """Measuring the import and export of CSV files for every size, into a database file,
+    returns one result per size and direction."""
+    results = []
+    for rows in sizes :
+        with tempfile.TemporaryDirectory() as directory :
+            source = os.path.join(directory, "import.csv")
+            write_completion_file(source, rows)
+            db = Database(os.path.join(directory, "benchmark.db"))
+            start = time.perf_counter()
+            with open(source, newline = "", encoding = "utf-8") as file :
+                ImportExport(db).import_file(file, "csv")
+            import_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(os.path.join(directory, "export.csv"), "w", newline = "", encoding = "utf-8") as file :
+                ImportExport(db).export_file(file, "csv", "completions")
+            export_seconds = time.perf_counter() - start
+            db.close()
+        for name, seconds in [("ImportExport.import_file", import_seconds), ("ImportExport.export_file", export_seconds)] :
+            results.append({'benchmark' : name, 'habits' : 100, 'completions' : rows, 'calls' : 1,
+                            'seconds' : seconds, 'seconds_per_call' : seconds})
+    return results
+
+def benchmark_startup(habit_count = STARTUP_SIZE[0], completions_per_habit = STARTUP_SIZE[1], repeat = 3, seed = 42) :
+    """Measuring how long "python Main.py ..." takes from starting the interpreter until it exits, for a database file,
+    with the interpreter on its own as the baseline. "list" is measured with an up-to-date snapshot file,
+    and without one (see the snapshot-module), "done" saves a completion on another day in every run."""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    with tempfile.TemporaryDirectory() as directory :
+        path = os.path.join(directory, "benchmark.db")
+        db = Database(path)
+        fill_database(db, habit_count, completions_per_habit, seed)
+        db.close()
+
+        def start(*argv) :
+            subprocess.run([sys.executable, *argv], cwd = folder, check = True, stdout = subprocess.DEVNULL)
+        def without_snapshot(run) :
+            with contextlib.suppress(FileNotFoundError) :
+                os.remove(path + ".snapshot")
+        tomorrow = datetime.date.today() + datetime.timedelta(days = 1)
+        start("Main.py", "--db", path, "list") # writing the snapshot
+        for name, function, setup in [
+                ("startup: python", lambda : start("-c", "pass"), None),
+                ("startup: list (snapshot)", lambda : start("Main.py", "--db", path, "list"), None),
+                ("startup: list (database)", lambda argument : start("Main.py", "--db", path, "list"), without_snapshot),
+                ("startup: done", lambda run : start("Main.py", "--db", path, "done", "Habit 0", "--date",
+                                                     (tomorrow + datetime.timedelta(days = run)).isoformat()),
+                 lambda run : run)] :
+            seconds = time_call(function, repeat, setup)
+            results.append({'benchmark' : name, 'habits' : habit_count, 'completions' : habit_count * completions_per_habit,
+                            'calls' : 1, 'seconds' : seconds, 'seconds_per_call' : seconds})
+    return results
+
+def get_environment(seed, repeat) :
+    """Returns where the results come from : the commit, the Python and SQLite versions and the settings."""
+    try :
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True,
+                                cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) :
+        commit = None
+    return {'commit' : commit, 'date' : datetime.datetime.now().isoformat(timespec = "seconds"),
+            'python' : platform.python_version(), 'sqlite' : sqlite3.sqlite_version, 'platform' : platform.platform(),
+            'seed' : seed, 'repeat' : repeat}
+
+def run(scale_points = SCALE_POINTS, import_sizes = IMPORT_SIZES, repeat = 3, seed = 42) :
+    """Running all benchmarks, returns the environment and the results as one dictionary."""
+    results = []
+    for habit_count, completions_per_habit in scale_points :
+        results.extend(benchmark_scale_point(habit_count, completions_per_habit, repeat, seed))
+    results.extend(benchmark_import_export(import_sizes))
+    results.extend(benchmark_startup(repeat = repeat, seed = seed))
+    return {'environment' : get_environment(seed, repeat), 'results' : results}
+
+def compare(baseline, report) :
+    """Returns the results of "report", each with the ratio to the same benchmark in "baseline"
+    (above 1 means slower than before), None where the baseline doesn't have that benchmark."""
+    before = {(result['benchmark'], result['habits'], result['completions']) : result for result in baseline['results']}
+    compared = []
+    for result in report['results'] :
+        old = before.get((result['benchmark'], result['habits'], result['completions']))
+        ratio = result['seconds_per_call'] / old['seconds_per_call'] if old and old['seconds_per_call'] else None
+        compared.append(dict(result, ratio = ratio))
+    return compared
+
+def print_results(results) :
+    """Printing the results as a table."""
+    print(f"{'benchmark':<38} {'habits':>7} {'completions':>12} {'s/call':>11} {'rows/s':>11} {'vs before':>10}")
+    for result in results :
+        # the rows per second only make sense for the methods that go through all completions at once,
+        # not for the startup, which reads the summaries or a single habit
+        counted = result['calls'] == 1 and result['seconds'] and not result['benchmark'].startswith("startup")
+        rows_per_second = f"{result['completions'] / result['seconds']:.0f}" if counted else ""
+        ratio = f"{result['ratio']:.2f}x" if result.get('ratio') else ""
+        print(f"{result['benchmark']:<38} {result['habits']:>7} {result['completions']:>12} "
+              f"{result['seconds_per_call']:>11.6f} {rows_per_second:>11} {ratio:>10}")
+
+def main(argv = None) :
+    parser = argparse.ArgumentParser(description = "Measuring the habit tracker on seeded random data.")
+    parser.add_argument("--json", help = "saving the results in this JSON file")
+    parser.add_argument("--compare", help = "the JSON file of an earlier run, to compare the results with")
+    parser.add_argument("--quick", action = "store_true", help = "only the 2 smallest scale points, without import/export")
+    parser.add_argument("--repeat", type = int, default = 3, help = "runs per benchmark, the fastest one counts")
+    parser.add_argument("--seed", type = int, default = 42)
+    args = parser.parse_args(argv)
+
+    report = run(SCALE_POINTS[:2] if args.quick else SCALE_POINTS, [] if args.quick else IMPORT_SIZES,
+                 args.repeat, args.seed)
+    results = report['results']
+    if args.compare :
+        with open(args.compare, encoding = "utf-8") as file :
+            results = compare(json.load(file), report)
+    print_results(results)
+    if args.json :
+        with open(args.json, "w", encoding = "utf-8") as file :
+            json.dump(report, file, indent = 2)
+
+# Making sure it runs only when executed directly
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,12 @@ from Habit import Habit
 from Analytics import Analytics
 
 class CLI :
-    def __init__(self, user, db, analytics) :
+    def __init__(self, user, db, analytics, instrumentation = None) :
         self.user = user
         self.db = db
         self.analytics = analytics
+        # only set with "--timings", then the menu has an 8th entry to show the timings (see the instrumentation-class)
+        self.instrumentation = instrumentation
 
     def display_menu(self) :
         """Creating the 'welcome'-menu"""
@@ -21,6 +23,8 @@ class CLI :
         print("5. List all habits")
         print("6. List habits with a specific periodicity (daily/weekly/monthly)")
         print("7. Quit")
+        if self.instrumentation :
+            print("8. Show timings")
 
     def display_menu_statistics(self):
         """Creating the statistics-menu"""
@@ -65,6 +69,8 @@ class CLI :
                 elif choice == "7" :
                     print("Have a great day !")
                     break
+                elif choice == "8" and self.instrumentation :
+                    print(self.instrumentation.report())
                 else :
                     print("Invalid choice, try again !")
             except Exception as e :
@@ -113,8 +119,8 @@ class CLI :
                     print("Invalid choice, please choose daily, weekly or monthly.")
             habit = Habit(name, frequency)
         # Checking if the habit already exists in the user-habits-list
-        if any(h.name == habit for h in self.user.habits) :
-            print(f"A habit with name '{habit}' already exists !")
+        if self.user.get_habit_by_name(habit.name) is not None :
+            print(f"A habit with name '{habit.name}' already exists !")
             return
         # adding the habit to the user-list, and to the database
         self.user.add_habit(habit)
@@ -144,7 +150,7 @@ class CLI :
             habit_name = choice
         # Checking whether there is (or rather isn't) a habit name,
         # and whether it can (or rather can not) be found in the habits-list
-        if not habit_name or not any(h.name == habit_name for h in self.user.habits) :
+        if not habit_name or self.user.get_habit_by_name(habit_name) is None :
             print(f"Habit not found.")
             return
         # Checking whether the user really wants to delete the habit
@@ -184,7 +190,7 @@ class CLI :
                 print("Invalid number, please try again !")
                 return
         else:
-            selected_habit = next((h for h in self.user.habits if h.name == choice), None)
+            selected_habit = self.user.get_habit_by_name(choice)
             if not selected_habit:
                 print(f"Habit '{choice}' not found !")
                 return
@@ -200,7 +206,8 @@ class CLI :
         showing the name, current streak, longest streak, potentially missed days,
         and the newest completed dates, using the get_statistics-method from the analytics-class"""
         try :
-            stats = self.analytics.get_statistics()
+            # only the 7 newest completed dates of each habit are shown, so only those are fetched
+            stats = self.analytics.get_statistics(recent = 7)
             if not stats :
                 print("\nNo habits to show statistics for !")
                 return
@@ -231,11 +238,10 @@ class CLI :
                     print(f"Number of missed Months : {missed}")
                 if completed_dates :
                     print("Recent completions : ")
-                    # the [:7] cuts off the completed_dates after 7 entries,
-                    # could theoretically remove it and show all completed dates,
+                    # only the newest 7 entries, could theoretically show all completed dates,
                     # but don't know whether you'd want to see 50 or 100 entries for one habit,
                     # given enough "marks"
-                    for date in completed_dates[:7]:
+                    for date in completed_dates :
                         print(f"  - {date}")
                 # printing 30 "-" as a separator
                 print("-" * 30)
@@ -261,7 +267,7 @@ class CLI :
                 print("Invalid number, please try again !")
                 return
         else :
-            selected_habit = next((h for h in self.user.habits if h.name == choice), None)
+            selected_habit = self.user.get_habit_by_name(choice)
             if not selected_habit :
                 print(f"Habit '{choice}' not found !")
                 return
@@ -280,8 +286,10 @@ class CLI :
 
     def view_longest_streak_across_all_habits(self) :
         """Showing the longest streak across all habits,
-        using the get_longest_streak_for_all-method from the analytics-class"""
-        longest_streak_habit, longest_streak_all = self.analytics.get_longest_streak_for_all()
+        looked up in the summary-table of the database (see Database.get_longest_streak_in_database),
+        instead of calculating the streaks of all habits"""
+        longest_streak_name, longest_streak_all = self.db.get_longest_streak_in_database()
+        longest_streak_habit = self.user.get_habit_by_name(longest_streak_name) if longest_streak_name else None
         if longest_streak_habit is None :
             print("No habits have been marked es done yet !")
             return
@@ -0,0 +1,123 @@
+"""This class stores the completion dates of a habit.
+Instead of a list of datetime.date objects, it keeps a sorted array of day numbers (date.toordinal()),
+every day only once, which needs 4 bytes per completion, and can be searched with "bisect"."""
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+
+def to_day_number(date) :
+    """Converting a date (or a string like '2024-01-31') to its day number, returns None for an invalid value."""
+    if isinstance(date, datetime.date) :
+        return date.toordinal()
+    if isinstance(date, str) :
+        try :
+            return datetime.date.fromisoformat(date).toordinal()
+        except ValueError :
+            pass
+    print(f"Warning : Invalid date format found : {date}")
+    return None
+
+class CompletionStore :
+    __slots__ = ('_days', 'version')
+
+    def __init__(self, dates = ()) :
+        """Constructor, creating the store from any number of dates, the order doesn't matter,
+        and a date that's in there twice is only stored once."""
+        day_numbers = {to_day_number(date) for date in dates}
+        day_numbers.discard(None)
+        self._days = array('i', sorted(day_numbers))
+        # counting every change, so e.g. a streak can tell whether it's still up to date
+        self.version = 0
+
+    @classmethod
+    def from_day_numbers(cls, day_numbers) :
+        """Creating a store directly from day numbers, without creating date objects."""
+        store = cls()
+        store._days = array('i', sorted(set(day_numbers)))
+        return store
+
+    @property
+    def day_numbers(self) :
+        """The sorted array of day numbers, should only be read, not changed."""
+        return self._days
+
+    def add(self, date) :
+        """Adding a completion date, returns False if the date was already in the store."""
+        day = date.toordinal()
+        # the usual case is a completion for today, which belongs at the end
+        if not self._days or day > self._days[-1] :
+            self._days.append(day)
+        else :
+            index = bisect_left(self._days, day)
+            if index < len(self._days) and self._days[index] == day :
+                return False
+            self._days.insert(index, day)
+        self.version += 1
+        return True
+
+    # so the store can be used like the list of dates it replaced
+    append = add
+
+    def extend(self, dates) :
+        """Adding several completion dates."""
+        for date in dates :
+            self.add(date)
+
+    def remove(self, date) :
+        """Removing a completion date, raises a ValueError if the date isn't in the store, like a list does."""
+        day = date.toordinal()
+        index = bisect_left(self._days, day)
+        if index == len(self._days) or self._days[index] != day :
+            raise ValueError(f"{date} is not a completion date")
+        del self._days[index]
+        self.version += 1
+
+    def between(self, since = None, until = None) :
+        """Returns the completion dates from "since" until "until" (both included), oldest first."""
+        start = bisect_left(self._days, since.toordinal()) if since else 0
+        end = bisect_right(self._days, until.toordinal()) if until else len(self._days)
+        return [datetime.date.fromordinal(day) for day in self._days[start:end]]
+
+    def newest(self, count = None) :
+        """Returns the newest "count" completion dates (or all of them without a count), newest first."""
+        days = self._days if count is None else self._days[max(0, len(self._days) - count):]
+        return [datetime.date.fromordinal(day) for day in reversed(days)]
+
+    def count_between(self, since = None, until = None) :
+        """Returns the number of completion dates from "since" until "until" (both included)."""
+        start = bisect_left(self._days, since.toordinal()) if since else 0
+        end = bisect_right(self._days, until.toordinal()) if until else len(self._days)
+        return max(0, end - start)
+
+    def __len__(self) :
+        return len(self._days)
+
+    def __contains__(self, date) :
+        if not isinstance(date, datetime.date) :
+            return False
+        day = date.toordinal()
+        index = bisect_left(self._days, day)
+        return index < len(self._days) and self._days[index] == day
+
+    def __iter__(self) :
+        return (datetime.date.fromordinal(day) for day in self._days)
+
+    def __reversed__(self) :
+        return (datetime.date.fromordinal(day) for day in reversed(self._days))
+
+    def __getitem__(self, index) :
+        if isinstance(index, slice) :
+            return [datetime.date.fromordinal(day) for day in self._days[index]]
+        return datetime.date.fromordinal(self._days[index])
+
+    def __eq__(self, other) :
+        # comparing with another store, or with a list of dates
+        if isinstance(other, CompletionStore) :
+            return self._days == other._days
+        try :
+            return list(self) == list(other)
+        except TypeError :
+            return NotImplemented
+
+    def __repr__(self) :
+        return f"CompletionStore({list(self)!r})"
@@ -0,0 +1,96 @@
+"""This class is managing the connections to the SQLite database file.
+There is exactly one connection for writing, which is protected by a lock,
+and every thread that reads gets its own read connection.
+Thanks to the WAL-journal, the readers see the last committed data and don't have to wait for the writer."""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Settings for every connection, "cache_size" is negative, because SQLite reads negative numbers as KiB instead of pages
+PRAGMAS = {
+    'synchronous' : 'NORMAL', # with WAL, NORMAL is still safe after a crash, but doesn't sync on every commit
+    'cache_size' : -16000, # about 16 MB page cache per connection
+    'mmap_size' : 268435456, # reading up to 256 MB of the file through memory-mapping
+    'temp_store' : 'MEMORY' # temporary tables and indexes (e.g. for ORDER BY) are kept in memory
+}
+
+class ConnectionPool :
+    def __init__(self, db_name) :
+        """Constructor, opening the writer connection and switching the file to the WAL-journal."""
+        self.db_name = db_name
+        # An in-memory database only exists inside a single connection,
+        # so in that case the readers have to use the writer connection as well
+        self.in_memory = db_name in (":memory:", "")
+        self._hooks = [] # functions that are called with every connection, see add_connection_hook
+        # "check_same_thread = False", because the connections are closed from the thread calling close()
+        self.writer = self._connect()
+        if not self.in_memory :
+            self.writer.execute("PRAGMA journal_mode = WAL")
+        self.write_lock = threading.RLock()
+        self._writer_thread = None # the thread currently holding the write lock
+        self._write_depth = 0 # how often that thread has entered writing()
+        self.transaction_depth = 0 # how many "with db.transaction() :"-blocks are currently open on the writer
+        self.counted_changes = 0 # the total changes of the writer, when the change counter was last raised
+        self._local = threading.local() # holds the read connection of each thread
+        self._readers = [] # all read connections that have been opened, to be able to close them
+        self._readers_lock = threading.Lock()
+
+    def _connect(self) :
+        """Opening a new connection and applying the settings from above."""
+        connection = sqlite3.connect(self.db_name, check_same_thread = False)
+        for name, value in PRAGMAS.items() :
+            # PRAGMA statements can't use "?"-parameters, but all values are defined above
+            connection.execute(f"PRAGMA {name} = {value}")
+        for hook in self._hooks :
+            hook(connection)
+        return connection
+
+    def add_connection_hook(self, hook) :
+        """Calling a function with every connection, the ones that are already open and the ones opened later,
+        e.g. to set a trace callback (see the instrumentation-class)."""
+        self._hooks.append(hook)
+        with self._readers_lock :
+            connections = [self.writer] + self._readers
+        for connection in connections :
+            hook(connection)
+
+    @contextmanager
+    def writing(self) :
+        """Handing out the writer connection, only one thread at a time can use it.
+        The same thread can enter this block several times (e.g. a save-method inside a transaction)."""
+        with self.write_lock :
+            self._writer_thread = threading.get_ident()
+            self._write_depth += 1
+            try :
+                yield self.writer
+            finally :
+                self._write_depth -= 1
+                if self._write_depth == 0 :
+                    self._writer_thread = None
+
+    @contextmanager
+    def reading(self) :
+        """Handing out a read connection for the current thread.
+        A thread that is in the middle of writing reads through the writer connection,
+        otherwise it wouldn't see its own changes that haven't been committed yet."""
+        if self.in_memory or self._writer_thread == threading.get_ident() :
+            with self.writing() as connection :
+                yield connection
+            return
+        connection = getattr(self._local, 'connection', None)
+        if connection is None :
+            connection = self._connect()
+            self._local.connection = connection
+            with self._readers_lock :
+                self._readers.append(connection)
+        yield connection
+
+    def close(self) :
+        """Closing the writer and all read connections."""
+        with self._readers_lock :
+            for connection in self._readers :
+                connection.close()
+            self._readers = []
+        self._local = threading.local()
+        with self.write_lock :
+            self.writer.close()
@@ -1,111 +1,867 @@
 import sqlite3 # SQLite database library, to connect and manage databases
 import datetime # library to handle dates and times
+import os
+import itertools
+import pathlib
+import tempfile
+from contextlib import contextmanager # to write the "with db.transaction() :"-block as a generator
+from Habit import Habit
+from CompletionStore import CompletionStore, to_day_number
+from ConnectionPool import ConnectionPool
+from HistoryCache import HistoryCache
+from HabitSet import HabitSet
+from Period import period_index, period_indexes
+from Streak import Streak
+from User import DEFAULT_USER
+from Snapshot import summaries_from_rows
+
+# The migrations, every function upgrades the schema by exactly one version.
+# The first function brings an empty file to version 1, the second one to version 2 and so on.
+# Existing database files remember their version in "PRAGMA user_version", so only the missing steps are run.
+def _migration_create_tables(cursor) :
+    """Version 1 : the original "habits" and "completions" tables."""
+    # SQL statement, creates a "habits" table to store habit information
+    cursor.execute('''CREATE TABLE IF NOT EXISTS habits (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT,
+                        frequency TEXT,
+                        start_date TEXT)''')
+    # SQL statement, creates a "completion" table to record completions
+    cursor.execute('''CREATE TABLE IF NOT EXISTS completions (
+                        habit_id INTEGER,
+                        completion_date TEXT,
+                        FOREIGN KEY (habit_id) REFERENCES habits (id))''')
+
+def _migration_add_indexes(cursor) :
+    """Version 2 : a unique index on the habit names, and an index on (habit_id, completion_date),
+    so looking up a habit by name or the completions of a habit doesn't scan the whole table anymore."""
+    # Older files can contain the same habit name more than once, which a unique index doesn't allow.
+    # The completions of those duplicates are moved to the oldest habit with that name, then the duplicates are removed.
+    cursor.execute('''UPDATE completions
+                      SET habit_id = (SELECT MIN(first.id) FROM habits AS duplicate
+                                      JOIN habits AS first ON first.name = duplicate.name
+                                      WHERE duplicate.id = completions.habit_id)
+                      WHERE habit_id IN (SELECT id FROM habits
+                                         WHERE name IS NOT NULL
+                                         AND id NOT IN (SELECT MIN(id) FROM habits GROUP BY name))''')
+    cursor.execute('''DELETE FROM habits
+                      WHERE name IS NOT NULL
+                      AND id NOT IN (SELECT MIN(id) FROM habits GROUP BY name)''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_habits_name ON habits (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_completions_habit_date ON completions (habit_id, completion_date)")
+
+def _stored_date_to_day_number(date_str) :
+    """Converting a date the way older versions stored it ("YYYY-MM-DD") to a day number, None if it can't be read.
+    save_habit used to write the start dates as "YYYY-MM_DD", those are repaired."""
+    if not isinstance(date_str, str) :
+        return None
+    date_str = date_str.strip()
+    if len(date_str) == 10 and date_str[7] == '_' :
+        date_str = date_str[:7] + '-' + date_str[8:]
+    try :
+        return datetime.datetime.strptime(date_str, '%Y-%m-%d').date().toordinal()
+    except ValueError :
+        return None
+
+def _migration_store_day_numbers(cursor) :
+    """Version 3 : the dates are stored as integer day numbers (date.toordinal()) instead of text,
+    in the columns "start_day" and "completion_day", so loading them doesn't need any parsing,
+    and comparing them on the index is an integer comparison.
+    Dates that can't be read aren't replaced by today anymore, they are moved to the "invalid_dates" table,
+    so nothing is lost. A habit without a readable start date starts with its first completion (or today, without any)."""
+    cursor.connection.create_function("day_number", 1, _stored_date_to_day_number, deterministic = True)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS invalid_dates (
+                        habit_id INTEGER,
+                        column_name TEXT,
+                        value TEXT)''')
+    cursor.execute('''INSERT INTO invalid_dates (habit_id, column_name, value)
+                      SELECT id, 'start_date', start_date FROM habits WHERE day_number(start_date) IS NULL''')
+    cursor.execute('''INSERT INTO invalid_dates (habit_id, column_name, value)
+                      SELECT habit_id, 'completion_date', completion_date FROM completions
+                      WHERE day_number(completion_date) IS NULL''')
+    # SQLite can't change the type of a column, so both tables are copied into new tables, which replace the old ones
+    cursor.execute('''CREATE TABLE habits_by_day (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT,
+                        frequency TEXT,
+                        start_day INTEGER)''')
+    cursor.execute('''INSERT INTO habits_by_day (id, name, frequency, start_day)
+                      SELECT id, name, frequency,
+                             COALESCE(day_number(start_date),
+                                      (SELECT MIN(day_number(completion_date)) FROM completions WHERE habit_id = habits.id),
+                                      ?)
+                      FROM habits''', (datetime.date.today().toordinal(),))
+    cursor.execute('''CREATE TABLE completions_by_day (
+                        habit_id INTEGER,
+                        completion_day INTEGER,
+                        FOREIGN KEY (habit_id) REFERENCES habits (id))''')
+    cursor.execute('''INSERT INTO completions_by_day (habit_id, completion_day)
+                      SELECT habit_id, day_number(completion_date) AS day FROM completions
+                      WHERE day IS NOT NULL
+                      ORDER BY habit_id, day''')
+    cursor.execute("DROP TABLE completions")
+    cursor.execute("DROP TABLE habits")
+    cursor.execute("ALTER TABLE habits_by_day RENAME TO habits")
+    cursor.execute("ALTER TABLE completions_by_day RENAME TO completions")
+    cursor.execute("CREATE UNIQUE INDEX idx_habits_name ON habits (name)")
+    cursor.execute("CREATE INDEX idx_completions_habit_day ON completions (habit_id, completion_day)")
+    cursor.execute("SELECT COUNT(*) FROM invalid_dates")
+    invalid = cursor.fetchone()[0]
+    if invalid :
+        print(f"Warning : {invalid} dates couldn't be read while upgrading the database, "
+              f"they are kept in the table 'invalid_dates'")
+
+def _migration_add_users(cursor) :
+    """Version 4 : a "users" table, and the user every habit belongs to, so one file can hold the habits of many users.
+    The habits that are already in the file belong to the user "default_user".
+    Habit names only have to be unique per user, and the (user_id, name)-index also finds all habits of a user."""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE)''')
+    cursor.execute("INSERT INTO users (id, name) VALUES (?, ?)", (DEFAULT_USER_ID, DEFAULT_USER))
+    cursor.execute(f"ALTER TABLE habits ADD COLUMN user_id INTEGER NOT NULL DEFAULT {DEFAULT_USER_ID} REFERENCES users (id)")
+    cursor.execute("DROP INDEX idx_habits_name")
+    cursor.execute("CREATE UNIQUE INDEX idx_habits_user_name ON habits (user_id, name)")
+
+def _migration_add_summary(cursor) :
+    """Version 5 : the "habit_summary" table, one row per habit with completions, with the number of completed days,
+    the first and last completed day, the newest completed period, the run of consecutive periods ending there
+    and the longest streak. Every write keeps the row of its habit up to date, in the same transaction,
+    so the longest streak of a user is a single lookup on the (user_id, longest_streak)-index.
+    The current streak is the run, if the newest completed period is the current period."""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS habit_summary (
+                        habit_id INTEGER PRIMARY KEY REFERENCES habits (id),
+                        user_id INTEGER NOT NULL,
+                        completed_days INTEGER NOT NULL,
+                        first_day INTEGER NOT NULL,
+                        last_day INTEGER NOT NULL,
+                        last_period INTEGER,
+                        current_run INTEGER NOT NULL,
+                        longest_streak INTEGER NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_summary_user_longest ON habit_summary (user_id, longest_streak DESC)")
+    _summarize(cursor)
+
+def _migration_add_change_counter(cursor) :
+    """Version 6 : a counter, which goes up with every commit that changed something (see Database._count_changes),
+    and a random id of the database file, so the snapshot of the summaries can tell whether it's still up to date
+    (see the snapshot-module). It's counted once per commit instead of by triggers, a trigger runs for every row,
+    which made saving a million completions 4 times slower."""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS change_counter (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        database_id TEXT NOT NULL,
+                        counter INTEGER NOT NULL)''')
+    cursor.execute("INSERT INTO change_counter (id, database_id, counter) VALUES (1, lower(hex(randomblob(8))), 0)")
+
+def _summary_row(frequency, day_numbers) :
+    """Returns the columns of a "habit_summary"-row from all sorted completion days of a habit, the same streak
+    the streak-class calculates. A habit with an unknown frequency has a longest streak of 1 and no periods."""
+    distinct = sorted(set(day_numbers))
+    periods = period_indexes(frequency, distinct)
+    if periods is None :
+        streak = Streak.from_day_numbers(frequency, distinct)
+    else :
+        streak = Streak.from_periods(frequency, periods)
+    return len(distinct), distinct[0], distinct[-1], streak.last_period, streak.current_run, streak.longest_run
+
+def _summarize(cursor, habit_ids = None) :
+    """Calculating the "habit_summary"-rows of these habits (of all habits without ids) from their completions again,
+    one habit after the other, in the order of the (habit_id, completion_day)-index."""
+    if habit_ids is None :
+        cursor.execute("DELETE FROM habit_summary")
+        chunks = [[]]
+    else :
+        habit_ids = list(habit_ids)
+        chunks = [habit_ids[i:i + 500] for i in range(0, len(habit_ids), 500)]
+    rows = 0
+    for chunk in chunks :
+        where = ""
+        if chunk :
+            where = f"WHERE h.id IN ({', '.join('?' * len(chunk))})"
+            cursor.execute(f"DELETE FROM habit_summary WHERE habit_id IN ({', '.join('?' * len(chunk))})", chunk)
+        # a 2nd cursor reads the completions, while the first one inserts the summaries
+        completions = cursor.connection.execute(f"""
+            SELECT h.id, h.user_id, h.frequency, c.completion_day
+            FROM habits AS h JOIN completions AS c ON c.habit_id = h.id
+            {where}
+            ORDER BY h.id, c.completion_day""", chunk)
+        summaries = ((habit_id, user_id) + _summary_row(frequency, [row[3] for row in group])
+                     for (habit_id, user_id, frequency), group in itertools.groupby(completions, key = lambda row : row[:3]))
+        cursor.executemany("""INSERT INTO habit_summary (habit_id, user_id, completed_days, first_day, last_day,
+                                                         last_period, current_run, longest_streak)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", summaries)
+        rows += cursor.rowcount
+    return rows
+
+# The id of DEFAULT_USER, the user of all habits from before there were users
+DEFAULT_USER_ID = 1
+
+MIGRATIONS = [_migration_create_tables, _migration_add_indexes, _migration_store_day_numbers, _migration_add_users,
+              _migration_add_summary, _migration_add_change_counter]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# The Julian day of day number 0 (see date.toordinal()), to convert between SQLite's date functions and day numbers
+JULIAN_DAY_OFFSET = 1721424.5
+
+def _period_sql(frequency, day) :
+    """Returns the SQL expression of the period index of a day number (see the period-module),
+    the calendar weeks and months are calculated by SQLite itself, other registered frequencies by period_index."""
+    return f"""CASE {frequency}
+                   WHEN 'daily' THEN {day}
+                   WHEN 'weekly' THEN ({day} - 1) / 7
+                   WHEN 'monthly' THEN CAST(strftime('%Y', {day} + :offset) AS INTEGER) * 12
+                                       + CAST(strftime('%m', {day} + :offset) AS INTEGER) - 1
+                   ELSE period_index({frequency}, {day})
+               END"""
+
+def _register_functions(connection) :
+    """Making the period indexes of all registered frequencies available to the SQL statements of a connection."""
+    connection.create_function("period_index", 2, period_index, deterministic = True)
+
+# Calculating the current streak, longest streak and missed periods of every habit inside SQLite,
+# the same way the analytics-class does it, without loading the completions into Python.
+# Every day is numbered by its period (day, calendar week or calendar month, see the period-module),
+# the periods of a habit count from the period of its start date until the current period.
+# The streaks use the "gaps and islands"-pattern : a completed period starts a new island (run)
+# whenever the previous period isn't exactly the one before it, and the running sum of those starts numbers the islands.
+# A habit with an unknown frequency has no periods, each of its days is a run of its own, like in the streak-class.
+STATISTICS_QUERY = f"""
+    WITH habit_periods AS (
+        SELECT id AS habit_id, name, frequency,
+               {_period_sql("frequency", "start_day")} AS first_period,
+               {_period_sql("frequency", ":today")} AS current_period
+        FROM habits
+        WHERE user_id = :user_id
+    ),
+    periods AS (
+        SELECT DISTINCT c.habit_id, h.first_period, h.current_period, h.current_period IS NOT NULL AS known,
+               COALESCE({_period_sql("h.frequency", "c.completion_day")}, c.completion_day) AS period
+        FROM habit_periods AS h JOIN completions AS c ON c.habit_id = h.habit_id
+    ),
+    islands AS (
+        SELECT habit_id, period,
+               SUM(new_run) OVER (PARTITION BY habit_id ORDER BY period ROWS UNBOUNDED PRECEDING) AS island
+        FROM (SELECT habit_id, period,
+                     CASE WHEN known AND period - LAG(period) OVER (PARTITION BY habit_id ORDER BY period) = 1
+                          THEN 0 ELSE 1 END AS new_run
+              FROM periods)
+    ),
+    runs AS (
+        SELECT habit_id, island, COUNT(*) AS length, MAX(period) AS last_period,
+               island = MAX(island) OVER (PARTITION BY habit_id) AS is_newest
+        FROM islands GROUP BY habit_id, island
+    ),
+    streaks AS (
+        SELECT habit_id, MAX(length) AS longest_streak,
+               MAX(CASE WHEN is_newest THEN length END) AS newest_length,
+               MAX(CASE WHEN is_newest THEN last_period END) AS newest_period
+        FROM runs GROUP BY habit_id
+    ),
+    completed AS (
+        -- only the completed periods between the start and today count
+        SELECT habit_id, COUNT(*) AS completed_periods, MAX(period = current_period) AS done_now
+        FROM periods
+        WHERE known AND period BETWEEN first_period AND current_period
+        GROUP BY habit_id
+    )
+    SELECT h.name, h.frequency,
+           CASE WHEN s.newest_period = h.current_period THEN s.newest_length ELSE 0 END AS current_streak,
+           COALESCE(s.longest_streak, 0) AS longest_streak,
+           CASE WHEN h.current_period IS NULL OR h.current_period < h.first_period THEN 0
+                ELSE MAX(0, h.current_period - h.first_period + COALESCE(c.done_now, 0) - COALESCE(c.completed_periods, 0))
+           END AS missed
+    FROM habit_periods AS h
+    LEFT JOIN streaks AS s ON s.habit_id = h.habit_id
+    LEFT JOIN completed AS c ON c.habit_id = h.habit_id
+    ORDER BY h.habit_id
+"""
 
 # "Database" class, to manage and store data related to the habits
 class Database :
-    # Constructor to initialize a database object, database name chosen is optional
-    def __init__(self, db_name = "habit_tracker.db") :
-        self.connection = sqlite3.connect(db_name) # Connect to the database (or create one)
-        self.cursor = self.connection.cursor() # Creates a "cursor" object, to be able to execute SQL commands
+    # Constructor to initialize a database object, database name chosen is optional.
+    # Every database object works with the habits of one user, see for_user for the other users of the same file
+    def __init__(self, db_name = "habit_tracker.db", user_name = DEFAULT_USER) :
+        # Connect to the database (or create one), the pool hands out the connections for reading and writing
+        self.pool = ConnectionPool(db_name)
+        self.connection = self.pool.writer # the connection for all writes
+        # Creates a "cursor" object on the writer connection, only used while holding the write lock
+        self.cursor = self.connection.cursor()
+        self.pool.add_connection_hook(_register_functions)
+        self._listeners = [] # functions that are called with the habit names, whenever habits or completions change
         self._create_tables() # Method to create necessary tables
+        self.user_name = user_name
+        self.user_id = self.get_user_id(user_name)
+
+    def for_user(self, user_name) :
+        """Returns a database object for the habits of another user, using the same connections,
+        so one file and one connection pool serve all users. The user is created if it doesn't exist yet."""
+        db = object.__new__(Database)
+        db.pool = self.pool
+        db.connection = self.connection
+        db.cursor = self.connection.cursor()
+        db._listeners = []
+        db.user_name = user_name
+        db.user_id = self.get_user_id(user_name)
+        return db
 
-    # Method to create the required tables for storing habit data
+    def get_user_id(self, user_name) :
+        """Returns the id of a user, creating the user if it doesn't exist yet."""
+        rows = self._read("SELECT id FROM users WHERE name = ?", (user_name,))
+        if rows :
+            return rows[0][0]
+        with self.pool.writing() :
+            self.cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (user_name,))
+            self._commit()
+            self.cursor.execute("SELECT id FROM users WHERE name = ?", (user_name,))
+            return self.cursor.fetchone()[0]
+
+    def get_users(self) :
+        """Returns the names of all users in the database file."""
+        return [row[0] for row in self._read("SELECT name FROM users ORDER BY id")]
+
+    # Method to create the required tables, or to upgrade the tables of an older database file
     def _create_tables(self) :
-        # SQL statement, creates a "habits" table to store habit information
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS habits (
-                                id INTEGER PRIMARY KEY,
-                                name TEXT,
-                                frequency TEXT,
-                                start_date TEXT)''')
-        # SQL statement, creates a "completion" table to record completions
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS completions (
-                                habit_id INTEGER,
-                                completion_date TEXT,
-                                FOREIGN KEY (habit_id) REFERENCES habits (id))''')
-        # Commit changes to the database to save the table creation
-        self.connection.commit()
-
-    def convert_to_date(self, date_str) :
-        """Convert string date to datetime.date object."""
-        try :
-            return datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-        except (ValueError, TypeError) :
-            print(f"Warning : Invalid date format : {date_str}")
-            return datetime.date.today()
+        with self.pool.writing() :
+            self.cursor.execute("PRAGMA user_version")
+            version = self.cursor.fetchone()[0]
+            # Running every migration the file hasn't seen yet, each one in its own transaction,
+            # so a failing migration leaves the file at the last working version
+            for new_version, migration in enumerate(MIGRATIONS[version:], version + 1) :
+                self.cursor.execute("BEGIN")
+                try :
+                    migration(self.cursor)
+                    # PRAGMA statements can't use "?"-parameters, but the version is always an integer
+                    self.cursor.execute(f"PRAGMA user_version = {new_version}")
+                    self.connection.commit()
+                except sqlite3.Error :
+                    self.connection.rollback()
+                    raise
+
+    def close(self) :
+        """Closing all connections to the database."""
+        self.pool.close()
+
+    def add_listener(self, listener) :
+        """Adding a function that's called whenever habits or completions are saved or deleted,
+        with the names of the changed habits, e.g. Analytics.invalidate."""
+        self._listeners.append(listener)
+
+    def _notify(self, habit_names) :
+        """Telling all listeners which habits have changed."""
+        habit_names = list(habit_names)
+        for listener in self._listeners :
+            listener(habit_names)
+
+    def _read(self, sql, parameters = ()) :
+        """Running a SELECT-statement on the read connection of the current thread, returns all rows."""
+        with self.pool.reading() as connection :
+            return connection.execute(sql, parameters).fetchall()
+
+    def _iterate(self, sql, parameters = (), chunk_size = 1000) :
+        """Running a SELECT-statement and returning its rows one by one, fetching "chunk_size" rows at a time,
+        so a huge result never has to fit into memory. The rows are read inside one read transaction,
+        so they all come from the same state of the database."""
+        with self.pool.reading() as connection :
+            in_transaction = connection.in_transaction
+            if not in_transaction :
+                connection.execute("BEGIN")
+            try :
+                cursor = connection.execute(sql, parameters)
+                rows = cursor.fetchmany(chunk_size)
+                while rows :
+                    yield from rows
+                    rows = cursor.fetchmany(chunk_size)
+            finally :
+                if not in_transaction :
+                    connection.commit()
+
+    def get_schema_version(self) :
+        """Returns the schema version of the database file."""
+        return self._read("PRAGMA user_version")[0][0]
+
+    @contextmanager
+    def transaction(self) :
+        """Grouping several writes into a single commit, used as "with db.transaction() :".
+        The write methods don't commit on their own inside the block, everything is committed at the end,
+        or rolled back if an exception leaves the block. Blocks can be nested, only the outermost one commits.
+        A nested block is a savepoint : if an exception leaves it, only its own writes are rolled back,
+        so an outer block that catches the exception doesn't commit them.
+        Other threads can't write while the block is open, but they can still read the last committed data."""
+        # the number of open blocks is kept by the pool, because the database objects of all users share the writer
+        with self.pool.writing() :
+            depth = self.pool.transaction_depth
+            if depth == 0 :
+                # started right away, so the savepoints of nested blocks are inside it, and releasing them doesn't commit
+                if not self.connection.in_transaction :
+                    self.cursor.execute("BEGIN")
+            else :
+                self.cursor.execute(f"SAVEPOINT block_{depth}")
+            self.pool.transaction_depth += 1
+            try :
+                yield self
+            except BaseException :
+                self.pool.transaction_depth -= 1
+                if depth == 0 :
+                    self.connection.rollback()
+                else :
+                    self.cursor.execute(f"ROLLBACK TO block_{depth}")
+                    self.cursor.execute(f"RELEASE block_{depth}")
+                raise
+            self.pool.transaction_depth -= 1
+            if depth == 0 :
+                self._count_changes()
+                self.connection.commit()
+            else :
+                self.cursor.execute(f"RELEASE block_{depth}")
+
+    def _commit(self) :
+        """Committing a write, unless it's part of a transaction-block, which commits at its end."""
+        if self.pool.transaction_depth == 0 :
+            self._count_changes()
+            self.connection.commit()
+
+    def _count_changes(self) :
+        """Raising the change counter of the file inside the transaction that's about to be committed,
+        if any rows were changed since the last commit, so it's committed together with the changes."""
+        if self.connection.total_changes != self.pool.counted_changes :
+            self.cursor.execute("UPDATE change_counter SET counter = counter + 1 WHERE id = 1")
+            self.pool.counted_changes = self.connection.total_changes
+
+    def get_habit_ids(self, habit_names = None) :
+        """Looking up the ids of several habits of the user at once, returns a dictionary with name -> id,
+        names that aren't in the database are left out. Without names, the ids of all habits are returned."""
+        if habit_names is None :
+            return dict(self._read("SELECT name, id FROM habits WHERE user_id = ?", (self.user_id,)))
+        habit_names = list(set(habit_names))
+        habit_ids = {}
+        # SQLite limits the number of "?"-parameters per statement, so the names are looked up in chunks
+        for i in range(0, len(habit_names), 500) :
+            chunk = habit_names[i:i + 500]
+            habit_ids.update(self._read(f"SELECT name, id FROM habits WHERE user_id = ? AND name IN ({', '.join('?' * len(chunk))})",
+                                        [self.user_id] + chunk))
+        return habit_ids
+
+    def get_invalid_dates(self) :
+        """Returns the dates that couldn't be read when the database was upgraded to day numbers,
+        as a list of (habit_id, column name, stored text)."""
+        return self._read("SELECT habit_id, column_name, value FROM invalid_dates ORDER BY habit_id")
 
     def save_habit(self, habit) :
-        """Save a habit to the database, making sure that the date is in the correct format"""
-        start_date = habit.start_date
-        if isinstance(start_date, datetime.date) :
-            start_date = start_date.strftime('%Y-%m_%d')
-        self.cursor.execute("INSERT INTO habits (name, frequency, start_date) VALUES (?, ?, ?)",
-                            (habit.name, habit.frequency, start_date))
-        self.connection.commit()
-
-    def load_habit(self) :
-        """Load all habits from the database."""
-        self.cursor.execute("SELECT * FROM habits")
-        # This returns a list of so called "tuples", 1 tuple per row, habit_id being assigned row[0]
-        rows = self.cursor.fetchall()
+        """Save a habit to the database, with its start date as a day number"""
+        start_day = to_day_number(habit.start_date)
+        if start_day is None :
+            print(f"Error : The habit '{habit.name}' has no valid start date")
+            return False
+        try :
+            with self.pool.writing() :
+                self.cursor.execute("INSERT INTO habits (user_id, name, frequency, start_day) VALUES (?, ?, ?, ?)",
+                                    (self.user_id, habit.name, habit.frequency, start_day))
+                self._commit()
+            self._notify([habit.name])
+            return True
+        # the unique index on the habit names doesn't allow a 2nd habit with the same name
+        except sqlite3.IntegrityError :
+            print(f"Error : A habit with the name '{habit.name}' already exists in the database")
+            return False
+
+    def save_habits(self, habits) :
+        """Saving many habits at once, with a single statement and a single commit.
+        Habits whose name already exists are skipped, returns the number of saved habits."""
+        rows = {}
+        for habit in habits :
+            start_day = to_day_number(habit.start_date)
+            if start_day is None :
+                print(f"Error : The habit '{habit.name}' has no valid start date")
+                continue
+            # the first habit with a name wins, like it would when saving them one after another
+            rows.setdefault(habit.name, (self.user_id, habit.name, habit.frequency, start_day))
+        try :
+            with self.pool.writing() :
+                existing = self.get_habit_ids(rows)
+                for name in existing :
+                    print(f"Error : A habit with the name '{name}' already exists in the database")
+                new_rows = [row for name, row in rows.items() if name not in existing]
+                self.cursor.executemany("INSERT INTO habits (user_id, name, frequency, start_day) VALUES (?, ?, ?, ?)",
+                                        new_rows)
+                self._commit()
+            self._notify(row[1] for row in new_rows)
+            return len(new_rows)
+        except sqlite3.Error as e :
+            print(f"Database error : {e}")
+            return 0
+
+    def load_habit(self, lazy = False, max_histories = 100, columnar = False) :
+        """Load all habits from the database, together with their completions.
+        Uses 2 queries in total (instead of 1 query per habit), and groups the completions in a single pass.
+        With "lazy = True", only the habits are loaded, the completions of a habit are loaded when they're first needed,
+        and only the "max_histories" most recently used ones are kept in memory (see the history-cache-class).
+        With "columnar = True", a habit-set is returned instead of a list, the rows go straight into its columns,
+        without creating a habit-object per habit, e.g. for reports on very many habits."""
+        if lazy :
+            history = HistoryCache(self, max_histories)
+            habits = []
+            for habit_id, name, frequency, start_day in self._read(
+                    "SELECT id, name, frequency, start_day FROM habits WHERE user_id = ? ORDER BY id", (self.user_id,)) :
+                habit = Habit(name = name, frequency = frequency, start_date = datetime.date.fromordinal(start_day))
+                habit.habit_id = habit_id
+                habit.load_lazily(history)
+                habits.append(habit)
+            return habits
+
+        # Both queries run on the same read connection, inside one read transaction,
+        # so a completion saved by another thread in between can't show up without its habit
+        with self.pool.reading() as connection :
+            in_transaction = connection.in_transaction
+            if not in_transaction :
+                connection.execute("BEGIN")
+            try :
+                # This returns a list of so called "tuples", 1 tuple per row, habit_id being assigned row[0]
+                # the habits of the user are found through the (user_id, name)-index
+                habit_rows = connection.execute("SELECT id, name, frequency, start_day FROM habits WHERE user_id = ? ORDER BY id",
+                                                (self.user_id,)).fetchall()
+                # All completions of those habits in one go, through the (habit_id, completion_day)-index
+                completion_rows = connection.execute("""
+                    SELECT completions.habit_id, completions.completion_day
+                    FROM habits JOIN completions ON completions.habit_id = habits.id
+                    WHERE habits.user_id = ?
+                    ORDER BY completions.habit_id, completions.completion_day""", (self.user_id,)).fetchall()
+            finally :
+                if not in_transaction :
+                    connection.commit()
+
+        if columnar :
+            # both queries are sorted by habit_id, so the completions of each habit follow each other
+            habits = HabitSet()
+            position = 0
+            for habit_id, name, frequency, start_day in habit_rows :
+                days = []
+                while position < len(completion_rows) and completion_rows[position][0] == habit_id :
+                    day = completion_rows[position][1]
+                    # a day that was saved twice is only added once
+                    if not days or day != days[-1] :
+                        days.append(day)
+                    position += 1
+                habits.append(name, frequency, start_day, days, habit_id)
+            return habits
+
+        # Grouping the completions by habit_id in a single pass, the stored day numbers are used as they are
+        # (see the completion-store-class), without parsing any date
+        completions_by_habit = {}
+        for habit_id, day in completion_rows :
+            completions_by_habit.setdefault(habit_id, []).append(day)
+
         habits = []
-        for row in rows :
-            from Habit import Habit
-            # convert start_date string to datetime.date
-            start_date = self.convert_to_date(row[3])
-            habit = Habit(name = row[1], frequency = row[2], start_date = start_date)
-            # Load and convert completion dates
-            self.cursor.execute("SELECT completion_date FROM completions WHERE habit_id = ?",
-                                (row[0],))
-            completion_dates = [self.convert_to_date(date[0]) for date in self.cursor.fetchall()]
-            habit.completed_dates = completion_dates
+        for habit_id, name, frequency, start_day in habit_rows :
+            habit = Habit(name = name, frequency = frequency, start_date = datetime.date.fromordinal(start_day))
+            habit.habit_id = habit_id
+            habit.completed_dates = CompletionStore.from_day_numbers(completions_by_habit.get(habit_id, []))
             habits.append(habit)
         return habits
 
+    def load_completions(self, habit_id) :
+        """Loading the completions of one habit as a completion store, using the (habit_id, completion_day)-index."""
+        rows = self._read("SELECT completion_day FROM completions WHERE habit_id = ? ORDER BY completion_day", (habit_id,))
+        return CompletionStore.from_day_numbers(row[0] for row in rows)
+
     def save_completion(self, habit, date) :
         """Saving a habit completion."""
-        if isinstance(date, datetime.date) :
-            date = date.strftime('%Y-%m-%d')
+        day = to_day_number(date)
+        if day is None :
+            return False
         try :
-            self.cursor.execute("SELECT id FROM habits WHERE name = ?", (habit.name,))
-            # unlike fetchall, fetchone is only loading 1 habit/tuple (with habit_id, name, frequency and start_date), not all of them
-            result = self.cursor.fetchone()
-            if result is None :
-                print(f"Error : Habit '{habit.name}' not found in the database")
-                return False
-            habit_id = result[0] # accessing the first element of the tuple
-            self.cursor.execute("INSERT INTO completions (habit_id, completion_date) VALUES (?, ?)",
-                                (habit_id, date))
-            self.connection.commit()
-            print(f"Completion for habit '{habit.name}' saved on {date}")
+            with self.pool.writing() :
+                self.cursor.execute("SELECT id FROM habits WHERE user_id = ? AND name = ?", (self.user_id, habit.name))
+                row = self.cursor.fetchone()
+                if row is None :
+                    print(f"Error : Habit '{habit.name}' not found in the database")
+                    return False
+                self._insert_completions([(row[0], day)])
+                self._commit()
+            # the dates in memory are saved now, so a lazily loaded habit can be unloaded again (see Habit.unload)
+            habit.mark_saved()
+            self._notify([habit.name])
+            print(f"Completion for habit '{habit.name}' saved on {datetime.date.fromordinal(day)}")
             return True
         except sqlite3.Error as e :
             print(f"Database error : {e}")
             return False
 
+    def save_completions(self, completions, habit_ids = None) :
+        """Saving many completions at once, e.g. to backfill the history of a habit.
+        "completions" is an iterable of (habit, date)-pairs, where the habit can also be just the habit name.
+        The habit ids are looked up once, and all rows are inserted with a single statement and a single commit,
+        dates that aren't valid are skipped. "habit_ids" can be a dictionary with name -> id that was already looked up
+        (see get_habit_ids),
+        e.g. when saving a big import batch by batch. Returns the number of saved completions,
+        without the ones of unknown habits, invalid dates and days the habit was already completed on."""
+        completions = list(completions)
+        habits = {id(habit) : habit for habit, date in completions if not isinstance(habit, str)}.values()
+        completions = [(habit if isinstance(habit, str) else habit.name, date) for habit, date in completions]
+        try :
+            with self.pool.writing() :
+                if habit_ids is None :
+                    habit_ids = self.get_habit_ids(name for name, date in completions)
+                rows = []
+                missing = set()
+                for name, date in completions :
+                    if name not in habit_ids :
+                        missing.add(name)
+                        continue
+                    day = to_day_number(date)
+                    if day is not None :
+                        rows.append((habit_ids[name], day))
+                for name in missing :
+                    print(f"Error : Habit '{name}' not found in the database")
+                saved = self._insert_completions(rows)
+                self._commit()
+            for habit in habits :
+                if habit.name in habit_ids :
+                    habit.mark_saved()
+            self._notify({name for name, date in completions if name in habit_ids})
+            return saved
+        except sqlite3.Error as e :
+            print(f"Database error : {e}")
+            return 0
+
+    def _insert_completions(self, rows) :
+        """Saving completions, (habit_id, day number)-pairs, and adding them to the "habit_summary"-rows of their habits,
+        on the writer, inside the transaction of the calling write. Days that are already completed, in the database
+        or earlier in "rows", aren't saved again and don't change the summary. Like the streak-class, only a completion
+        in an older period than the newest completed one needs the habit to be summarized from all of its completions again.
+        Returns the number of saved completions."""
+        new_days = {}
+        for habit_id, day in rows :
+            new_days.setdefault(habit_id, []).append(day)
+        habit_ids = list(new_days)
+        inserted = []
+        summaries = []
+        outdated = []
+        for i in range(0, len(habit_ids), 500) :
+            chunk = habit_ids[i:i + 500]
+            self.cursor.execute(f"""
+                SELECT h.id, h.user_id, h.frequency, s.completed_days, s.first_day, s.last_day,
+                       s.last_period, s.current_run, s.longest_streak
+                FROM habits AS h LEFT JOIN habit_summary AS s ON s.habit_id = h.id
+                WHERE h.id IN ({', '.join('?' * len(chunk))})""", chunk)
+            for habit_id, user_id, frequency, count, first_day, last_day, *saved in self.cursor.fetchall() :
+                days = sorted(set(new_days[habit_id]))
+                # only the days the habit wasn't completed on yet, found on the (habit_id, completion_day)-index
+                self.cursor.execute("""SELECT completion_day FROM completions
+                                       WHERE habit_id = ? AND completion_day BETWEEN ? AND ?""",
+                                    (habit_id, days[0], days[-1]))
+                completed = {row[0] for row in self.cursor.fetchall()}
+                days = [day for day in days if day not in completed]
+                if not days :
+                    continue
+                inserted.extend((habit_id, day) for day in days)
+                streak = Streak(frequency)
+                if count is None :
+                    count, first_day, last_day = 0, days[0], days[-1]
+                else :
+                    streak.last_period, streak.current_run, streak.longest_run = saved
+                if all(streak.add_day(day) for day in days) :
+                    summaries.append((habit_id, user_id, count + len(days), min(first_day, days[0]), max(last_day, days[-1]),
+                                      streak.last_period, streak.current_run, streak.longest_run))
+                else :
+                    outdated.append(habit_id)
+        self.cursor.executemany("INSERT INTO completions (habit_id, completion_day) VALUES (?, ?)", inserted)
+        self.cursor.executemany("""INSERT OR REPLACE INTO habit_summary (habit_id, user_id, completed_days, first_day, last_day,
+                                                                         last_period, current_run, longest_streak)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", summaries)
+        if outdated :
+            _summarize(self.cursor, outdated)
+        return len(inserted)
+
+    def rebuild_summary(self) :
+        """Calculating the "habit_summary"-rows of all habits of all users from their completions again,
+        e.g. after completions were written without the database-class, or after a frequency was registered.
+        Returns the number of habits with completions."""
+        with self.transaction() :
+            return _summarize(self.cursor)
+
+    def get_summaries(self, today = None) :
+        """Returns the summary of every habit of the user from the "habit_summary"-table, without reading any completions,
+        as a dictionary with the habit name -> frequency, completed_days, first_completion, last_completion (as dates,
+        None without completions), current_streak and longest_streak."""
+        return summaries_from_rows(self.get_summary_rows()[1], today)
+
+    def get_summary_rows(self) :
+        """Returns the id, the change counter and the schema version of the database file
+        (see _migration_add_change_counter), and the "habit_summary"-rows of all habits of the user (name, frequency,
+        completed days, first day, last day, newest completed period, run and longest streak),
+        all read in the same read transaction, so the counter belongs to the rows."""
+        with self.pool.reading() as connection :
+            in_transaction = connection.in_transaction
+            if not in_transaction :
+                connection.execute("BEGIN")
+            try :
+                change = connection.execute("""SELECT database_id, counter, user_version
+                                               FROM change_counter, pragma_user_version""").fetchone()
+                rows = connection.execute("""
+                    SELECT h.name, h.frequency, s.completed_days, s.first_day, s.last_day,
+                           s.last_period, s.current_run, s.longest_streak
+                    FROM habits AS h LEFT JOIN habit_summary AS s ON s.habit_id = h.id
+                    WHERE h.user_id = ? ORDER BY h.id""", (self.user_id,)).fetchall()
+            finally :
+                if not in_transaction :
+                    connection.commit()
+        return change, rows
+
+    def get_longest_streak_in_database(self) :
+        """Returns the name of the habit with the longest streak and the streak itself, like
+        Analytics.get_longest_streak_for_all (the oldest habit wins a tie), with a single lookup on the
+        (user_id, longest_streak)-index. (None, 0) if no habit has been completed yet."""
+        rows = self._read("""SELECT h.name, s.longest_streak
+                             FROM habit_summary AS s JOIN habits AS h ON h.id = s.habit_id
+                             WHERE s.user_id = ?
+                             ORDER BY s.longest_streak DESC, s.habit_id LIMIT 1""", (self.user_id,))
+        return rows[0] if rows else (None, 0)
 
-    def get_completions(self, habit, date) :
-        """Fetching completions for a given habit."""
-        self.cursor.execute("""
-            SELECT completion_date 
-            FROM completions 
-            WHERE habit_id = (SELECT id FROM habits WHERE name = ?)""", (habit.name,))
-        return [self.convert_to_date(row[0]) for row in self.cursor.fetchall()]
+    def iterate_habits(self) :
+        """Returns the name, frequency and start date (as a date object) of every habit, one habit at a time."""
+        for name, frequency, start_day in self._iterate("SELECT name, frequency, start_day FROM habits WHERE user_id = ? ORDER BY id",
+                                                        (self.user_id,)) :
+            yield name, frequency, datetime.date.fromordinal(start_day)
+
+    def iterate_completions(self) :
+        """Returns the habit name and the date (as a "YYYY-MM-DD"-string) of every completion, one completion at a time,
+        ordered by habit and date, using the (habit_id, completion_day)-index."""
+        # SQLite's date() writes the string, which is faster than creating a date object per row in Python
+        return self._iterate("""
+            SELECT habits.name, date(completions.completion_day + ?)
+            FROM completions JOIN habits ON habits.id = completions.habit_id
+            WHERE habits.user_id = ?
+            ORDER BY completions.habit_id, completions.completion_day""", (JULIAN_DAY_OFFSET, self.user_id))
+
+    def get_completions(self, habit, date = None, since = None, until = None, limit = None, offset = 0,
+                        newest_first = False, after = None) :
+        """Fetching completions for a given habit, oldest first (or newest first with "newest_first").
+        "date" only returns that date (if the habit was completed then), "since" and "until" limit the dates
+        to a range (both included), "limit" and "offset" return one page of the dates.
+        For paging through a long history, "after" is faster than an offset : it's the last date of the previous page,
+        and the next page starts right after it (before it, with "newest_first").
+        The (habit_id, completion_day)-index finds the first date and returns them already sorted,
+        so only the rows of the page are read."""
+        if habit.habit_id is not None :
+            conditions = ["habit_id = ?"]
+            parameters = [habit.habit_id]
+        else :
+            conditions = ["habit_id = (SELECT id FROM habits WHERE user_id = ? AND name = ?)"]
+            parameters = [self.user_id, habit.name]
+        if date is not None :
+            since = until = date
+        if since is not None :
+            conditions.append("completion_day >= ?")
+            parameters.append(since.toordinal())
+        if until is not None :
+            conditions.append("completion_day <= ?")
+            parameters.append(until.toordinal())
+        if after is not None :
+            conditions.append("completion_day < ?" if newest_first else "completion_day > ?")
+            parameters.append(after.toordinal())
+        sql = f"""
+            SELECT DISTINCT completion_day
+            FROM completions
+            WHERE {' AND '.join(conditions)}
+            ORDER BY completion_day {'DESC' if newest_first else 'ASC'}"""
+        if limit is not None or offset :
+            sql += " LIMIT ? OFFSET ?"
+            parameters += [-1 if limit is None else limit, offset]
+        return [datetime.date.fromordinal(row[0]) for row in self._read(sql, parameters)]
+
+    def get_statistics_in_database(self, today = None) :
+        """Calculating the current streak, longest streak and missed periods of every habit with a single query,
+        without loading the completions into Python (see STATISTICS_QUERY above).
+        Returns a dictionary with the habit name -> frequency, current_streak, longest_streak and missed,
+        the same numbers the analytics-class calculates."""
+        today = today if today else datetime.date.today()
+        rows = self._read(STATISTICS_QUERY, {'today' : today.toordinal(), 'offset' : JULIAN_DAY_OFFSET, 'user_id' : self.user_id})
+        return {name : {'frequency' : frequency, 'current_streak' : current_streak,
+                        'longest_streak' : longest_streak, 'missed' : missed}
+                for name, frequency, current_streak, longest_streak, missed in rows}
 
     def delete_habit(self, habit_name) :
         """Delete a habit from the database, including its completions."""
         # Delete completions related to the habit first
         try :
-            self.cursor.execute("SELECT id FROM habits WHERE name = ?",(habit_name,))
-            result = self.cursor.fetchone()
-            if result is None :
-                print(f"Habit '{habit_name}' not found in database !")
-                return False
-            habit_id = result[0]
-            self.cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit_id,))
-            # Then delete the habit itself
-            self.cursor.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-            self.connection.commit()
+            with self.pool.writing() :
+                self.cursor.execute("SELECT id FROM habits WHERE user_id = ? AND name = ?", (self.user_id, habit_name))
+                result = self.cursor.fetchone()
+                if result is None :
+                    print(f"Habit '{habit_name}' not found in database !")
+                    return False
+                habit_id = result[0]
+                self.cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit_id,))
+                self.cursor.execute("DELETE FROM habit_summary WHERE habit_id = ?", (habit_id,))
+                # Then delete the habit itself
+                self.cursor.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+                self._commit()
+            self._notify([habit_name])
             return True
         except sqlite3.Error as e :
             print(f"Database error : {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def merge_file(self, path) :
+        """Folding the habits and completions of another database file (e.g. the file of a single user)
+        into the habits of this user, with 2 statements. Habits the user already has keep their frequency
+        and start date, only completions they don't have yet are added.
+        Returns a dictionary with the number of added habits and added completions."""
+        if not os.path.exists(path) :
+            raise FileNotFoundError(f"No such database file : '{path}'")
+        if self.pool.transaction_depth :
+            raise sqlite3.OperationalError("A database file can't be merged inside a transaction-block, "
+                                           "SQLite can't attach it while a transaction is open")
+        with tempfile.TemporaryDirectory() as directory :
+            # The file is copied first (read-only, through the backup API, so the rows of its WAL-file come along),
+            # opening the copy once upgrades it to the current schema, so its habits belong to the default user.
+            # The user's own file stays as it was, with its old schema version and journal mode.
+            copy = os.path.join(directory, "source.db")
+            source = sqlite3.connect(pathlib.Path(path).absolute().as_uri() + "?mode=ro", uri = True)
+            try :
+                target = sqlite3.connect(copy)
+                try :
+                    source.backup(target)
+                finally :
+                    target.close()
+            finally :
+                source.close()
+            Database(copy).close()
+            names, counts = self._merge_copy(copy)
+        self._notify(names)
+        return counts
+
+    def _merge_copy(self, path) :
+        """Merging the upgraded copy of a database file (see merge_file), returns the names of its habits
+        and the dictionary with the numbers of added habits and completions."""
+        with self.pool.writing() :
+            # ATTACH can't run inside a transaction, the file is attached to the writer for the merge only
+            self.cursor.execute("ATTACH DATABASE ? AS source", (path,))
+            try :
+                with self.transaction() :
+                    self.cursor.execute("""
+                        INSERT OR IGNORE INTO habits (user_id, name, frequency, start_day)
+                        SELECT ?, name, frequency, start_day FROM source.habits WHERE user_id = ? ORDER BY id""",
+                        (self.user_id, DEFAULT_USER_ID))
+                    habits = self.cursor.rowcount
+                    # the habits are matched by name, through the (user_id, name)-index
+                    self.cursor.execute("""
+                        INSERT INTO completions (habit_id, completion_day)
+                        SELECT DISTINCT h.id, c.completion_day
+                        FROM source.habits AS s
+                        JOIN source.completions AS c ON c.habit_id = s.id
+                        JOIN main.habits AS h ON h.user_id = ? AND h.name = s.name
+                        WHERE s.user_id = ? AND NOT EXISTS (
+                            SELECT 1 FROM main.completions AS old
+                            WHERE old.habit_id = h.id AND old.completion_day = c.completion_day)""",
+                        (self.user_id, DEFAULT_USER_ID))
+                    completions = self.cursor.rowcount
+                    self.cursor.execute("""
+                        SELECT h.id FROM source.habits AS s
+                        JOIN main.habits AS h ON h.user_id = ? AND h.name = s.name
+                        WHERE s.user_id = ?""", (self.user_id, DEFAULT_USER_ID))
+                    _summarize(self.cursor, [row[0] for row in self.cursor.fetchall()])
+                    self.cursor.execute("SELECT name FROM source.habits WHERE user_id = ?", (DEFAULT_USER_ID,))
+                    names = [row[0] for row in self.cursor.fetchall()]
+            finally :
+                self.cursor.execute("DETACH DATABASE source")
+        return names, {'habits' : habits, 'completions' : completions}
\ No newline at end of file
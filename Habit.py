@@ -1,18 +1,127 @@
 import datetime
+from Streak import Streak
+from Period import period_indexes
+from CompletionStore import CompletionStore
 
 class Habit :
+    # no __dict__ per habit, only these attributes, "__weakref__" for the saved results of the analytics-class
+    __slots__ = ('name', 'frequency', 'start_date', 'habit_id', '_version', '_completed_dates', '_history', '_streak',
+                 '_streak_version', '_periods', '__weakref__')
+
     def __init__(self, name, frequency, start_date = None) :
         """Constructor to initialize a habit, with a name, frequency and a start date."""
         self.name = name
         self.frequency = frequency # e.g., daily, weekly
         # If a start date was entered, it saves this value, if this field stays empty, today's date will automatically be assigned
         self.start_date = start_date if start_date else datetime.date.today()
+        self.habit_id = None # the id in the database, set when the habit is loaded from the database
+        self._version = 0 # counts how often the completion dates were replaced, see get_version
         self.completed_dates = [] # Store completion dates
 
+    @property
+    def completed_dates(self) :
+        """The completion dates, sorted and every date only once (see the completion-store-class).
+        For a habit loaded lazily, they're loaded from the database the first time they're needed."""
+        if self._history is not None :
+            if self._completed_dates is None :
+                self._completed_dates = self._history.load(self)
+            else :
+                self._history.touch(self)
+        return self._completed_dates
+
+    @completed_dates.setter
+    def completed_dates(self, dates) :
+        """Replacing the completion dates, the streak will be recalculated the next time it's needed."""
+        self._completed_dates = dates if isinstance(dates, CompletionStore) else CompletionStore(dates)
+        self._version += 1
+        self._history = None # dates that were set directly are never unloaded
+        self._streak = None
+        self._streak_version = None # the version of the completion store the streak was calculated for
+        self._periods = None # the completed periods, with the version of the completion store and the frequency
+
+    def load_lazily(self, history) :
+        """Letting the history-cache-class load the completion dates, when they're first needed."""
+        self._history = history
+        self._completed_dates = None
+        self._version += 1
+        self._streak = None
+        self._periods = None
+
+    def get_version(self) :
+        """Returns a value that changes whenever the completion dates change,
+        e.g. so the analytics-class knows when its saved results are outdated.
+        Doesn't load the completion dates of a lazily loaded habit."""
+        # the completion store counts the added dates itself, an unloaded store was unchanged (see unload)
+        return self._version, self._completed_dates.version if self._completed_dates is not None else 0
+
+    def is_loaded(self) :
+        """Returns whether the completion dates are in memory."""
+        return self._completed_dates is not None
+
+    def unload(self) :
+        """Removing the completion dates from memory, they'll be loaded again when needed.
+        Only possible for habits that are loaded lazily and haven't been changed since loading or since they were saved
+        (see mark_saved), returns whether it worked."""
+        if self._history is None or self._completed_dates is None or self._completed_dates.version != 0 :
+            return False
+        self._completed_dates = None
+        self._streak = None
+        self._periods = None
+        return True
+
+    def mark_saved(self) :
+        """Telling the habit that its completion dates are saved in the database (see Database.save_completion),
+        so a lazily loaded habit can be unloaded again. The changes of the completion store are folded into the
+        own version, so get_version still returns a new value, and the streak and the periods stay up to date."""
+        store = self._completed_dates
+        if store is None or store.version == 0 :
+            return
+        self._version += 1
+        # a streak or periods of an older version of the store would look up to date after the store starts from 0 again
+        self._streak_version = 0 if self._streak_version == store.version else None
+        if self._periods is not None :
+            self._periods = ((0, self._periods[0][1]), self._periods[1]) if self._periods[0][0] == store.version else None
+        store.version = 0
+
     def mark_as_done(self) :
         """Method to mark the habit as done on the current date, and adds the newest date to the "completed dates"-list."""
         today = datetime.date.today()
-        self.completed_dates.append(today)
+        self.add_completion(today)
+
+    def add_completion(self, date) :
+        """Adding a completion date, and updating the streak with only this date, instead of recalculating it.
+        Returns False if the habit was already completed on that date."""
+        completed_dates = self.completed_dates
+        streak_is_current = self._streak is not None and self._streak_version == completed_dates.version
+        if not completed_dates.add(date) :
+            return False
+        # if the date is older than the newest completion, the streak is recalculated the next time it's needed
+        if streak_is_current and self._streak.add(date) :
+            self._streak_version = completed_dates.version
+        return True
+
+    def get_streak(self) :
+        """Returns the streak of the habit (see the streak-class),
+        it's only calculated from all dates if the dates were replaced or changed without using add_completion."""
+        completed_dates = self.completed_dates
+        if (self._streak is None or self._streak_version != completed_dates.version
+                or self._streak.frequency != self.frequency) :
+            periods = self.get_periods()
+            if periods is None :
+                self._streak = Streak.from_day_numbers(self.frequency, completed_dates.day_numbers)
+            else :
+                self._streak = Streak.from_periods(self.frequency, periods)
+            self._streak_version = completed_dates.version
+        return self._streak
+
+    def get_periods(self) :
+        """Returns the sorted indexes of the completed periods (see the period-module), None for an unknown frequency.
+        They're only calculated again after the completion dates or the frequency changed."""
+        completed_dates = self.completed_dates
+        key = (completed_dates.version, self.frequency)
+        if self._periods is None or self._periods[0] != key :
+            self._periods = (key, period_indexes(self.frequency, completed_dates.day_numbers))
+        return self._periods[1]
 
     def get_start_date(self) :
         """Method to return the start date of the habit."""
@@ -20,4 +129,4 @@ class Habit :
 
     def print_start_date(self) :
         """Printing the start date of a habit."""
-        print(f"Start date of '{self.name}' : {self.start_date}")
\ No newline at end of file
+        print(f"Start date of '{self.name}' : {self.start_date}")
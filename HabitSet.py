@@ -0,0 +1,105 @@
+"""This class holds many habits in a few flat arrays ("columns") instead of one habit-object per habit,
+e.g. for report workers with hundreds of thousands of habits. Per habit, it stores the name, a frequency code
+(the position of the frequency in "frequencies"), the start day number and the id in the database.
+The completion day numbers of all habits are in a single array('i'), the days of the i-th habit are
+days[offsets[i]:offsets[i + 1]], sorted and every day only once (like the rows of a sparse matrix in CSR format).
+The analytics-class calculates the statistics straight from the columns (see Analytics._get_set_results).
+habit_set[i], habit_set.get(name) and looping over the set return habit-objects ("views") with a copy of the data,
+e.g. for the CLI, changing a view doesn't change the set."""
+import datetime
+from array import array
+from CompletionStore import CompletionStore
+from Habit import Habit
+
+class HabitSet :
+    __slots__ = ('names', 'frequencies', 'codes', 'starts', 'habit_ids', 'offsets', 'days', '_by_name')
+
+    def __init__(self, habits = ()) :
+        """Constructor, creating the set from any number of habit-objects."""
+        self.names = [] # the name of every habit
+        self.frequencies = [] # the distinct frequencies, a frequency code is a position in this list
+        self.codes = array('h') # the frequency code of every habit
+        self.starts = array('i') # the start day number of every habit
+        self.habit_ids = array('q') # the id of every habit in the database, 0 for a habit that isn't saved
+        self.offsets = array('q', [0]) # where the days of every habit start in "days", and where the last ones end
+        self.days = array('i') # the completion day numbers of all habits
+        self._by_name = None # name -> position, only created when a habit is first looked up by name
+        for habit in habits :
+            self.append_habit(habit)
+
+    def append(self, name, frequency, start_day, day_numbers = (), habit_id = None) :
+        """Adding a habit from its columns, "day_numbers" have to be sorted and every day only once,
+        like the day numbers of a completion store."""
+        if frequency not in self.frequencies :
+            self.frequencies.append(frequency)
+        self.names.append(name)
+        self.codes.append(self.frequencies.index(frequency))
+        self.starts.append(start_day)
+        self.habit_ids.append(habit_id if habit_id else 0)
+        self.days.extend(day_numbers)
+        self.offsets.append(len(self.days))
+        if self._by_name is not None :
+            self._by_name.setdefault(name, len(self.names) - 1)
+
+    def append_habit(self, habit) :
+        """Adding a copy of a habit-object."""
+        self.append(habit.name, habit.frequency, habit.start_date.toordinal(), habit.completed_dates.day_numbers,
+                    habit.habit_id)
+
+    def frequency(self, index) :
+        """Returns the frequency of the habit at this position."""
+        return self.frequencies[self.codes[index]]
+
+    def day_numbers(self, index) :
+        """Returns the sorted completion day numbers of the habit at this position, as an array."""
+        return self.days[self.offsets[index]:self.offsets[index + 1]]
+
+    def rows(self) :
+        """Returns the name, frequency, start day number and completion day numbers of every habit,
+        one habit at a time, without creating habit-objects."""
+        frequencies, codes, starts, offsets, days = self.frequencies, self.codes, self.starts, self.offsets, self.days
+        for index, name in enumerate(self.names) :
+            yield name, frequencies[codes[index]], starts[index], days[offsets[index]:offsets[index + 1]]
+
+    def newest(self, index, count = None) :
+        """Returns the newest "count" completion dates of the habit at this position (or all of them), newest first,
+        like CompletionStore.newest."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        if count is not None :
+            start = max(start, end - count)
+        return [datetime.date.fromordinal(day) for day in reversed(self.days[start:end])]
+
+    def names_by_frequency(self, frequency) :
+        """Returns the names of the habits with this frequency, in the order of the set."""
+        if frequency not in self.frequencies :
+            return []
+        code = self.frequencies.index(frequency)
+        return [name for name, habit_code in zip(self.names, self.codes) if habit_code == code]
+
+    def get(self, name) :
+        """Returns a habit-object of the first habit with this name, or None if there isn't one."""
+        if self._by_name is None :
+            self._by_name = {}
+            for index, habit_name in enumerate(self.names) :
+                self._by_name.setdefault(habit_name, index)
+        index = self._by_name.get(name)
+        return None if index is None else self[index]
+
+    def __len__(self) :
+        return len(self.names)
+
+    def __getitem__(self, index) :
+        """Returns a habit-object with a copy of the data of the habit at this position (or a list for a slice)."""
+        if isinstance(index, slice) :
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = range(len(self))[index] # negative positions, and an IndexError outside of the set
+        habit = Habit(self.names[index], self.frequency(index), datetime.date.fromordinal(self.starts[index]))
+        habit.habit_id = self.habit_ids[index] if self.habit_ids[index] else None
+        habit.completed_dates = CompletionStore.from_day_numbers(self.day_numbers(index))
+        return habit
+
+    def __iter__(self) :
+        return (self[index] for index in range(len(self)))
+
+    def __repr__(self) :
+        return f"HabitSet({len(self)} habits, {len(self.days)} completions)"
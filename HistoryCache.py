@@ -0,0 +1,45 @@
+"""This class loads the completion history of a habit from the database the first time it's needed,
+and keeps at most a certain number of histories in memory (the ones used most recently).
+Habits loaded with Database.load_habit(lazy = True) use it, so the app can start without reading every completion."""
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+class HistoryCache :
+    def __init__(self, db, max_habits = 100) :
+        """Constructor, "max_habits" is the number of completion histories that are kept in memory."""
+        self.db = db
+        self.max_habits = max_habits
+        # habit_id -> weak reference to the habit, the most recently used habit is at the end,
+        # a habit that was removed from the user isn't kept in memory by the cache, its entry is dropped with it
+        self._resident = OrderedDict()
+
+    def load(self, habit) :
+        """Loading the completion history of a habit, returns its completion store."""
+        store = self.db.load_completions(habit.habit_id)
+        self._resident[habit.habit_id] = weakref.ref(habit, partial(self._forget, habit.habit_id))
+        self._evict()
+        return store
+
+    def _forget(self, habit_id, reference) :
+        """Dropping the entry of a habit that doesn't exist anymore (called by its weak reference)."""
+        if self._resident.get(habit_id) is reference :
+            del self._resident[habit_id]
+
+    def touch(self, habit) :
+        """Marking the history of a habit as recently used."""
+        if habit.habit_id in self._resident :
+            self._resident.move_to_end(habit.habit_id)
+
+    def _evict(self) :
+        """Unloading the least recently used histories, until there are at most "max_habits" left.
+        Histories that were changed since loading are kept, they could contain completions that aren't saved yet."""
+        for habit_id, reference in list(self._resident.items()) :
+            if len(self._resident) <= self.max_habits :
+                break
+            habit = reference()
+            if habit is None or habit.unload() :
+                self._resident.pop(habit_id, None)
+
+    def __len__(self) :
+        return len(self._resident)
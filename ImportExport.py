@@ -0,0 +1,165 @@
+"""This class imports and exports habits and completions as CSV or JSON Lines files.
+The files are streamed : records are read, checked and saved in batches of "batch_size" rows,
+and exported rows are written while they're read from the database, so even files with millions of completions
+never have to fit into memory.
+
+CSV files hold either habits (columns name,frequency,start_date) or completions (columns habit,date),
+the header row is optional. JSON Lines files hold one object per line and can mix both :
+    {"type": "habit", "name": "Exercise", "frequency": "daily", "start_date": "2024-01-01"}
+    {"type": "completion", "habit": "Exercise", "date": "2024-01-02"}"""
+import csv
+import datetime
+import itertools
+import json
+from Habit import Habit
+from Period import FREQUENCIES
+
+FORMATS = ["csv", "jsonl"]
+HABIT_COLUMNS = ["name", "frequency", "start_date"]
+COMPLETION_COLUMNS = ["habit", "date"]
+
+def guess_format(path) :
+    """Returns the file format from the file extension, "csv" if it's unknown."""
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+def parse_date(text) :
+    """Converting a "YYYY-MM-DD"-string to a date object, returns None for an invalid or missing date."""
+    try :
+        return datetime.date.fromisoformat(text)
+    except (ValueError, TypeError) :
+        return None
+
+def valid_habit(record) :
+    """Whether a ("habit", name, frequency, start_date)-record can be saved : it needs a name, a registered frequency,
+    and a start date that's either valid or missing (then the habit starts today)."""
+    return bool(record[1]) and record[2] in FREQUENCIES and (not record[3] or parse_date(record[3]) is not None)
+
+def batches(records, size) :
+    """Splitting an iterable into lists of at most "size" elements, without reading ahead any further."""
+    records = iter(records)
+    batch = list(itertools.islice(records, size))
+    while batch :
+        yield batch
+        batch = list(itertools.islice(records, size))
+
+class ImportExport :
+    def __init__(self, db, batch_size = 5000, progress = None) :
+        """Constructor, "batch_size" is the number of rows that are saved (and committed) together,
+        "progress" is an optional function that is called with the number of processed rows after every batch."""
+        self.db = db
+        self.batch_size = batch_size
+        self.progress = progress
+
+    def read_csv(self, file) :
+        """Reading the records of a CSV file, as ("habit", name, frequency, start_date) or ("completion", habit, date).
+        Without a header row, rows with 3 columns are habits and rows with 2 columns are completions."""
+        for row in csv.reader(file) :
+            if not row or row == HABIT_COLUMNS or row == COMPLETION_COLUMNS :
+                continue
+            if len(row) >= 3 :
+                yield "habit", row[0], row[1], row[2]
+            else :
+                yield "completion", row[0], row[1] if len(row) > 1 else None
+
+    def read_jsonl(self, file) :
+        """Reading the records of a JSON Lines file, in the same form as read_csv.
+        Objects without a "type" are completions if they have a "date", otherwise habits."""
+        for line in file :
+            line = line.strip()
+            if not line :
+                continue
+            try :
+                record = json.loads(line)
+            except json.JSONDecodeError :
+                yield "invalid", line
+                continue
+            if not isinstance(record, dict) :
+                yield "invalid", line
+            elif record.get("type", "completion" if "date" in record else "habit") == "completion" :
+                yield "completion", record.get("habit"), record.get("date")
+            else :
+                yield "habit", record.get("name"), record.get("frequency", "daily"), record.get("start_date")
+
+    def read_records(self, file, file_format) :
+        """Reading the records of a file in one of the FORMATS."""
+        if file_format not in FORMATS :
+            raise ValueError(f"unknown format '{file_format}', expected one of {', '.join(FORMATS)}")
+        return self.read_jsonl(file) if file_format == "jsonl" else self.read_csv(file)
+
+    def import_file(self, file, file_format = "csv") :
+        """Importing the habits and completions of a file, batch by batch.
+        Habits that already exist are skipped, as well as habits with an unknown frequency or an invalid start date,
+        and completions with an invalid date, an unknown habit or a day that's already saved,
+        so importing the same file twice doesn't add anything.
+        Returns a dictionary with the number of saved habits, saved completions and skipped records."""
+        counts = {'habits' : 0, 'completions' : 0, 'skipped' : 0}
+        # the ids of all habits are looked up once, new habits are added to the map when they are saved
+        habit_ids = self.db.get_habit_ids()
+        processed = 0
+        for batch in batches(self.read_records(file, file_format), self.batch_size) :
+            habits = {}
+            completions = []
+            for record in batch :
+                if record[0] == "habit" and valid_habit(record) :
+                    habits.setdefault(record[1], Habit(record[1], record[2], parse_date(record[3])))
+                elif record[0] == "completion" and record[1] and (date := parse_date(record[2])) :
+                    completions.append((record[1], date))
+                else :
+                    print(f"Warning : Skipping invalid record : {record[1:]}")
+                    counts['skipped'] += 1
+            # the habits of a batch are saved first, so completions of the same batch can already use them
+            new_habits = [habit for name, habit in habits.items() if name not in habit_ids]
+            counts['skipped'] += len(habits) - len(new_habits)
+            if new_habits :
+                with self.db.transaction() :
+                    counts['habits'] += self.db.save_habits(new_habits)
+                    habit_ids.update(self.db.get_habit_ids(habit.name for habit in new_habits))
+            if completions :
+                saved = self.db.save_completions(completions, habit_ids)
+                counts['completions'] += saved
+                counts['skipped'] += len(completions) - saved
+            processed += len(batch)
+            if self.progress :
+                self.progress(processed)
+        return counts
+
+    def export_file(self, file, file_format = "csv", what = "all") :
+        """Writing the habits ("habits"), the completions ("completions") or both ("all") to a file.
+        A CSV file can only hold one of them, so "all" means only the completions there.
+        Returns the number of written rows."""
+        if file_format not in FORMATS :
+            raise ValueError(f"unknown format '{file_format}', expected one of {', '.join(FORMATS)}")
+        if file_format == "csv" and what == "all" :
+            what = "completions"
+        written = 0
+        if file_format == "csv" :
+            writer = csv.writer(file, lineterminator = "\n")
+            if what == "habits" :
+                writer.writerow(HABIT_COLUMNS)
+                for batch in batches(self.db.iterate_habits(), self.batch_size) :
+                    writer.writerows((name, frequency, start_date.isoformat()) for name, frequency, start_date in batch)
+                    written = self._report(written + len(batch))
+            else :
+                writer.writerow(COMPLETION_COLUMNS)
+                for batch in batches(self.db.iterate_completions(), self.batch_size) :
+                    writer.writerows(batch)
+                    written = self._report(written + len(batch))
+            return written
+        if what in ("habits", "all") :
+            for batch in batches(self.db.iterate_habits(), self.batch_size) :
+                file.writelines(json.dumps({"type" : "habit", "name" : name, "frequency" : frequency,
+                                            "start_date" : start_date.isoformat()}) + "\n"
+                                for name, frequency, start_date in batch)
+                written = self._report(written + len(batch))
+        if what in ("completions", "all") :
+            for batch in batches(self.db.iterate_completions(), self.batch_size) :
+                file.writelines(json.dumps({"type" : "completion", "habit" : name, "date" : date}) + "\n"
+                                for name, date in batch)
+                written = self._report(written + len(batch))
+        return written
+
+    def _report(self, processed) :
+        """Calling the progress function, returns the number of processed rows."""
+        if self.progress :
+            self.progress(processed)
+        return processed
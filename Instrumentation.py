@@ -0,0 +1,168 @@
+"""This class measures where the time of the app goes, it's only used when it's switched on ("--timings").
+It wraps the methods of a database- and an analytics-object, and counts for every method the calls,
+the total time, the median (p50) and the 99th percentile (p99) of the call times and the rows returned by queries.
+Every SQL statement is also traced through SQLite's trace callback, timed and logged to the "habit_tracker.sql" logger.
+A statement's time runs until the next statement of the same thread starts, or until the database method
+that ran it returns, so it includes fetching its rows."""
+import cProfile
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("habit_tracker.sql")
+
+# Only the newest call times of each method are kept for the percentiles, so a long session doesn't grow without limit
+MAX_SAMPLES = 10000
+# The values in a traced statement (texts and numbers), which are replaced by "?" to count the same statements together
+VALUES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+class Counter :
+    def __init__(self) :
+        """Constructor, an empty counter for one method or SQL statement."""
+        self.calls = 0
+        self.total = 0.0 # seconds
+        self.rows = 0
+        self.samples = deque(maxlen = MAX_SAMPLES)
+
+    def add(self, seconds, rows = None) :
+        """Counting one call."""
+        self.calls += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        if rows is not None :
+            self.rows += rows
+
+    def percentile(self, percent) :
+        """Returns the call time that "percent" percent of the calls didn't exceed (nearest rank)."""
+        if not self.samples :
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[max(0, -(-len(ordered) * percent // 100) - 1)]
+
+class Instrumentation :
+    def __init__(self) :
+        """Constructor, without any counters, see instrument_database and instrument_analytics."""
+        self.counters = {} # name -> counter
+        self._lock = threading.Lock()
+        self._local = threading.local() # the statement that's currently running in each thread
+
+    def record(self, name, seconds, rows = None) :
+        """Counting a call of a method or statement."""
+        with self._lock :
+            counter = self.counters.get(name)
+            if counter is None :
+                counter = self.counters[name] = Counter()
+            counter.add(seconds, rows)
+
+    def wrap(self, name, method, count_rows = False) :
+        """Returns the method wrapped with a timer, "count_rows" also counts the length of a returned list
+        (e.g. the rows of a query or the loaded habits). A method that returns a generator (e.g. iterate_completions)
+        is timed until the generator is used up or closed, and its rows are the items it yielded."""
+        @functools.wraps(method)
+        def timed(*args, **kwargs) :
+            start = time.perf_counter()
+            rows = None
+            try :
+                result = method(*args, **kwargs)
+            except BaseException :
+                self._finish_statement()
+                self.record(name, time.perf_counter() - start)
+                raise
+            if inspect.isgenerator(result) :
+                return self._timed_iteration(name, start, result, count_rows)
+            if count_rows and isinstance(result, list) :
+                rows = len(result)
+            self._finish_statement()
+            self.record(name, time.perf_counter() - start, rows)
+            return result
+        timed.instrumented = True
+        return timed
+
+    def _timed_iteration(self, name, start, generator, count_rows) :
+        """Passing on the items of a generator, and counting the call once it's used up or closed."""
+        rows = 0
+        try :
+            for row in generator :
+                rows += 1
+                yield row
+        finally :
+            generator.close()
+            self._finish_statement()
+            self.record(name, time.perf_counter() - start, rows if count_rows else None)
+
+    def _instrument(self, instance, prefix, private = (), count_rows = False) :
+        """Wrapping the public methods of an object (on the object, not its class), plus the ones in "private".
+        Context managers (e.g. Database.transaction) aren't wrapped, their time is the time of the block,
+        which is spent in the methods called inside it, and those are counted themselves."""
+        names = [name for name in dir(instance) if not name.startswith("_")] + list(private)
+        for name in names :
+            method = getattr(instance, name)
+            if not inspect.ismethod(method) or getattr(method, "instrumented", False) :
+                continue
+            # @contextmanager wraps a generator function into one that isn't a generator function itself
+            if inspect.isgeneratorfunction(inspect.unwrap(method.__func__)) and not inspect.isgeneratorfunction(method) :
+                continue
+            setattr(instance, name, self.wrap(f"{prefix}.{name}", method, count_rows))
+
+    def instrument_database(self, db) :
+        """Timing every method of a database-object, including _read, which runs most of the queries,
+        counting the rows they return, and tracing every SQL statement on all of its connections."""
+        self._instrument(db, "Database", private = ("_read",), count_rows = True)
+        db.pool.add_connection_hook(lambda connection : connection.set_trace_callback(self._trace))
+
+    def instrument_analytics(self, analytics) :
+        """Timing every public method of an analytics-object."""
+        self._instrument(analytics, "Analytics")
+
+    def _trace(self, statement) :
+        """Called by SQLite before each statement runs, finishing the statement that ran before it."""
+        self._finish_statement()
+        self._local.statement = (" ".join(statement.split()), time.perf_counter())
+
+    def _finish_statement(self) :
+        """Counting and logging the statement that's currently running in this thread, if there is one."""
+        running = getattr(self._local, "statement", None)
+        if running is None :
+            return
+        self._local.statement = None
+        statement, start = running
+        seconds = time.perf_counter() - start
+        logger.debug("%.3f ms  %s", seconds * 1000, statement)
+        # SQLite traces the statements with their values, statements that only differ in their values are counted together
+        self.record(f"SQL {VALUES.sub('?', statement)[:70]}", seconds)
+
+    def report(self) :
+        """Returns all counters as a table, the slowest total time first."""
+        with self._lock :
+            counters = sorted(self.counters.items(), key = lambda item : item[1].total, reverse = True)
+        lines = [f"{'name':<80} {'calls':>7} {'total ms':>10} {'p50 ms':>9} {'p99 ms':>9} {'rows':>9}"]
+        for name, counter in counters :
+            lines.append(f"{name:<80} {counter.calls:>7} {counter.total * 1000:>10.2f} "
+                         f"{counter.percentile(50) * 1000:>9.3f} {counter.percentile(99) * 1000:>9.3f} {counter.rows:>9}")
+        return "\n".join(lines)
+
+    def reset(self) :
+        """Forgetting all counters."""
+        with self._lock :
+            self.counters = {}
+
+@contextmanager
+def _profiling(path) :
+    """Running the block with cProfile, and saving the profile to the file, to be read with pstats or snakeviz."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try :
+        yield profiler
+    finally :
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile saved to {path}")
+
+def profiling(path) :
+    """Profiling a whole session into the file "path", or nothing if there is no path."""
+    return _profiling(path) if path else nullcontext()
@@ -1,32 +1,62 @@
-"""This class is initializing the app, connecting all the necessary classes."""
-from Database import Database
-from User import User
-from Analytics import Analytics
-from CLI import CLI
-
-def main():
+"""This class is initializing the app, connecting all the necessary classes.
+With a command (e.g. "python Main.py stats"), the command runs without the menu, see the batch-class.
+"--timings" shows how long the methods and SQL statements took, "--profile FILE" saves a cProfile of the session."""
+import sys
+from Batch import create_parser, run_command
+
+def main(argv = None):
+
+    # Running a single command (or a command file) without the menu, if one was given
+    args = create_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    if args.command:
+        return run_command(args)
+
+    # The classes of the menu are only imported now, so a command doesn't wait for them
+    from contextlib import nullcontext
+    from Database import Database
+    from User import User
+    from Analytics import Analytics
+    from CLI import CLI
 
     # Initializing the database and the user
-    db = Database("habits.db")
-    user = User("default_user")
-
-    # Loading the existing habits from the database, using a for-loop
-    saved_habits = db.load_habit()
+    db = Database(args.db, args.user)
+    user = User(args.user)
+
+    # The instrumentation is only switched on with "--timings", it times every database- and analytics-method
+    instrumentation = None
+    if args.timings:
+        from Instrumentation import Instrumentation
+        instrumentation = Instrumentation()
+        instrumentation.instrument_database(db)
+
+    # Loading the existing habits from the database, using a for-loop.
+    # "lazy", so the completions of a habit are only loaded once they're needed, e.g. for the statistics
+    saved_habits = db.load_habit(lazy = True)
     for habit in saved_habits:
         user.add_habit(habit)
 
-    # Initializing analytics
+    # Initializing analytics, which forgets its saved results of a habit whenever the habit changes in the database
     analytics = Analytics(user.habits)
+    db.add_listener(analytics.invalidate)
+    if instrumentation:
+        instrumentation.instrument_analytics(analytics)
 
     # Creating and starting CLI
-    cli = CLI(user, db, analytics)
+    cli = CLI(user, db, analytics, instrumentation)
 
     print("Welcome to Habit Tracker!")
     print(f"Loaded {len(saved_habits)} existing habits.")
 
     # Starting the CLI interface
-    cli.input_command()
+    profile = nullcontext()
+    if args.profile:
+        from Instrumentation import profiling
+        profile = profiling(args.profile)
+    with profile:
+        cli.input_command()
+    if instrumentation:
+        print(instrumentation.report())
 
 # Making sure it runs only when executed directly
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""This class calculates the same statistics as the analytics-class, but for all habits at once, using NumPy.
+All completions are packed into one flat array of day numbers, plus the position where each habit's days start,
+so the streaks and missed periods come from a few array operations instead of Python loops over every date.
+The days are numbered by period like in the period-module : days, calendar weeks and calendar months are calculated
+with array operations, other registered frequencies with their index function.
+NumPy is optional, without it every method falls back to the analytics-class."""
+import datetime
+from array import array
+from Analytics import Analytics
+from HabitSet import HabitSet
+from Period import FREQUENCIES
+
+try :
+    import numpy as np
+except ImportError :
+    np = None
+
+# The frequencies with their own array operations, every other registered frequency gets a code from 3 on
+DAILY, WEEKLY, MONTHLY = 0, 1, 2
+# The day number of 1970-01-01, where NumPy's datetime64 starts counting
+EPOCH_DAY = datetime.date(1970, 1, 1).toordinal()
+
+class NumpyAnalytics(Analytics) :
+    def __init__(self, habits) :
+        """Constructor to initialize the habits, like in the analytics-class."""
+        super().__init__(habits)
+
+    @staticmethod
+    def is_available() :
+        """Returns whether NumPy is installed, otherwise the methods use the analytics-class."""
+        return np is not None
+
+    def _pack(self, habits) :
+        """Packing the habits into arrays : one frequency code and start day per habit,
+        one flat array with all completion day numbers, and the habit (index) each day belongs to.
+        The frequency codes are the positions in the registry of the period-module, -1 for an unknown frequency."""
+        codes = {name : code for code, name in enumerate(FREQUENCIES)}
+        if isinstance(habits, HabitSet) :
+            # the columns of a habit-set are used as they are, the codes of the set are turned into registry codes
+            frequencies = np.array([codes.get(frequency, -1) for frequency in habits.frequencies],
+                                   dtype = np.int64)[np.frombuffer(habits.codes, dtype = np.int16)]
+            starts = np.frombuffer(habits.starts, dtype = np.int32).astype(np.int64)
+            counts = np.diff(np.frombuffer(habits.offsets, dtype = np.int64))
+            days = (np.frombuffer(habits.days, dtype = np.int32).astype(np.int64) if habits.days
+                    else np.zeros(0, dtype = np.int64))
+            return frequencies, starts, counts, days, np.repeat(np.arange(len(habits)), counts)
+        frequencies = np.array([codes.get(habit.frequency, -1) for habit in habits], dtype = np.int64)
+        starts = np.array([habit.start_date.toordinal() for habit in habits], dtype = np.int64)
+        # the completion stores already hold sorted arrays of day numbers, which are joined into a single array,
+        # that NumPy can read without copying
+        all_days = array('i')
+        counts = []
+        for habit in habits :
+            day_numbers = habit.completed_dates.day_numbers
+            all_days.extend(day_numbers)
+            counts.append(len(day_numbers))
+        counts = np.array(counts, dtype = np.int64)
+        days = np.frombuffer(all_days, dtype = np.int32).astype(np.int64) if all_days else np.zeros(0, dtype = np.int64)
+        owners = np.repeat(np.arange(len(habits)), counts)
+        return frequencies, starts, counts, days, owners
+
+    def _periods(self, days, frequencies) :
+        """Returns the index of the period of every day number (see the period-module),
+        the day number itself for an unknown frequency."""
+        periods = days.copy()
+        weekly = frequencies == WEEKLY
+        periods[weekly] = (days[weekly] - 1) // 7 # day number 1 was a Monday
+        monthly = frequencies == MONTHLY
+        # datetime64 counts the months since 1970-01, which are moved to the months since the year 0
+        months = (days[monthly] - EPOCH_DAY).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        periods[monthly] = months + 1970 * 12
+        for code, index in enumerate(FREQUENCIES.values()) :
+            if code > MONTHLY and (chosen := frequencies == code).any() :
+                periods[chosen] = [index(day) for day in days[chosen].tolist()]
+        return periods
+
+    def _streaks(self, habit_count, frequencies, days, owners, today) :
+        """Calculating the current and the longest streak of every habit."""
+        current = np.zeros(habit_count, dtype = np.int64)
+        longest = np.zeros(habit_count, dtype = np.int64)
+        if len(days) == 0 :
+            return current, longest
+        element_frequencies = frequencies[owners]
+        periods = self._periods(days, element_frequencies)
+        # the first day of each habit, and every day in a different period than the day before
+        first = np.ones(len(days), dtype = bool)
+        first[1:] = owners[1:] != owners[:-1]
+        keep = first.copy()
+        keep[1:] |= periods[1:] != periods[:-1]
+        periods, owners, element_frequencies, first = periods[keep], owners[keep], element_frequencies[keep], first[keep]
+        # a new run starts with the first period of a habit, or after a gap, consecutive periods differ by 1,
+        # an unknown frequency never continues a run
+        new_run = first.copy()
+        new_run[1:] |= ((periods[1:] - periods[:-1]) != 1) | (element_frequencies[1:] < 0)
+        run_ids = np.cumsum(new_run) - 1
+        run_lengths = np.bincount(run_ids)
+        # the runs of one habit are next to each other, so the longest run is the maximum of each group of runs
+        run_owners = owners[new_run]
+        group_starts = np.flatnonzero(np.r_[True, run_owners[1:] != run_owners[:-1]])
+        longest[run_owners[group_starts]] = np.maximum.reduceat(run_lengths, group_starts)
+        # the current streak is the run of the newest period, if that period is the current one
+        last = np.ones(len(periods), dtype = bool)
+        last[:-1] = owners[1:] != owners[:-1]
+        last_owners = owners[last]
+        today_periods = self._periods(np.full(len(last_owners), today, dtype = np.int64), frequencies[last_owners])
+        is_current = (periods[last] == today_periods) & (frequencies[last_owners] >= 0)
+        current[last_owners] = np.where(is_current, run_lengths[run_ids[last]], 0)
+        return current, longest
+
+    def _missed(self, habit_count, frequencies, starts, days, owners, today) :
+        """Calculating the missed days/weeks/months of every habit, the same way as get_missed_habits :
+        the periods from the period of the start date until the current period that weren't completed."""
+        first_periods = self._periods(starts, frequencies)
+        current_periods = self._periods(np.full(habit_count, today, dtype = np.int64), frequencies)
+        periods = self._periods(days, frequencies[owners])
+        # only the completed periods between the start and today count, every period once
+        inside = (periods >= first_periods[owners]) & (periods <= current_periods[owners])
+        changed = np.ones(len(days), dtype = bool)
+        changed[1:] = (owners[1:] != owners[:-1]) | (periods[1:] != periods[:-1])
+        completed = np.bincount(owners, weights = changed & inside, minlength = habit_count).astype(np.int64)
+        # whether the habit has been completed in the current period
+        done_now = np.bincount(owners, weights = periods == current_periods[owners], minlength = habit_count) > 0
+        counted = current_periods - first_periods + done_now
+        return np.where((current_periods < first_periods) | (frequencies < 0), 0, np.maximum(0, counted - completed))
+
+    def calculate(self, habits = None, streaks = True, missed = True) :
+        """Returns the current streaks, longest streaks and missed periods of all habits, as 3 lists,
+        in the same order as the habits. Switching off "streaks" or "missed" skips that part, returning None instead."""
+        habits = self.habits if habits is None else habits
+        today = datetime.date.today()
+        if np is None :
+            return ([self.get_current_streak(habit) for habit in habits] if streaks else None,
+                    [self.get_longest_streak(habit) for habit in habits] if streaks else None,
+                    [self.get_missed_habits(habit) for habit in habits] if missed else None)
+        frequencies, starts, counts, days, owners = self._pack(habits)
+        current_streaks = longest_streaks = missed_periods = None
+        if streaks :
+            current_streaks, longest_streaks = self._streaks(len(habits), frequencies, days, owners, today.toordinal())
+            current_streaks, longest_streaks = current_streaks.tolist(), longest_streaks.tolist()
+        if missed :
+            missed_periods = self._missed(len(habits), frequencies, starts, days, owners, today.toordinal()).tolist()
+        return current_streaks, longest_streaks, missed_periods
+
+    def get_longest_streak_for_all(self) :
+        """Returns the habit with the longest streak and the streak itself, like the analytics-class."""
+        if np is None or not self.habits :
+            return super().get_longest_streak_for_all()
+        current, longest, missed = self.calculate(missed = False)
+        best = max(range(len(longest)), key = lambda index : longest[index]) # the first habit wins a tie
+        if longest[best] == 0 :
+            return None, 0
+        return self.habits[best], longest[best]
+
+    def get_all_missed_habits(self) :
+        """Returns the total number of missed periods across all habits."""
+        if np is None :
+            return super().get_all_missed_habits()
+        return sum(self.calculate(streaks = False)[2])
+
+    def get_statistics(self, recent = None) :
+        """Returns the same statistics-dictionary as the analytics-class."""
+        if np is None :
+            return super().get_statistics(recent)
+        stats = {}
+        try :
+            current, longest, missed = self.calculate()
+            if isinstance(self.habits, HabitSet) :
+                # the names and dates straight from the columns, without creating habit-objects
+                newest = [self.habits.newest(index, recent) for index in range(len(self.habits))]
+                names = self.habits.names
+            else :
+                newest = [habit.completed_dates.newest(recent) for habit in self.habits]
+                names = [habit.name for habit in self.habits]
+            for index, name in enumerate(names) :
+                stats[name] = {
+                    'current_streak' : current[index],
+                    'longest_streak' : longest[index],
+                    'missed' : missed[index],
+                    'completed_dates' : newest[index]
+                }
+            return stats
+        except Exception as e :
+            print(f"Error generating statistics : {str(e)}")
+            return {}
@@ -0,0 +1,139 @@
+"""This class calculates the same statistics as the analytics-class, but on several CPU cores, using a process pool.
+The habits are split into chunks, and every chunk is sent to a worker process as a few compact arrays :
+the frequencies, the start days, the number of completions of each habit and one flat array('i') with all of their
+completion day numbers, instead of pickling Habit objects with lists of dates. The workers calculate the streaks and
+missed periods with the methods of the analytics-class, and the results come back in the order of the habits,
+so get_statistics returns exactly what the analytics-class returns. The chunks of a habit-set are slices of its columns.
+get_statistics_for_users does the same for all users of a database file, one user per task, e.g. for a nightly report."""
+import datetime
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from Analytics import Analytics, calculate_days
+from Database import Database
+from HabitSet import HabitSet
+
+# Below this number of habits, starting the worker processes takes longer than calculating the statistics directly
+MIN_PARALLEL_HABITS = 2000
+# How many chunks every worker gets, more chunks even out habits with many completions
+CHUNKS_PER_WORKER = 4
+
+def _executor(workers) :
+    """Returns a process pool. The worker processes are started fresh ("spawn"), instead of copying this process
+    with its open database connections and threads."""
+    return ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context("spawn"))
+
+def pack(habits) :
+    """Packing habits into the arrays that are sent to a worker process, see the description of the module."""
+    frequencies = [habit.frequency for habit in habits]
+    starts = array('i', (habit.start_date.toordinal() for habit in habits))
+    counts = array('i')
+    days = array('i')
+    for habit in habits :
+        day_numbers = habit.completed_dates.day_numbers
+        counts.append(len(day_numbers))
+        days.extend(day_numbers)
+    return frequencies, starts, counts, days
+
+def pack_set(habit_set, start, end) :
+    """Packing the habits of a habit-set from position "start" until "end" into the same arrays as pack,
+    slicing its columns, without creating habit-objects."""
+    frequencies = [habit_set.frequency(index) for index in range(start, end)]
+    offsets = habit_set.offsets[start:end + 1]
+    counts = array('i', (offsets[i + 1] - offsets[i] for i in range(end - start)))
+    return frequencies, habit_set.starts[start:end], counts, habit_set.days[offsets[0]:offsets[-1]]
+
+def calculate_chunk(frequencies, starts, counts, days) :
+    """Calculating the current streak, longest streak and missed periods of a packed chunk of habits,
+    in a worker process. Returns one tuple per habit, in the same order."""
+    today = datetime.date.today()
+    results = []
+    position = 0
+    for frequency, start, count in zip(frequencies, starts, counts) :
+        results.append(calculate_days(frequency, start, days[position:position + count], today))
+        position += count
+    return results
+
+def calculate_user(db_name, user_name, recent = None) :
+    """Loading the habits of one user as a habit-set and calculating their statistics, in a worker process."""
+    db = Database(db_name, user_name)
+    try :
+        return Analytics(db.load_habit(columnar = True)).get_statistics(recent)
+    finally :
+        db.close()
+
+def get_statistics_for_users(db_name, user_names = None, workers = None, recent = None) :
+    """Returns the statistics of all users of a database file (or the ones in "user_names"),
+    as a dictionary of user name -> the dictionary of Analytics.get_statistics, in the order of the user names.
+    Every worker process reads the habits of its user from the file itself, so nothing but the results is sent."""
+    if db_name in (":memory:", "") :
+        raise ValueError("the statistics of all users need a database file, not an in-memory database")
+    if user_names is None :
+        db = Database(db_name)
+        try :
+            user_names = db.get_users()
+        finally :
+            db.close()
+    with _executor(workers) as executor :
+        results = executor.map(calculate_user, [db_name] * len(user_names), user_names, [recent] * len(user_names))
+        return dict(zip(user_names, results))
+
+class ParallelAnalytics(Analytics) :
+    def __init__(self, habits, workers = None, min_habits = MIN_PARALLEL_HABITS) :
+        """Constructor to initialize the habits, like in the analytics-class.
+        "workers" is the number of processes (default : the number of CPU cores),
+        with fewer than "min_habits" habits to calculate, the statistics are calculated without the process pool."""
+        super().__init__(habits)
+        self.workers = workers if workers else os.cpu_count() or 1
+        self.min_habits = min_habits
+
+    def _chunk_size(self, habit_count) :
+        """Returns the number of habits per chunk, or None if the process pool isn't worth starting."""
+        if habit_count < max(self.min_habits, 1) or self.workers == 1 :
+            return None
+        return -(-habit_count // (self.workers * CHUNKS_PER_WORKER))
+
+    def _calculate_set(self, today) :
+        """Calculating the results of a habit-set in the process pool, every chunk is a slice of its columns."""
+        chunk_size = self._chunk_size(len(self.habits))
+        if chunk_size is None :
+            return super()._calculate_set(today)
+        chunks = [pack_set(self.habits, start, min(start + chunk_size, len(self.habits)))
+                  for start in range(0, len(self.habits), chunk_size)]
+        with _executor(min(self.workers, len(chunks))) as executor :
+            return [results for chunk_results in executor.map(calculate_chunk, *zip(*chunks)) for results in chunk_results]
+
+    def calculate(self) :
+        """Calculating the results of all habits that aren't saved yet (see _get_results), in the process pool."""
+        if isinstance(self.habits, HabitSet) :
+            self._get_set_results()
+            return
+        habits = [habit for habit in self.habits if (saved := self._results.get(habit)) is None
+                  or saved[0] != self._result_key(habit)]
+        chunk_size = self._chunk_size(len(habits))
+        if chunk_size is None :
+            return
+        chunks = [habits[i:i + chunk_size] for i in range(0, len(habits), chunk_size)]
+        with _executor(min(self.workers, len(chunks))) as executor :
+            # map returns the results in the order of the chunks, whichever worker finishes first
+            results = executor.map(calculate_chunk, *zip(*(pack(chunk) for chunk in chunks)))
+            for chunk, chunk_results in zip(chunks, results) :
+                for habit, (current, longest, missed) in zip(chunk, chunk_results) :
+                    self._save_results(habit, self._result_key(habit), {'current_streak' : current,
+                                                                        'longest_streak' : longest, 'missed' : missed})
+
+    def get_longest_streak_for_all(self) :
+        """Returns the habit with the longest streak and the streak itself, like the analytics-class."""
+        self.calculate()
+        return super().get_longest_streak_for_all()
+
+    def get_all_missed_habits(self) :
+        """Returns the total number of missed periods across all habits."""
+        self.calculate()
+        return super().get_all_missed_habits()
+
+    def get_statistics(self, recent = None) :
+        """Returns the same statistics-dictionary as the analytics-class."""
+        self.calculate()
+        return super().get_statistics(recent)
@@ -0,0 +1,110 @@
+"""This module numbers the periods of every frequency : a day number (date.toordinal()) is mapped to the index of the
+day, calendar week (Monday to Sunday) or calendar month it falls into, so that consecutive periods always have
+consecutive indexes. The streaks (see the streak-class), the missed periods (see Analytics.get_missed_habits),
+NumpyAnalytics and the statistics inside the database all count with these indexes, so they all agree.
+New frequencies only need a function from a day number to a period index, which never gets smaller for later days :
+    register_frequency("every 3 days", every_n_days(3))
+    register_frequency("weekdays", on_weekdays(0, 1, 2, 3, 4))
+A frequency that's registered at runtime isn't known in the worker processes of ParallelAnalytics,
+those have to be registered in a module the workers import as well."""
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+
+def day_index(day) :
+    """Every day is its own period."""
+    return day
+
+def week_index(day) :
+    """The calendar week, starting on Monday, day number 1 (January 1st of the year 1) was a Monday."""
+    return (day - 1) // 7
+
+def month_index(day) :
+    """The calendar month, counted from the year 0."""
+    date = datetime.date.fromordinal(day)
+    return date.year * 12 + date.month - 1
+
+def week_start(index) :
+    """Returns the Monday of a calendar week, from its index."""
+    return datetime.date.fromordinal(index * 7 + 1)
+
+def month_start(index) :
+    """Returns the first day of a calendar month, from its index."""
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def every_n_days(n) :
+    """Returns the index function of a frequency with periods of "n" days."""
+    def index(day) :
+        return day // n
+    return index
+
+def on_weekdays(*weekdays) :
+    """Returns the index function of a frequency with a period on every one of these weekdays (Monday = 0),
+    a completion on another day counts for the period of the weekday before it."""
+    weekdays = sorted(set(weekdays))
+    # for every weekday, the position of the newest chosen weekday up to it in the week, -1 means the week before
+    positions = [sum(1 for chosen in weekdays if chosen <= weekday) - 1 for weekday in range(7)]
+    def index(day) :
+        week, weekday = divmod(day - 1, 7)
+        return week * len(weekdays) + positions[weekday]
+    return index
+
+# frequency name -> function from a day number to a period index
+FREQUENCIES = {'daily' : day_index, 'weekly' : week_index, 'monthly' : month_index}
+
+def register_frequency(name, index) :
+    """Adding a new frequency, see the description of the module."""
+    FREQUENCIES[name] = index
+
+def period_index(frequency, day) :
+    """Returns the index of the period a day number belongs to, None for an unknown frequency."""
+    index = FREQUENCIES.get(frequency)
+    return index(day) if index else None
+
+def period_indexes(frequency, day_numbers) :
+    """Returns the indexes of the periods of sorted day numbers, sorted and every period only once,
+    None for an unknown frequency."""
+    index = FREQUENCIES.get(frequency)
+    if index is None :
+        return None
+    # the usual frequencies without a function call per day : the day numbers are already sorted and distinct,
+    # and a month only has to be looked up once, the next days up to its end belong to the same month
+    if index is day_index :
+        return array('q', day_numbers)
+    periods = array('q')
+    if index is week_index :
+        for day in day_numbers :
+            period = (day - 1) // 7
+            if not periods or period != periods[-1] :
+                periods.append(period)
+        return periods
+    if index is month_index :
+        next_month = None
+        for day in day_numbers :
+            if next_month is None or day >= next_month :
+                date = datetime.date.fromordinal(day)
+                periods.append(date.year * 12 + date.month - 1)
+                next_month = datetime.date(date.year + date.month // 12, date.month % 12 + 1, 1).toordinal()
+        return periods
+    for day in day_numbers :
+        period = index(day)
+        if not periods or period != periods[-1] :
+            periods.append(period)
+    return periods
+
+def count_missed(frequency, start_day, periods, today) :
+    """Returns the number of periods from the period of the start day until the current period that weren't completed,
+    the current period only counts as missed once it's over. "periods" are the sorted completed periods."""
+    index = FREQUENCIES.get(frequency)
+    if index is None or periods is None :
+        return 0
+    first = index(start_day)
+    current = index(today)
+    if current < first :
+        return 0
+    # only the completed periods between the start and today count
+    low = bisect_left(periods, first)
+    high = bisect_right(periods, current)
+    done_now = high > low and periods[high - 1] == current
+    counted = current - first + 1 if done_now else current - first
+    return max(0, counted - (high - low))
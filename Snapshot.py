@@ -0,0 +1,87 @@
+"""This module keeps a small snapshot file next to the database file ("habit_tracker.db.snapshot"),
+with the "habit_summary"-rows of the users whose habits were listed last, so "python Main.py list" can answer
+without opening the database object (no connection pool, no migrations, no user lookup).
+The snapshot stores the id, the change counter and the schema version of the database file
+(see Database._migration_add_change_counter), it's only used while all 3 are still the same,
+so every commit that changed something, and every upgrade of the file, makes it outdated.
+The current streaks are calculated from the rows when the snapshot is loaded, so they're right on every day."""
+import datetime
+import json
+import os
+import sqlite3
+from Period import period_index
+
+def summaries_from_rows(rows, today = None) :
+    """Turning the rows of Database.get_summary_rows into the dictionary of Database.get_summaries,
+    the current streak is the run of the newest completed period, if that's the current period.
+    It's here and not in the database-module, so loading a snapshot doesn't import the database-class."""
+    today = (today if today else datetime.date.today()).toordinal()
+    summaries = {}
+    for name, frequency, count, first_day, last_day, last_period, current_run, longest_streak in rows :
+        current = last_period is not None and last_period == period_index(frequency, today)
+        summaries[name] = {'frequency' : frequency, 'completed_days' : count or 0,
+                           'first_completion' : datetime.date.fromordinal(first_day) if first_day else None,
+                           'last_completion' : datetime.date.fromordinal(last_day) if last_day else None,
+                           'current_streak' : current_run if current else 0,
+                           'longest_streak' : longest_streak or 0}
+    return summaries
+
+def snapshot_path(db_name) :
+    """Returns the name of the snapshot file of a database file."""
+    return db_name + ".snapshot"
+
+def read_change_counter(db_name) :
+    """Returns the id, the change counter and the schema version of a database file as a list,
+    None if the file doesn't exist or has no change counter yet (an older schema version)."""
+    if db_name in (":memory:", "") or not os.path.exists(db_name) :
+        return None
+    try :
+        connection = sqlite3.connect(db_name)
+        try :
+            row = connection.execute("""SELECT database_id, counter, user_version
+                                         FROM change_counter, pragma_user_version""").fetchone()
+        finally :
+            connection.close()
+    except sqlite3.Error :
+        return None
+    return list(row) if row else None
+
+def load(db_name, user_name, today = None) :
+    """Returns the summaries of the habits of a user (see Database.get_summaries) from the snapshot file,
+    None if there's no snapshot of the user or the database has changed since it was saved."""
+    try :
+        with open(snapshot_path(db_name), encoding = "utf-8") as file :
+            snapshot = json.load(file)
+    except (OSError, ValueError) :
+        return None
+    change = read_change_counter(db_name)
+    if change is None or snapshot.get('change') != change :
+        return None
+    rows = snapshot.get('users', {}).get(user_name)
+    return None if rows is None else summaries_from_rows(rows, today)
+
+def save(db, today = None) :
+    """Saving the summary rows of the user of a database object to the snapshot file, and returns the summaries.
+    The rows of other users stay in the snapshot as long as the database hasn't changed since they were saved."""
+    change, rows = db.get_summary_rows()
+    if db.pool.in_memory or change is None :
+        return summaries_from_rows(rows, today)
+    path = snapshot_path(db.pool.db_name)
+    users = {}
+    try :
+        with open(path, encoding = "utf-8") as file :
+            snapshot = json.load(file)
+        if snapshot.get('change') == list(change) :
+            users = snapshot.get('users', {})
+    except (OSError, ValueError) :
+        pass
+    users[db.user_name] = [list(row) for row in rows]
+    # written to another file first, so a reader never sees half a snapshot
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try :
+        with open(temporary, "w", encoding = "utf-8") as file :
+            json.dump({'change' : list(change), 'users' : users}, file)
+        os.replace(temporary, path)
+    except OSError :
+        pass # without a snapshot, the next "list" just reads the database again
+    return summaries_from_rows(rows, today)
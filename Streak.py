@@ -0,0 +1,82 @@
+"""This class keeps the streak of a habit up to date, instead of recalculating it from all completed dates.
+It remembers the last completed period, the run of consecutive periods ending there and the longest run so far,
+so a new completion only has to be compared to the last period.
+The periods are numbered by the period-module, consecutive days, calendar weeks or calendar months
+have consecutive indexes."""
+import datetime
+from Period import period_index
+
+class Streak :
+    __slots__ = ('frequency', 'last_period', 'current_run', 'longest_run')
+
+    def __init__(self, frequency) :
+        """Constructor, creating an empty streak for a habit with the given frequency."""
+        self.frequency = frequency
+        self.last_period = None # index of the newest completed period
+        self.current_run = 0 # consecutive periods, ending with the newest completed period
+        self.longest_run = 0 # the longest run of consecutive periods so far
+
+    @classmethod
+    def from_day_numbers(cls, frequency, day_numbers) :
+        """Calculating the streak from scratch, from sorted day numbers (see the completion-store-class),
+        only needed when loading a habit, or when an older date was added after a newer one."""
+        streak = cls(frequency)
+        for day in day_numbers :
+            streak.add_day(day)
+        return streak
+
+    @classmethod
+    def from_periods(cls, frequency, periods) :
+        """Calculating the streak from the sorted indexes of the completed periods (see Habit.get_periods)."""
+        streak = cls(frequency)
+        last = None
+        run = longest = 0
+        # the same as add_period for every period, without a method call per period
+        for period in periods :
+            run = run + 1 if last is not None and period - last == 1 else 1
+            if run > longest :
+                longest = run
+            last = period
+        streak.last_period, streak.current_run, streak.longest_run = last, run, longest
+        return streak
+
+    def add(self, date) :
+        """Adding a completed date, see add_day."""
+        return self.add_day(date.toordinal())
+
+    def add_day(self, day) :
+        """Adding a completed day number, which has to be in the same or a later period than all days before.
+        Returns False if the day is older than the newest period, in which case the streak has to be recalculated."""
+        period = period_index(self.frequency, day)
+        if period is None :
+            # unknown frequency, every completion counts as a streak of 1, like before
+            self.longest_run = 1
+            return True
+        return self.add_period(period)
+
+    def add_period(self, period) :
+        """Adding the index of a completed period, see add_day."""
+        if self.last_period is not None :
+            if period < self.last_period :
+                return False
+            # another completion within the same period doesn't change the streak
+            if period == self.last_period :
+                return True
+        if self.last_period is not None and period - self.last_period == 1 :
+            self.current_run += 1
+        else :
+            self.current_run = 1
+        self.last_period = period
+        self.longest_run = max(self.longest_run, self.current_run)
+        return True
+
+    def get_current(self, today = None) :
+        """Returns the current streak, only counting if the newest completed period is the current period."""
+        today = today if today else datetime.date.today()
+        if self.last_period is None or self.last_period != period_index(self.frequency, today.toordinal()) :
+            return 0
+        return self.current_run
+
+    def get_longest(self) :
+        """Returns the longest streak."""
+        return self.longest_run
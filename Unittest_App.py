@@ -2,10 +2,26 @@
 mainly the analytics-class and database-class"""
 import unittest
 import datetime
+import gc
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import weakref
+from unittest.mock import patch
+from io import StringIO
 from Habit import Habit
-from User import User
+from User import User, HabitList
 from Analytics import Analytics
-from Database import Database
+from Database import Database, MIGRATIONS, SCHEMA_VERSION
+
+def months_ago(months, day) :
+    """Returns the date on the given day of the calendar month "months" months before the current month,
+    so the monthly tests always test the same calendar months, whatever the date of today is."""
+    today = datetime.date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return datetime.date(year, month + 1, day)
 
 class TestHabitTracker(unittest.TestCase) :
     def setUp(self):
@@ -48,6 +64,20 @@ class TestHabitTracker(unittest.TestCase) :
         self.habit_daily.mark_as_done()
         self.assertIn(today, self.habit_daily.completed_dates)
 
+    def test_completed_dates_sorted_without_duplicates(self) :
+        """Testing that the completion dates are kept sorted, and that a date is only stored once"""
+        today = datetime.date.today()
+        last_week = today - datetime.timedelta(days = 7)
+        self.habit_daily.mark_as_done()
+        self.habit_daily.mark_as_done()
+        self.assertFalse(self.habit_daily.add_completion(today))
+        self.habit_daily.add_completion(last_week)
+        self.assertEqual([last_week, today], self.habit_daily.completed_dates)
+        self.assertIn(last_week, self.habit_daily.completed_dates)
+        self.assertNotIn(today - datetime.timedelta(days = 1), self.habit_daily.completed_dates)
+        self.assertEqual([today], self.habit_daily.completed_dates.between(since = today - datetime.timedelta(days = 6)))
+        self.assertEqual(2, self.habit_daily.completed_dates.count_between(last_week, today))
+
     # Test Analytics Class
     def test_list_current_habits(self):
         """Testing listing the current habits."""
@@ -145,6 +175,31 @@ class TestHabitTracker(unittest.TestCase) :
         # Comparing the expected value to the actual value
         self.assertEqual(5, self.analytics.get_longest_streak(self.habit_weekly))
 
+    def test_streak_updated_on_completion(self) :
+        """Testing that marking a habit as done updates the streak, without recalculating it from all dates,
+        and that adding an older date afterwards still gives the correct streak"""
+        today = datetime.date.today()
+        self.habit_daily.completed_dates = [today - datetime.timedelta(days = 3), today - datetime.timedelta(days = 1)]
+        self.assertEqual(0, self.analytics.get_current_streak(self.habit_daily))
+        streak = self.habit_daily.get_streak()
+        self.habit_daily.mark_as_done()
+        # still the same streak-object, only updated with today's date
+        self.assertIs(streak, self.habit_daily.get_streak())
+        self.assertEqual(2, self.analytics.get_current_streak(self.habit_daily))
+        # filling the gap 2 days ago, this date is older than the newest one, so the streak gets recalculated
+        self.habit_daily.add_completion(today - datetime.timedelta(days = 2))
+        self.assertEqual(4, self.analytics.get_current_streak(self.habit_daily))
+        self.assertEqual(4, self.analytics.get_longest_streak(self.habit_daily))
+
+    def test_streak_with_several_completions_in_one_week(self) :
+        """Testing that completing a weekly habit twice in the same week doesn't break the streak"""
+        today = datetime.date.today()
+        monday = today - datetime.timedelta(days = today.weekday())
+        self.habit_weekly.completed_dates = [monday - datetime.timedelta(days = 7), monday, monday]
+        self.habit_weekly.add_completion(today)
+        self.assertEqual(2, self.analytics.get_current_streak(self.habit_weekly))
+        self.assertEqual(2, self.analytics.get_longest_streak(self.habit_weekly))
+
     def test_longest_streak_across_all_habits_1(self) :
         """Testing the longest-streak-calculation across all habits, expected result is 6,
         using the get_longest_streak_for_all-method from the analytics-class"""
@@ -247,16 +302,23 @@ class TestHabitTracker(unittest.TestCase) :
         """Testing the missed-habits-calculation for a monthly habit, started 7 months ago, missed it 3 times,
         again using the get_missed_habits-method from the analytics class"""
         self.user.add_habit(self.habit_monthly)
-        self.habit_monthly.start_date = datetime.date.today() - datetime.timedelta(days = 210)
+        self.habit_monthly.start_date = months_ago(7, 20)
         self.habit_monthly.completed_dates = [
-            datetime.date.today() - datetime.timedelta(days = 180), # didn't finish it the first month after adding the habit
-            datetime.date.today() - datetime.timedelta(days = 150),
-            datetime.date.today() - datetime.timedelta(days = 90),
-            datetime.date.today() - datetime.timedelta(days = 60),
+            months_ago(6, 3), # didn't finish it the first month after adding the habit
+            months_ago(5, 28),
+            months_ago(3, 1),
+            months_ago(2, 15),
             datetime.date.today()
         ]
         self.assertEqual(3, self.analytics.get_missed_habits(self.habit_monthly))
 
+    def test_get_missed_habits_completed_twice(self) :
+        """Testing that marking a habit as done twice on the same day doesn't hide a missed day"""
+        self.habit_daily.start_date = datetime.date.today() - datetime.timedelta(days = 1)
+        self.habit_daily.mark_as_done()
+        self.habit_daily.mark_as_done()
+        self.assertEqual(1, self.analytics.get_missed_habits(self.habit_daily))
+
     def test_get_all_missed_habits(self) :
         """Test to try and get all missed dates across daily/weekly/monthly habits,
         missed 2 dates for the 1st daily habit, 3 for the 2nd daily, 1 for the weekly, and 2 for the monthly habit -> 8 overall"""
@@ -287,15 +349,32 @@ class TestHabitTracker(unittest.TestCase) :
             datetime.date.today() - datetime.timedelta(days = 7),
             datetime.date.today()
         ]
-        self.habit_monthly.start_date = datetime.date.today() - datetime.timedelta(days = 150)
+        self.habit_monthly.start_date = months_ago(5, 10)
         self.habit_monthly.completed_dates = [
-            datetime.date.today() - datetime.timedelta(days = 150),
-            datetime.date.today() - datetime.timedelta(days = 120),
-            datetime.date.today() - datetime.timedelta(days = 60),
+            months_ago(5, 10),
+            months_ago(4, 1),
+            months_ago(2, 28),
             datetime.date.today()
         ]
         self.assertEqual(8, self.analytics.get_all_missed_habits())
 
+    def test_saved_statistics(self) :
+        """Testing that the statistics of an unchanged habit are only calculated once,
+        and calculated again after the habit was marked as done, or after the database changed"""
+        self.user.add_habit(self.habit_daily)
+        self.habit_daily.completed_dates = [datetime.date.today() - datetime.timedelta(days = 1)]
+        first = self.analytics.get_statistics()
+        with patch.object(self.analytics, "get_missed_habits", side_effect = AssertionError("calculated again")) :
+            self.assertEqual(first, self.analytics.get_statistics())
+            self.assertEqual(first["Exercise"]["missed"], self.analytics.get_all_missed_habits())
+        self.habit_daily.mark_as_done()
+        self.assertEqual(2, self.analytics.get_statistics()["Exercise"]["current_streak"])
+        # a change in the database makes the analytics-class forget the saved results of that habit
+        self.db.add_listener(self.analytics.invalidate)
+        self.db.save_habit(self.habit_daily)
+        with patch.object(self.analytics, "get_missed_habits", return_value = 5) :
+            self.assertEqual(5, self.analytics.get_statistics()["Exercise"]["missed"])
+
     # Test User Class
     def test_add_habit_to_user(self) :
         """Testing adding a habit to a user,
@@ -310,6 +389,37 @@ class TestHabitTracker(unittest.TestCase) :
         self.user.remove_habit("Exercise")
         self.assertNotIn(self.habit_daily, self.user.habits)
 
+    def test_find_habits_in_user_index(self) :
+        """Testing the name- and frequency-index of the user's habit list,
+        and that the analytics-class doesn't see a habit anymore after it was removed from the user"""
+        self.user.add_habit(self.habit_daily)
+        self.user.add_habit(self.habit_weekly)
+        self.user.add_habit(self.habit_daily2)
+        self.assertIs(self.habit_weekly, self.user.get_habit_by_name("Plan the week"))
+        self.assertIsNone(self.user.get_habit_by_name("Paying the bills"))
+        self.assertEqual(["Exercise", "Chores"], self.analytics.list_habits_by_periodicity("daily"))
+        self.user.remove_habit("Exercise")
+        self.assertIsNone(self.user.get_habit_by_name("Exercise"))
+        self.assertEqual(["Plan the week", "Chores"], self.analytics.list_current_habits())
+        self.assertEqual(["Chores"], self.analytics.list_habits_by_periodicity("daily"))
+        self.assertEqual(self.habit_daily2, self.user.habits[1])
+
+    def test_remove_duplicate_names_from_user_index(self) :
+        """Testing that the next habit with the same name takes the place of a removed one in the name-index,
+        and that removing a habit doesn't go through the whole list for that"""
+        class UnscannableList(list) :
+            def __iter__(self) :
+                raise AssertionError("the list of habits was scanned")
+        habits = HabitList([self.habit_daily, self.habit_weekly, Habit("Exercise", "weekly")])
+        second = habits[2]
+        habits._habits = UnscannableList(habits._habits)
+        del habits[1]
+        del habits[0]
+        self.assertIs(second, habits.get("Exercise"))
+        del habits[0]
+        self.assertIsNone(habits.get("Exercise"))
+        self.assertEqual(0, len(habits))
+
     def test_user_statistics(self) :
         """Testing user-statistics-generation,
         using the get_statistics-method from the analytics-class"""
@@ -340,6 +450,85 @@ class TestHabitTracker(unittest.TestCase) :
         self.assertEqual(loaded_habits[0].name, "Exercise")
         self.assertEqual(loaded_habits[2].name, "Paying the bills")
 
+    def test_load_habit_with_completions(self) :
+        """Testing that loading the habits assigns every completion to the right habit,
+        sorted by date"""
+        self.db.save_habit(self.habit_daily)
+        self.db.save_habit(self.habit_weekly)
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days = 1)
+        self.db.save_completion(self.habit_daily, today)
+        self.db.save_completion(self.habit_weekly, today)
+        self.db.save_completion(self.habit_daily, yesterday)
+        loaded_habits = self.db.load_habit()
+        self.assertEqual([yesterday, today], loaded_habits[0].completed_dates)
+        self.assertEqual([today], loaded_habits[1].completed_dates)
+
+    def test_load_habit_lazily(self) :
+        """Testing that lazily loaded habits only load their completions when they're needed,
+        and that only the most recently used histories are kept in memory"""
+        self.db.save_habits([self.habit_daily, self.habit_weekly, self.habit_monthly])
+        today = datetime.date.today()
+        self.db.save_completions([(self.habit_daily, today), (self.habit_weekly, today), (self.habit_monthly, today)])
+        daily, weekly, monthly = self.db.load_habit(lazy = True, max_histories = 1)
+        self.assertEqual("Exercise", daily.name)
+        self.assertFalse(daily.is_loaded())
+        self.assertEqual([today], daily.completed_dates)
+        self.assertTrue(daily.is_loaded())
+        # loading the 2nd history unloads the 1st one
+        self.assertEqual(1, Analytics([weekly]).get_current_streak(weekly))
+        self.assertFalse(daily.is_loaded())
+        self.assertTrue(weekly.is_loaded())
+        # a changed history stays in memory, its new completion might not be saved yet
+        weekly.add_completion(today - datetime.timedelta(days = 7))
+        self.assertEqual([today], monthly.completed_dates)
+        self.assertTrue(weekly.is_loaded())
+        self.assertEqual(2, len(weekly.completed_dates))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_unload_saved_and_removed_habits(self, mock_stdout) :
+        """Testing that a lazily loaded habit can be unloaded again once its new completion is saved,
+        and that the history cache doesn't keep a habit in memory after it was removed"""
+        self.db.save_habits([self.habit_daily, self.habit_weekly])
+        today = datetime.date.today()
+        self.db.save_completions([(self.habit_daily, today - datetime.timedelta(days = 1)), (self.habit_weekly, today)])
+        daily, weekly = self.db.load_habit(lazy = True, max_histories = 1)
+        self.assertEqual(1, daily.get_streak().get_longest())
+        daily.mark_as_done()
+        version = daily.get_version()
+        self.assertTrue(self.db.save_completion(daily, today))
+        self.assertNotEqual(version, daily.get_version())
+        self.assertEqual(2, daily.get_streak().get_current())
+        self.assertEqual([today], weekly.completed_dates)
+        self.assertFalse(daily.is_loaded())
+        self.assertEqual([today - datetime.timedelta(days = 1), today], daily.completed_dates)
+        self.assertFalse(weekly.is_loaded())
+        # the habits of the user are the only references to a habit, the history cache only has a weak one
+        reference = weakref.ref(daily)
+        del daily
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_repeated_statistics_of_unloaded_habits(self) :
+        """Testing that showing the statistics again doesn't load the histories from the database again,
+        even if there are more habits than histories kept in memory, only the changed habit is loaded again"""
+        habits = [Habit(f"Habit {i}", "daily") for i in range(30)]
+        self.db.save_habits(habits)
+        today = datetime.date.today()
+        self.db.save_completions((habit, today - datetime.timedelta(days = days)) for habit in habits for days in range(10))
+        loaded = self.db.load_habit(lazy = True, max_histories = 5)
+        analytics = Analytics(loaded)
+        with patch.object(self.db, "load_completions", wraps = self.db.load_completions) as load_completions :
+            first = analytics.get_statistics(recent = 7)
+            self.assertEqual(30, load_completions.call_count)
+            self.assertEqual(first, analytics.get_statistics(recent = 7))
+            self.assertEqual(30, load_completions.call_count)
+            self.assertEqual(7, len(first["Habit 0"]["completed_dates"]))
+            loaded[0].add_completion(today + datetime.timedelta(days = 1))
+            newest = analytics.get_statistics(recent = 7)["Habit 0"]["completed_dates"]
+            self.assertEqual(today + datetime.timedelta(days = 1), newest[0])
+            self.assertEqual(31, load_completions.call_count)
+
     def test_save_completion(self) :
         """Testing the saving of a habit-completion in the database,
         using the save_habit-method from the database-class"""
@@ -347,11 +536,373 @@ class TestHabitTracker(unittest.TestCase) :
         today = datetime.date.today()
         self.assertTrue(self.db.save_completion(self.habit_daily, today))
 
+    def test_save_habits_and_completions_in_bulk(self) :
+        """Testing saving several habits and a backfilled history at once,
+        using the save_habits- and save_completions-methods from the database-class"""
+        self.assertEqual(2, self.db.save_habits([self.habit_daily, self.habit_weekly, Habit("Exercise", "weekly")]))
+        today = datetime.date.today()
+        history = [(self.habit_daily, today - datetime.timedelta(days = day)) for day in range(365)]
+        # the monthly habit was never saved, so its completion is skipped
+        self.assertEqual(366, self.db.save_completions(history + [(self.habit_weekly, today), (self.habit_monthly, today)]))
+        loaded_habits = self.db.load_habit()
+        self.assertEqual(365, len(loaded_habits[0].completed_dates))
+        self.assertEqual([today], loaded_habits[1].completed_dates)
+
+    def test_get_completions_in_pages(self) :
+        """Testing the date range, the pages and the keyset pages of the get_completions-method,
+        and that the statistics only contain the newest dates that were asked for"""
+        self.db.save_habit(self.habit_daily)
+        first = datetime.date(2024, 1, 1)
+        dates = [first + datetime.timedelta(days = day) for day in range(0, 40, 2)]
+        self.db.save_completions((self.habit_daily, date) for date in dates)
+        self.assertEqual(dates, self.db.get_completions(self.habit_daily))
+        self.assertEqual([first], self.db.get_completions(self.habit_daily, first))
+        self.assertEqual([], self.db.get_completions(self.habit_daily, first + datetime.timedelta(days = 1)))
+        self.assertEqual(dates[5:8], self.db.get_completions(self.habit_daily, since = dates[5], until = dates[7]))
+        self.assertEqual(dates[3:6], self.db.get_completions(self.habit_daily, limit = 3, offset = 3))
+        self.assertEqual(dates[:-8:-1], self.db.get_completions(self.habit_daily, limit = 7, newest_first = True))
+        # going through all pages, each page starting after the last date of the page before
+        pages = []
+        page = self.db.get_completions(self.habit_daily, limit = 6, newest_first = True)
+        while page :
+            pages.append(page)
+            page = self.db.get_completions(self.habit_daily, limit = 6, newest_first = True, after = page[-1])
+        self.assertEqual([6, 6, 6, 2], [len(page) for page in pages])
+        self.assertEqual(dates[::-1], [date for page in pages for date in page])
+        self.assertEqual([], self.db.get_completions(Habit("Unknown", "daily")))
+        habit = self.db.load_habit()[0]
+        self.assertEqual(dates[:-4:-1], habit.completed_dates.newest(3))
+        self.user.add_habit(habit)
+        self.assertEqual(dates[:-8:-1], self.analytics.get_statistics(recent = 7)["Exercise"]["completed_dates"])
+        self.assertEqual(dates[::-1], self.analytics.get_statistics()["Exercise"]["completed_dates"])
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_users_have_separate_habits(self, mock_stdout) :
+        """Testing that the users of one database file only see their own habits and completions,
+        and that 2 users can have habits with the same name"""
+        today = datetime.date.today()
+        other = self.db.for_user("test_user")
+        self.assertEqual(["default_user", "test_user"], self.db.get_users())
+        self.db.save_habit(self.habit_daily)
+        self.db.save_completion(self.habit_daily, today)
+        other.save_habits([Habit("Exercise", "weekly"), self.habit_monthly])
+        other.save_completions([("Exercise", today - datetime.timedelta(days = 7)), ("Paying the bills", today)])
+        self.assertEqual([("Exercise", "daily")], [(habit.name, habit.frequency) for habit in self.db.load_habit()])
+        self.assertEqual([today], self.db.load_habit(lazy = True)[0].completed_dates)
+        habits = other.load_habit()
+        self.assertEqual([("Exercise", "weekly"), ("Paying the bills", "monthly")], [(h.name, h.frequency) for h in habits])
+        self.assertEqual([today - datetime.timedelta(days = 7)], habits[0].completed_dates)
+        self.assertEqual(["Exercise"], list(self.db.get_statistics_in_database(today)))
+        self.assertEqual(["Exercise", "Paying the bills"], sorted(other.get_statistics_in_database(today)))
+        self.assertEqual([today], self.db.get_completions(Habit("Exercise", "daily")))
+        # deleting a habit only deletes the habit of that user
+        self.assertTrue(self.db.delete_habit("Exercise"))
+        self.assertEqual([], self.db.load_habit())
+        self.assertEqual(2, len(other.load_habit()))
+        self.assertEqual(other.user_id, self.db.for_user("test_user").user_id)
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_merge_database_file(self, mock_stdout) :
+        """Testing that a single-user database file is folded into the habits of a user,
+        and that merging the same file again doesn't add anything"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "alice.db")
+        source = Database(path)
+        source.save_habits([self.habit_daily, self.habit_weekly])
+        source.save_completions([("Exercise", datetime.date(2024, 1, 2)), ("Plan the week", datetime.date(2024, 1, 3))])
+        source.close()
+        alice = self.db.for_user("alice")
+        alice.save_habit(Habit("Exercise", "weekly"))
+        alice.save_completion(Habit("Exercise", "weekly"), datetime.date(2024, 1, 2))
+        self.assertEqual({'habits' : 1, 'completions' : 1}, alice.merge_file(path))
+        self.assertEqual({'habits' : 0, 'completions' : 0}, alice.merge_file(path))
+        habits = alice.load_habit()
+        self.assertEqual([("Exercise", "weekly"), ("Plan the week", "weekly")], [(h.name, h.frequency) for h in habits])
+        self.assertEqual([[datetime.date(2024, 1, 2)], [datetime.date(2024, 1, 3)]], [list(h.completed_dates) for h in habits])
+        self.assertEqual([], self.db.load_habit())
+        with self.assertRaises(FileNotFoundError) :
+            alice.merge_file(os.path.join(directory.name, "missing.db"))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_merge_old_database_file(self, mock_stdout) :
+        """Testing that merging a file of the first version of the app upgrades a copy of it,
+        the file itself keeps its tables, its schema version and its journal mode"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "old_habits.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE habits (id INTEGER PRIMARY KEY, name TEXT, frequency TEXT, start_date TEXT)")
+        connection.execute("CREATE TABLE completions (habit_id INTEGER, completion_date TEXT)")
+        connection.execute("INSERT INTO habits (id, name, frequency, start_date) VALUES (1, 'Exercise', 'daily', '2024-01-01')")
+        connection.execute("INSERT INTO completions (habit_id, completion_date) VALUES (1, '2024-01-02')")
+        connection.commit()
+        connection.close()
+        with open(path, "rb") as file :
+            content = file.read()
+        self.assertEqual({'habits' : 1, 'completions' : 1}, self.db.for_user("alice").merge_file(path))
+        self.assertEqual([datetime.date(2024, 1, 2)], self.db.for_user("alice").load_habit()[0].completed_dates)
+        with open(path, "rb") as file :
+            self.assertEqual(content, file.read())
+        self.assertEqual(["old_habits.db"], os.listdir(directory.name))
+
+    def test_time_series(self) :
+        """Testing the rolling completion rates, the weekly and monthly counts and the weekday histogram,
+        and that the rates from the prefix sums are the same as counting every window again"""
+        self.habit_daily.start_date = datetime.date(2024, 1, 1)
+        self.habit_daily.completed_dates = [datetime.date(2024, 1, day) for day in (1, 2, 3, 5, 8, 15, 31)] + [
+            datetime.date(2024, 2, 1)]
+        rates = self.analytics.get_rolling_rates(self.habit_daily, 7, until = datetime.date(2024, 1, 9))
+        self.assertEqual([(datetime.date(2024, 1, 1), 1 / 7), (datetime.date(2024, 1, 2), 2 / 7)], rates[:2])
+        self.assertEqual((datetime.date(2024, 1, 9), 3 / 7), rates[-1])
+        self.assertEqual([(datetime.date(2024, 1, 1), 4), (datetime.date(2024, 1, 8), 1), (datetime.date(2024, 1, 15), 1),
+                          (datetime.date(2024, 1, 22), 0), (datetime.date(2024, 1, 29), 2)],
+                         self.analytics.get_counts_per_period(self.habit_daily, "weekly", until = datetime.date(2024, 2, 4)))
+        self.assertEqual([(datetime.date(2024, 1, 1), 7), (datetime.date(2024, 2, 1), 1), (datetime.date(2024, 3, 1), 0)],
+                         self.analytics.get_counts_per_period(self.habit_daily, "monthly", until = datetime.date(2024, 3, 5)))
+        # 2024-01-01 was a Monday
+        self.assertEqual([3, 1, 2, 1, 1, 0, 0], self.analytics.get_weekday_histogram(self.habit_daily))
+        self.assertEqual([2, 0, 1, 1, 0, 0, 0], self.analytics.get_weekday_histogram(
+            self.habit_daily, datetime.date(2024, 1, 8), datetime.date(2024, 2, 1)))
+        with self.assertRaises(ValueError) :
+            self.analytics.get_rolling_rates(self.habit_daily, 0)
+
+        generator = random.Random(5)
+        today = datetime.date.today()
+        self.habit_weekly.completed_dates = [today - datetime.timedelta(days = generator.randrange(400)) for _ in range(150)]
+        self.user.add_habit(self.habit_daily)
+        self.user.add_habit(self.habit_weekly)
+        series = self.analytics.get_time_series(window = 30)
+        self.assertEqual(365, len(series['dates']))
+        self.assertEqual(today, series['dates'][-1])
+        dates = set(self.habit_weekly.completed_dates)
+        expected = [sum(day - datetime.timedelta(days = back) in dates for back in range(30)) / 30 for day in series['dates']]
+        self.assertEqual(expected, series['habits']["Plan the week"]['rates'])
+        self.assertEqual(sum(series['habits']["Plan the week"]['weekdays']),
+                         sum(count for start, count in series['habits']["Plan the week"]['monthly']))
+        series = self.analytics.get_time_series(7, datetime.date(2024, 1, 1), datetime.date(2024, 1, 9))
+        self.assertEqual(rates, list(zip(series['dates'], series['habits']["Exercise"]['rates'])))
+
+    def test_transaction(self) :
+        """Testing that the writes inside a transaction-block are committed together,
+        or not at all if an error happens inside the block"""
+        with self.db.transaction() :
+            self.db.save_habit(self.habit_daily)
+            self.db.save_completion(self.habit_daily, datetime.date.today())
+            # nothing has been committed yet
+            self.assertTrue(self.db.connection.in_transaction)
+        self.assertFalse(self.db.connection.in_transaction)
+        with self.assertRaises(ValueError) :
+            with self.db.transaction() :
+                self.db.save_habit(self.habit_weekly)
+                raise ValueError("Something went wrong")
+        self.assertEqual(["Exercise"], [habit.name for habit in self.db.load_habit()])
+
+    def test_nested_transaction(self) :
+        """Testing that a nested transaction-block that fails only rolls back its own writes,
+        when the outer block catches the exception and commits"""
+        with self.db.transaction() :
+            self.db.save_habit(self.habit_daily)
+            with self.assertRaises(ValueError) :
+                with self.db.transaction() :
+                    self.db.save_habit(self.habit_weekly)
+                    raise ValueError("Something went wrong")
+            with self.db.transaction() :
+                self.db.save_habit(self.habit_monthly)
+            self.assertTrue(self.db.connection.in_transaction)
+        self.assertFalse(self.db.connection.in_transaction)
+        self.assertEqual(["Exercise", "Paying the bills"], [habit.name for habit in self.db.load_habit()])
+        # a nested block that's the first write of the outer block doesn't commit on its own either
+        with self.assertRaises(ValueError) :
+            with self.db.transaction() :
+                with self.db.transaction() :
+                    self.db.save_habit(self.habit_weekly)
+                raise ValueError("Something went wrong")
+        self.assertEqual(2, len(self.db.load_habit()))
+
+    def test_read_while_writing(self) :
+        """Testing that another thread can read the committed habits from a database file
+        while a transaction is still open, instead of having to wait for it"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        db = Database(os.path.join(folder.name, "habits.db"))
+        self.addCleanup(db.close)
+        self.assertEqual("wal", db.connection.execute("PRAGMA journal_mode").fetchone()[0])
+        db.save_habit(self.habit_daily)
+        loaded_names = []
+        reader = threading.Thread(target = lambda : loaded_names.extend(habit.name for habit in db.load_habit()))
+        with db.transaction() :
+            db.save_habit(self.habit_weekly)
+            # the reader only sees the committed habit, the weekly one isn't committed yet
+            reader.start()
+            reader.join(timeout = 5)
+            self.assertFalse(reader.is_alive())
+        self.assertEqual(["Exercise"], loaded_names)
+        self.assertEqual(2, len(db.load_habit()))
+
+    def test_statistics_in_database(self) :
+        """Testing that the statistics calculated inside the database match the analytics-class,
+        for random daily, weekly and monthly habits, using the get_statistics_in_database-method"""
+        generator = random.Random(3)
+        today = datetime.date.today()
+        for i in range(60) :
+            frequency = ["daily", "weekly", "monthly"][i % 3]
+            start_date = today - datetime.timedelta(days = generator.randrange(-3, 300))
+            self.db.save_habit(Habit(f"Habit {i}", frequency, start_date))
+            dates = [today - datetime.timedelta(days = generator.randrange(-2, 320)) for _ in range(generator.choice([0, 3, 80]))]
+            if i % 2 == 0 :
+                step = {"daily" : 1, "weekly" : 7, "monthly" : 30}[frequency]
+                dates += [today - datetime.timedelta(days = step * n) for n in range(6)]
+            # the same date twice, which should only count once
+            dates += dates[:1]
+            # inserting the dates directly, so the same date is stored twice
+            self.db.connection.executemany("INSERT INTO completions (habit_id, completion_day) VALUES (?, ?)",
+                                           [(i + 1, date.toordinal()) for date in dates])
+        self.db.connection.commit()
+        loaded_habits = self.db.load_habit()
+        analytics = Analytics(loaded_habits)
+        stats = self.db.get_statistics_in_database()
+        self.assertEqual(60, len(stats))
+        for habit in loaded_habits :
+            self.assertEqual((habit.frequency, analytics.get_current_streak(habit), analytics.get_longest_streak(habit),
+                              analytics.get_missed_habits(habit)),
+                             (stats[habit.name]['frequency'], stats[habit.name]['current_streak'],
+                              stats[habit.name]['longest_streak'], stats[habit.name]['missed']), habit.name)
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_habit_summary(self, mock_stdout) :
+        """Testing that the summary-table is kept up to date by every write, also for completions that are older
+        than the newest one, and that rebuilding it from the completions gives the same rows"""
+        generator = random.Random(5)
+        today = datetime.date.today()
+        for i in range(30) :
+            habit = Habit(f"Habit {i}", ["daily", "weekly", "monthly"][i % 3], today - datetime.timedelta(days = 200))
+            self.db.save_habit(habit)
+            for _ in range(generator.randrange(0, 25)) :
+                date = today - datetime.timedelta(days = generator.randrange(0, 150))
+                if generator.random() < 0.5 :
+                    self.db.save_completion(habit, date)
+                else :
+                    self.db.save_completions([(habit, date), (habit, date - datetime.timedelta(days = 1))])
+        self.db.delete_habit("Habit 0")
+        summaries = self.db.get_summaries()
+        analytics = Analytics(self.db.load_habit())
+        for habit in analytics.habits :
+            self.assertEqual((len(habit.completed_dates), analytics.get_current_streak(habit),
+                              analytics.get_longest_streak(habit)),
+                             (summaries[habit.name]['completed_days'], summaries[habit.name]['current_streak'],
+                              summaries[habit.name]['longest_streak']), habit.name)
+        longest_habit, longest_streak = analytics.get_longest_streak_for_all()
+        self.assertEqual((longest_habit.name, longest_streak), self.db.get_longest_streak_in_database())
+        self.db.rebuild_summary()
+        self.assertEqual(summaries, self.db.get_summaries())
+        self.db.save_habit(Habit("Reading", "daily"))
+        self.assertEqual({'frequency' : "daily", 'completed_days' : 0, 'first_completion' : None, 'last_completion' : None,
+                          'current_streak' : 0, 'longest_streak' : 0}, self.db.get_summaries()["Reading"])
+        self.assertEqual((None, 0), self.db.for_user("alice").get_longest_streak_in_database())
+
     def test_delete_habit(self) :
         """Testing the deleting of a habit from the database,
         using the save_habit- and delete_habit-methods from the database-class"""
         self.db.save_habit(self.habit_daily)
         self.assertTrue(self.db.delete_habit("Exercise"))
 
+    def test_save_habit_with_existing_name(self) :
+        """Testing that the database refuses a 2nd habit with the same name"""
+        self.assertTrue(self.db.save_habit(self.habit_daily))
+        self.assertFalse(self.db.save_habit(Habit("Exercise", "weekly")))
+        self.assertEqual(1, len(self.db.load_habit()))
+
+    def test_migrate_old_database_file(self) :
+        """Testing the upgrade of a database file created before the schema versions existed,
+        including a habit name that was saved twice"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, "old_habits.db")
+        # creating the file the way the first version of the app did it
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE habits (id INTEGER PRIMARY KEY, name TEXT, frequency TEXT, start_date TEXT)")
+        connection.execute("CREATE TABLE completions (habit_id INTEGER, completion_date TEXT)")
+        connection.executemany("INSERT INTO habits (id, name, frequency, start_date) VALUES (?, ?, 'daily', '2024-01-01')",
+                               [(1, "Exercise"), (2, "Chores"), (3, "Exercise")])
+        connection.executemany("INSERT INTO completions (habit_id, completion_date) VALUES (?, ?)",
+                               [(1, "2024-01-02"), (3, "2024-01-03"), (2, "2024-01-04")])
+        connection.commit()
+        connection.close()
+
+        db = Database(path)
+        self.addCleanup(db.close)
+        self.assertEqual(SCHEMA_VERSION, db.get_schema_version())
+        db.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")
+        self.assertEqual([("idx_completions_habit_day",), ("idx_habits_user_name",), ("idx_summary_user_longest",),
+                          ("sqlite_autoindex_users_1",)],
+                         db.cursor.fetchall())
+        self.assertEqual(["default_user"], db.get_users())
+        loaded_habits = db.load_habit()
+        self.assertEqual(["Exercise", "Chores"], [habit.name for habit in loaded_habits])
+        self.assertEqual([datetime.date(2024, 1, 2), datetime.date(2024, 1, 3)], loaded_habits[0].completed_dates)
+        # the summary-table is filled from the completions that were already in the file
+        self.assertEqual(("Exercise", 2), db.get_longest_streak_in_database())
+
+    def test_reopen_current_database_file(self) :
+        """Testing that opening a file that's already at the current schema version doesn't create anything,
+        and that the change counter only goes up with commits that changed something"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, "habits.db")
+        db = Database(path)
+        db.save_habit(self.habit_daily)
+        db.close()
+        statements = []
+        connect = sqlite3.connect
+        def traced_connect(*args, **kwargs) :
+            connection = connect(*args, **kwargs)
+            connection.set_trace_callback(statements.append)
+            return connection
+        with patch('sqlite3.connect', traced_connect) :
+            db = Database(path)
+        self.addCleanup(db.close)
+        self.assertIn("PRAGMA user_version", statements)
+        self.assertFalse([statement for statement in statements if "CREATE" in statement or "INSERT" in statement])
+        counter = db.get_summary_rows()[0][1]
+        self.assertFalse(db.save_habit(Habit("Exercise", "weekly")))
+        self.assertEqual(counter, db.get_summary_rows()[0][1])
+        db.save_completion(self.habit_daily, datetime.date(2024, 1, 2))
+        self.assertEqual(counter + 1, db.get_summary_rows()[0][1])
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_migrate_dates_to_day_numbers(self, mock_stdout) :
+        """Testing the upgrade of the text dates to day numbers, including the start dates that save_habit
+        used to write as "YYYY-MM_DD", and dates that can't be read, which are kept instead of becoming today"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, "version_2.db")
+        connection = sqlite3.connect(path)
+        for migration in MIGRATIONS[:2] :
+            migration(connection.cursor())
+        connection.execute("PRAGMA user_version = 2")
+        connection.executemany("INSERT INTO habits (id, name, frequency, start_date) VALUES (?, ?, 'daily', ?)",
+                               [(1, "Exercise", "2024-01_05"), (2, "Chores", "someday"), (3, "Reading", None)])
+        connection.executemany("INSERT INTO completions (habit_id, completion_date) VALUES (?, ?)",
+                               [(1, "2024-01-06"), (1, "2024-02-30"), (2, "2024-03-01"), (2, "2024-02-01")])
+        connection.commit()
+        connection.close()
+
+        db = Database(path)
+        self.addCleanup(db.close)
+        self.assertEqual(SCHEMA_VERSION, db.get_schema_version())
+        self.assertIn("3 dates couldn't be read", mock_stdout.getvalue())
+        exercise, chores, reading = db.load_habit()
+        self.assertEqual(datetime.date(2024, 1, 5), exercise.start_date)
+        self.assertEqual([datetime.date(2024, 1, 6)], exercise.completed_dates)
+        # without a start date, a habit starts with its first completion
+        self.assertEqual(datetime.date(2024, 2, 1), chores.start_date)
+        self.assertEqual(datetime.date.today(), reading.start_date)
+        self.assertEqual([(1, "completion_date", "2024-02-30"), (2, "start_date", "someday"), (3, "start_date", None)],
+                         db.get_invalid_dates())
+        # the dates are stored as integers now
+        db.cursor.execute("SELECT typeof(start_day), typeof(completion_day) FROM habits JOIN completions ON habit_id = id")
+        self.assertEqual({("integer", "integer")}, set(db.cursor.fetchall()))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""This class is testing the asyncio-classes, running the database and the analytics on worker threads"""
+import unittest
+import asyncio
+import datetime
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from io import StringIO
+from Database import Database
+from Habit import Habit
+from Analytics import Analytics
+from AsyncDatabase import AsyncDatabase, AsyncAnalytics
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Creating a database file with 2 worker threads, a file, so the workers read through their own connections."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = AsyncDatabase(Database(os.path.join(self.directory.name, "habits.db")), max_workers = 2)
+        self.stdout = patch('sys.stdout', new_callable = StringIO)
+        self.stdout.start()
+
+    async def asyncTearDown(self):
+        """Cleaning up after each test."""
+        await self.db.close()
+        self.stdout.stop()
+        self.directory.cleanup()
+
+    async def test_reads_and_writes(self):
+        """Testing that the methods work like the ones of the database, on the worker threads."""
+        today = datetime.date.today()
+        self.assertTrue(await self.db.save_habit(Habit("Exercise", "daily", today - datetime.timedelta(days = 2))))
+        habit = (await self.db.load_habit())[0]
+        await asyncio.gather(*(self.db.save_completion(habit, today - datetime.timedelta(days = days)) for days in range(3)))
+        self.assertEqual([today, today - datetime.timedelta(days = 1)], await self.db.get_completions(habit, limit = 2,
+                                                                                                   newest_first = True))
+        self.assertEqual(3, (await self.db.get_statistics_in_database())["Exercise"]["current_streak"])
+        self.assertEqual(3, len((await self.db.load_habit())[0].completed_dates))
+        self.assertTrue(await self.db.delete_habit("Exercise"))
+        self.assertEqual([], await self.db.load_habit())
+
+    async def test_identical_reads_are_shared(self):
+        """Testing that identical reads running at the same time only run once, and that a write ends the sharing."""
+        calls = []
+        load_habit = self.db.db.load_habit
+
+        def slow_load_habit(*args):
+            calls.append(threading.current_thread().name)
+            time.sleep(0.05)
+            return load_habit(*args)
+        self.db.db.load_habit = slow_load_habit
+        await self.db.save_habit(Habit("Exercise", "daily"))
+        results = await asyncio.gather(*(self.db.load_habit() for _ in range(5)), self.db.load_habit(max_histories = 5))
+        self.assertEqual(2, len(calls))
+        self.assertTrue(all(name.startswith("habit-tracker-db") for name in calls))
+        self.assertIs(results[0], results[4])
+        self.assertIsNot(results[0], results[5])
+        # a read that starts after a write asks the database again
+        reading = asyncio.ensure_future(self.db.load_habit())
+        await asyncio.sleep(0)
+        await self.db.save_habit(Habit("Reading", "weekly"))
+        self.assertEqual(["Exercise", "Reading"], [habit.name for habit in await self.db.load_habit()])
+        await reading
+        self.assertEqual(4, len(calls))
+
+    async def test_event_loop_is_not_blocked(self):
+        """Testing that the event loop keeps running while a slow read runs on a worker thread."""
+        self.db.db.get_statistics_in_database = lambda today = None : time.sleep(0.1) or {}
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        ticker = asyncio.ensure_future(tick())
+        self.assertEqual({}, await self.db.get_statistics_in_database())
+        ticker.cancel()
+        self.assertGreater(ticks, 3)
+
+    async def test_analytics_reports(self):
+        """Testing the reports of the analytics-class, and that a new completion changes them."""
+        today = datetime.date.today()
+        await self.db.save_habit(Habit("Exercise", "daily", today - datetime.timedelta(days = 1)))
+        habits = await self.db.load_habit()
+        analytics = AsyncAnalytics(Analytics(habits), self.db)
+        first, second = await asyncio.gather(analytics.get_statistics(), analytics.get_statistics())
+        self.assertIs(first, second)
+        self.assertEqual(0, first["Exercise"]["current_streak"])
+        self.assertEqual(1, await analytics.get_all_missed_habits())
+        habits[0].add_completion(today)
+        await self.db.save_completion(habits[0], today)
+        self.assertEqual(1, (await analytics.get_statistics())["Exercise"]["current_streak"])
+        self.assertEqual((habits[0], 1), await analytics.get_longest_streak_for_all())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+"""This class is testing the batch-class, running commands and command files without the menu"""
+import unittest
+import os
+import tempfile
+import json
+import datetime
+import sqlite3
+import subprocess
+import sys
+from unittest.mock import patch
+from io import StringIO
+from Database import Database, DEFAULT_USER
+from Habit import Habit
+from Batch import Batch, create_parser, run_command
+import Snapshot
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        """Creating an in-memory database and a batch-runner saving 2 commands per transaction."""
+        self.db = Database(":memory:")
+        self.batch = Batch(self.db, batch_size = 2)
+
+    def tearDown(self):
+        """Cleaning up after each test."""
+        self.db.close()
+        del self.batch
+        del self.db
+
+    def execute(self, *argv):
+        """Parsing and running a single command, like "python Main.py ..."."""
+        worked = self.batch.execute(create_parser().parse_args(list(argv)))
+        self.batch.flush()
+        return worked
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_single_commands(self, mock_stdout):
+        """Testing the add-, done- and remove-commands."""
+        self.assertTrue(self.execute("add", "Exercise", "--frequency", "weekly", "--start-date", "2024-01-01"))
+        self.assertTrue(self.execute("done", "Exercise", "--date", "2024-01-03"))
+        habit = self.db.load_habit()[0]
+        self.assertEqual(("Exercise", "weekly", datetime.date(2024, 1, 1)), (habit.name, habit.frequency, habit.start_date))
+        self.assertEqual([datetime.date(2024, 1, 3)], list(habit.completed_dates))
+        self.assertTrue(self.execute("remove", "Exercise"))
+        self.assertEqual([], self.db.load_habit())
+
+    @patch('sys.stderr', new_callable = StringIO)
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_show_completions(self, mock_stdout, mock_stderr):
+        """Testing that the completions-command shows one page of dates, newest first."""
+        self.execute("add", "Exercise")
+        for day in range(1, 10):
+            self.execute("done", "Exercise", "--date", f"2024-03-0{day}")
+        mock_stdout.truncate(0)
+        mock_stdout.seek(0)
+        self.assertTrue(self.execute("completions", "Exercise", "--limit", "3", "--after", "2024-03-08"))
+        self.assertEqual("2024-03-07\n2024-03-06\n2024-03-05\n", mock_stdout.getvalue())
+        self.assertFalse(self.execute("completions", "Unknown"))
+
+    @patch('sys.stderr', new_callable = StringIO)
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_run_command_file(self, mock_stdout, mock_stderr):
+        """Testing a command file with comments, empty lines, invalid lines and more commands than one transaction."""
+        lines = StringIO("# a comment\n"
+                         "add Reading\n"
+                         "\n"
+                         'add "Morning run" --frequency daily\n'
+                         + "".join(f'done "Morning run" --date 2024-02-{day:02d}\n' for day in range(1, 8))
+                         + "done Reading --date 2024-02-30\n"
+                         "fly Reading\n"
+                         "done Reading --date 2024-02-02\n")
+        with patch.object(self.db, "_commit", wraps = self.db._commit) as commit:
+            self.assertEqual(2, self.batch.run(lines))
+        # 11 valid commands in transactions of 2 commands, instead of one commit per command
+        self.assertLessEqual(commit.call_count, 12)
+        self.assertIn("Error in line 13", mock_stderr.getvalue())
+        self.assertIn("Error in line 12 ", mock_stderr.getvalue())
+        habits = {habit.name : habit for habit in self.db.load_habit()}
+        self.assertEqual(7, len(habits["Morning run"].completed_dates))
+        self.assertEqual([datetime.date(2024, 2, 2)], list(habits["Reading"].completed_dates))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_import_and_export(self, mock_stdout):
+        """Testing the import- and export-commands with files."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "completions.csv")
+            with open(source, "w", encoding = "utf-8") as file:
+                file.write("habit,date\nExercise,2024-01-01\nExercise,2024-01-02\nUnknown,2024-01-02\n")
+            self.execute("add", "Exercise")
+            self.assertTrue(self.execute("import", source))
+            self.assertIn("Imported 0 habits and 2 completions, skipped 1 records.", mock_stdout.getvalue())
+            target = os.path.join(directory, "backup.jsonl")
+            self.assertTrue(self.execute("export", target))
+            with open(target, encoding = "utf-8") as file:
+                lines = [json.loads(line) for line in file]
+        self.assertEqual(3, len(lines))
+        self.assertEqual({"type" : "completion", "habit" : "Exercise", "date" : "2024-01-02"}, lines[-1])
+
+    @patch('sys.stderr', new_callable = StringIO)
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_users_and_merge(self, mock_stdout, mock_stderr):
+        """Testing the "--user" option and the merge-command, which uses the file name as the user name."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alice.db")
+            source = Batch(Database(path))
+            source.execute(create_parser().parse_args(["add", "Exercise"]))
+            source.db.close()
+            self.assertTrue(self.execute("merge", path))
+            self.assertIn("Merged 1 habits and 0 completions into the user 'alice'.", mock_stdout.getvalue())
+            self.assertTrue(self.execute("merge", path, "--into", "bob"))
+            self.assertFalse(self.execute("merge", os.path.join(directory, "missing.db")))
+        self.assertNotIn("missing", self.db.get_users())
+        self.assertEqual([], self.db.load_habit())
+        self.assertEqual(["Exercise"], [habit.name for habit in self.db.for_user("bob").load_habit()])
+        args = create_parser().parse_args(["--user", "alice", "stats"])
+        self.assertEqual("alice", args.user)
+
+    @patch('sys.stderr', new_callable = StringIO)
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_global_options_in_command_file(self, mock_stdout, mock_stderr):
+        """Testing that a line of a command file can't switch to another database file or user,
+        or switch on the timings or the profile, instead of silently running on the command file's own."""
+        self.execute("add", "Jog")
+        self.db.for_user("bob").save_habit(Habit("Jog", "daily"))
+        lines = StringIO("--user bob done Jog --date 2026-10-01\n"
+                         "--db other.db add X\n"
+                         "--timings stats\n"
+                         "--profile session.prof stats\n"
+                         f"--user {DEFAULT_USER} done Jog --date 2026-10-02\n")
+        self.assertEqual(4, self.batch.run(lines))
+        for number in range(1, 5):
+            self.assertIn(f"Error in line {number} : --db, --user", mock_stderr.getvalue())
+        self.assertEqual([datetime.date(2026, 10, 2)], list(self.db.load_habit()[0].completed_dates))
+        self.assertEqual([], list(self.db.for_user("bob").load_habit()[0].completed_dates))
+        self.assertEqual(["Jog"], [habit.name for habit in self.db.load_habit()])
+        self.assertFalse(os.path.exists("other.db"))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_done_for_unknown_habit(self, mock_stdout):
+        """Testing that a done-command for a habit that doesn't exist fails, on its own and in a command file."""
+        self.execute("add", "Exercise")
+        self.assertEqual(1, self.batch.run(StringIO("done nosuch\ndone Exercise\n")))
+        self.assertEqual(2, self.batch.run(StringIO("done nosuch\ndone other\nadd Reading\n")))
+        self.assertEqual(1, len(self.db.load_habit()[0].completed_dates))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "habits.db")
+            self.assertEqual(0, run_command(create_parser().parse_args(["--db", path, "add", "Exercise"])))
+            self.assertEqual(1, run_command(create_parser().parse_args(["--db", path, "done", "nosuch"])))
+            self.assertEqual(0, run_command(create_parser().parse_args(["--db", path, "done", "Exercise"])))
+
+    @patch('sys.stderr', new_callable = StringIO)
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_merge_in_command_file(self, mock_stdout, mock_stderr):
+        """Testing a merge-command between other commands of a command file, which commits the commands before it,
+        and that merging inside a transaction-block is refused before anything is merged."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "src.db")
+            source = Batch(Database(path))
+            source.execute(create_parser().parse_args(["add", "Exercise"]))
+            source.execute(create_parser().parse_args(["done", "Exercise", "--date", "2024-01-02"]))
+            source.flush()
+            source.db.close()
+            lines = StringIO(f'add Reading\ndone Reading --date 2024-01-01\nmerge "{path}"\ndone Reading --date 2024-01-02\n')
+            self.assertEqual(0, self.batch.run(lines))
+            self.assertEqual("", mock_stderr.getvalue())
+            self.assertIn("Merged 1 habits and 1 completions into the user 'src'.", mock_stdout.getvalue())
+            with self.assertRaises(sqlite3.OperationalError):
+                with self.db.transaction():
+                    self.db.for_user("bob").merge_file(path)
+            self.assertEqual(0, self.batch.run(StringIO(f'merge "{path}" --into carol\n')))
+        habits = self.db.for_user("src").load_habit()
+        self.assertEqual([("Exercise", [datetime.date(2024, 1, 2)])],
+                         [(habit.name, list(habit.completed_dates)) for habit in habits])
+        self.assertEqual(2, len(self.db.load_habit()[0].completed_dates))
+        self.assertEqual([], self.db.for_user("bob").load_habit())
+        self.assertEqual(["Exercise"], [habit.name for habit in self.db.for_user("carol").load_habit()])
+        self.assertNotIn("source", [row[1] for row in self.db.connection.execute("PRAGMA database_list")])
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_rebuild_summary(self, mock_stdout):
+        """Testing the rebuild-summary-command, after completions were written without the database-class."""
+        self.execute("add", "Exercise", "--start-date", "2024-01-01")
+        self.execute("done", "Exercise", "--date", "2024-01-02")
+        self.db.connection.executemany("INSERT INTO completions (habit_id, completion_day) VALUES (1, ?)",
+                                       [(datetime.date(2024, 1, day).toordinal(),) for day in (3, 4)])
+        self.db.connection.commit()
+        self.assertEqual(("Exercise", 1), self.db.get_longest_streak_in_database())
+        self.assertTrue(self.execute("rebuild-summary"))
+        self.assertIn("Rebuilt the summary of 1 habits with completions.", mock_stdout.getvalue())
+        self.assertEqual(("Exercise", 3), self.db.get_longest_streak_in_database())
+
+    def test_list_from_snapshot(self):
+        """Testing that the list-command is answered from the snapshot file without opening the database,
+        until a later command changes the database."""
+        today = datetime.date.today()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "habits.db")
+            def run(*argv):
+                with patch('sys.stdout', new_callable = StringIO) as mock_stdout:
+                    self.assertEqual(0, run_command(create_parser().parse_args(["--db", path] + list(argv))))
+                return mock_stdout.getvalue()
+            run("add", "Exercise", "--start-date", "2024-01-01")
+            run("done", "Exercise", "--date", today.isoformat())
+            first = run("list")
+            self.assertEqual(f"Exercise (daily) : 1 completed days, current streak 1, longest streak 1, "
+                             f"last completion {today.isoformat()}\n", first)
+            self.assertTrue(os.path.exists(Snapshot.snapshot_path(path)))
+            with patch('Database.Database', side_effect = AssertionError("the database was opened")):
+                self.assertEqual(first, run("list"))
+            # a new interpreter answers from the snapshot without even importing the database-module
+            script = ("import sys, Main; Main.main(['--db', sys.argv[1], 'list']); "
+                      "print(sorted({'Database', 'ImportExport', 'Habit', 'Analytics'} & set(sys.modules)))")
+            output = subprocess.run([sys.executable, "-c", script, path], capture_output = True, text = True, check = True,
+                                    cwd = os.path.dirname(os.path.abspath(__file__))).stdout
+            self.assertEqual(first + "[]\n", output)
+            run("done", "Exercise", "--date", (today - datetime.timedelta(days = 1)).isoformat())
+            self.assertIsNone(Snapshot.load(path, DEFAULT_USER))
+            summary = json.loads(run("list", "--format", "json"))["Exercise"]
+            self.assertEqual((2, 2), (summary["completed_days"], summary["current_streak"]))
+            # other users aren't in the snapshot yet
+            self.assertIsNone(Snapshot.load(path, "alice"))
+
+    def test_time_series(self):
+        """Testing the series-command, which prints the time series of all habits as JSON."""
+        with patch('sys.stdout', new_callable = StringIO):
+            self.execute("add", "Exercise", "--start-date", "2024-01-01")
+            self.execute("done", "Exercise", "--date", "2024-01-03")
+        with patch('sys.stdout', new_callable = StringIO) as mock_stdout:
+            self.assertTrue(self.execute("series", "--window", "2", "--since", "2024-01-01", "--until", "2024-01-04"))
+        self.assertEqual({"dates" : ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+                          "habits" : {"Exercise" : {"rates" : [0.0, 0.0, 0.5, 0.5], "weekly" : [["2024-01-01", 1]],
+                                                    "monthly" : [["2024-01-01", 1]], "weekdays" : [0, 0, 1, 0, 0, 0, 0]}}},
+                         json.loads(mock_stdout.getvalue()))
+
+    def test_statistics_backends(self):
+        """Testing that every backend prints the same statistics as JSON."""
+        today = datetime.date.today()
+        with patch('sys.stdout', new_callable = StringIO):
+            self.execute("add", "Exercise", "--start-date", (today - datetime.timedelta(days = 5)).isoformat())
+            for days in range(3):
+                self.execute("done", "Exercise", "--date", (today - datetime.timedelta(days = days)).isoformat())
+        results = []
+        for backend in ["python", "numpy", "sql", "parallel"]:
+            with patch('sys.stdout', new_callable = StringIO) as mock_stdout:
+                self.assertTrue(self.execute("stats", "--format", "json", "--backend", backend))
+            results.append(json.loads(mock_stdout.getvalue()))
+        self.assertEqual({"Exercise" : {"frequency" : "daily", "current_streak" : 3, "longest_streak" : 3, "missed" : 3}},
+                         results[0])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[0], results[3])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -41,6 +41,16 @@ class TestCLI(unittest.TestCase):
         # Testing the amount of habits in the user-habits-list, should be 1
         self.assertEqual( 1, len(self.user.habits))
 
+    # Adding the same habit twice
+    @patch('builtins.input', side_effect = ["1", "Exercise", "daily", "1", "Exercise", "weekly", "7"])
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_add_existing_habit(self, mock_stdout, mock_input):
+        """Testing that the same habit can't be added twice via CLI."""
+        self.cli.input_command()
+        output = mock_stdout.getvalue()
+        self.assertIn("A habit with name 'Exercise' already exists !", output)
+        self.assertEqual(1, len(self.user.habits))
+
     # Adding and removing a habit
     @patch('builtins.input', side_effect=["1", "Exercise", "daily", "2", "1", "y", "7"])
     @patch('sys.stdout', new_callable=StringIO)
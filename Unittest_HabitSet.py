@@ -0,0 +1,100 @@
+"""This class is testing the habit-set-class, which holds many habits in columns,
+and that the analytics-classes calculate the same statistics from it as from habit-objects"""
+import unittest
+import datetime
+import random
+import weakref
+from unittest.mock import patch
+from io import StringIO
+from Habit import Habit
+from User import User
+from HabitSet import HabitSet
+from Analytics import Analytics
+from NumpyAnalytics import NumpyAnalytics
+from ParallelAnalytics import ParallelAnalytics
+from Database import Database
+
+class TestHabitSet(unittest.TestCase):
+    def setUp(self):
+        """Creating 50 habits with random frequencies, start dates and completions (seeded, so every run is the same)."""
+        generator = random.Random(13)
+        today = datetime.date.today()
+        self.habits = []
+        for i in range(50):
+            habit = Habit(f"Habit {i}", generator.choice(["daily", "weekly", "monthly", "yearly"]),
+                          today - datetime.timedelta(days = generator.randrange(-2, 300)))
+            habit.completed_dates = [today - datetime.timedelta(days = generator.randrange(-2, 320))
+                                     for _ in range(generator.choice([0, 5, 60]))]
+            self.habits.append(habit)
+
+    def test_columns_and_views(self):
+        """Testing the columns of a habit-set, and that its habit-objects have the same data."""
+        habit_set = HabitSet(self.habits)
+        self.assertEqual(50, len(habit_set))
+        self.assertEqual(sum(len(habit.completed_dates) for habit in self.habits), len(habit_set.days))
+        self.assertEqual(list(self.habits[3].completed_dates.day_numbers), list(habit_set.day_numbers(3)))
+        for habit, view in zip(self.habits, habit_set):
+            self.assertEqual((habit.name, habit.frequency, habit.start_date, habit.completed_dates),
+                             (view.name, view.frequency, view.start_date, view.completed_dates))
+        self.assertEqual(self.habits[-1].name, habit_set[-1].name)
+        self.assertEqual([habit.name for habit in self.habits[2:4]], [habit.name for habit in habit_set[2:4]])
+        self.assertEqual(self.habits[7].completed_dates.newest(3), habit_set.newest(7, 3))
+        self.assertEqual("Habit 7", habit_set.get("Habit 7").name)
+        self.assertIsNone(habit_set.get("Unknown"))
+        self.assertEqual([habit.name for habit in self.habits if habit.frequency == "weekly"],
+                         habit_set.names_by_frequency("weekly"))
+        with self.assertRaises(IndexError):
+            habit_set[50]
+        # changing a view doesn't change the set
+        view = habit_set[0]
+        view.add_completion(datetime.date.today() + datetime.timedelta(days = 10))
+        self.assertEqual(len(self.habits[0].completed_dates), len(habit_set.day_numbers(0)))
+
+    def test_same_statistics_as_habit_objects(self):
+        """Testing that every analytics-class calculates the same statistics from a habit-set as from habit-objects."""
+        analytics = Analytics(self.habits)
+        habit_set = HabitSet(self.habits)
+        expected = analytics.get_statistics(recent = 4)
+        longest_habit, longest_streak = analytics.get_longest_streak_for_all()
+        for columnar in [Analytics(habit_set), NumpyAnalytics(habit_set),
+                         ParallelAnalytics(habit_set, workers = 2, min_habits = 0)]:
+            self.assertEqual(expected, columnar.get_statistics(recent = 4))
+            self.assertEqual(analytics.get_all_missed_habits(), columnar.get_all_missed_habits())
+            habit, streak = columnar.get_longest_streak_for_all()
+            self.assertEqual((longest_habit.name, longest_streak), (habit.name, streak))
+        columnar = Analytics(habit_set)
+        self.assertEqual(analytics.list_current_habits(), columnar.list_current_habits())
+        self.assertEqual(analytics.list_habits_by_periodicity("monthly"), columnar.list_habits_by_periodicity("monthly"))
+        self.assertEqual(analytics.longest_streak_for_specific_habit("Habit 5"),
+                         columnar.longest_streak_for_specific_habit("Habit 5"))
+        self.assertEqual((None, 0), Analytics(HabitSet()).get_longest_streak_for_all())
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_load_habit_as_habit_set(self, mock_stdout):
+        """Testing that the database loads the same habits into a habit-set as into habit-objects,
+        with a date that was saved twice."""
+        db = Database(":memory:")
+        self.addCleanup(db.close)
+        db.save_habits(self.habits)
+        db.save_completions((habit, date) for habit in self.habits for date in habit.completed_dates)
+        completed = next(habit for habit in self.habits if habit.completed_dates)
+        db.save_completions([(completed, completed.completed_dates[0])])
+        habit_set = db.load_habit(columnar = True)
+        self.assertIsInstance(habit_set, HabitSet)
+        expected = HabitSet(db.load_habit())
+        for column in ['names', 'frequencies', 'codes', 'starts', 'habit_ids', 'offsets', 'days']:
+            self.assertEqual(getattr(expected, column), getattr(habit_set, column), column)
+
+    def test_slots(self):
+        """Testing that habits and users have no per-object dictionary, but can still be weakly referenced."""
+        habit = Habit("Exercise", "daily")
+        user = User("test_user")
+        for instance in [habit, user, habit.completed_dates, user.habits]:
+            self.assertFalse(hasattr(instance, "__dict__"))
+        with self.assertRaises(AttributeError):
+            habit.color = "red"
+        self.assertIs(habit, weakref.ref(habit)())
+        self.assertIs(user, weakref.ref(user)())
+
+if __name__ == "__main__":
+    unittest.main()
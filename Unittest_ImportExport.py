@@ -0,0 +1,117 @@
+"""This class is testing the import and export of habits and completions as CSV and JSON Lines files"""
+import unittest
+import datetime
+from unittest.mock import patch
+from io import StringIO
+from Database import Database
+from Habit import Habit
+from ImportExport import ImportExport, batches
+
+class TestImportExport(unittest.TestCase):
+    def setUp(self):
+        """Creating an in-memory database and an importer saving 3 rows per batch."""
+        self.db = Database(":memory:")
+        self.progress = []
+        self.importer = ImportExport(self.db, batch_size = 3, progress = self.progress.append)
+
+    def tearDown(self):
+        """Cleaning up after each test."""
+        self.db.close()
+        del self.importer
+        del self.db
+
+    def test_batches(self):
+        """Testing that the batches are read lazily, without reading the whole iterable."""
+        numbers = iter(range(7))
+        split = batches(numbers, 3)
+        self.assertEqual([0, 1, 2], next(split))
+        self.assertEqual(3, next(numbers))
+        self.assertEqual([[4, 5, 6]], list(split))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_import_jsonl(self, mock_stdout):
+        """Testing a JSON Lines import with habits, completions of the same batch, duplicates and invalid lines."""
+        lines = StringIO('{"type": "habit", "name": "Exercise", "frequency": "weekly", "start_date": "2024-01-01"}\n'
+                         '{"type": "completion", "habit": "Exercise", "date": "2024-01-02"}\n'
+                         '{"habit": "Exercise", "date": "2024-01-09"}\n'
+                         'not json\n'
+                         '\n'
+                         '{"type": "completion", "habit": "Exercise", "date": "2024-13-01"}\n'
+                         '{"type": "habit", "name": "Exercise", "frequency": "daily"}\n'
+                         '{"type": "completion", "habit": "Reading", "date": "2024-01-09"}\n')
+        counts = self.importer.import_file(lines, "jsonl")
+        self.assertEqual({'habits' : 1, 'completions' : 2, 'skipped' : 4}, counts)
+        self.assertEqual([3, 6, 7], self.progress)
+        habit = self.db.load_habit()[0]
+        self.assertEqual(("Exercise", "weekly"), (habit.name, habit.frequency))
+        self.assertEqual([datetime.date(2024, 1, 2), datetime.date(2024, 1, 9)], list(habit.completed_dates))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_import_csv_without_header(self, mock_stdout):
+        """Testing a CSV import without a header, where the number of columns tells habits and completions apart."""
+        counts = self.importer.import_file(StringIO("Reading,daily,2024-01-01\nReading,2024-01-01\nReading,2024-01-02\n"))
+        self.assertEqual({'habits' : 1, 'completions' : 2, 'skipped' : 0}, counts)
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_import_invalid_habits(self, mock_stdout):
+        """Testing that habits with an unknown frequency or an invalid start date are skipped, not saved
+        with a frequency nothing can count or with today as the start date, and that a missing start date is still fine."""
+        counts = self.importer.import_file(StringIO("bar,fortnightly,2024-01-01\n"
+                                                    "baz,daily,2024-13-45\n"
+                                                    "Reading,weekly,\n"
+                                                    "bar,2024-01-02\n"))
+        self.assertEqual({'habits' : 1, 'completions' : 0, 'skipped' : 3}, counts)
+        self.assertEqual([("Reading", "weekly", datetime.date.today())],
+                         [(habit.name, habit.frequency, habit.start_date) for habit in self.db.load_habit()])
+        self.assertIn("fortnightly", mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_export_and_import_again(self, mock_stdout):
+        """Testing that an exported file can be imported into an empty database again, in both formats."""
+        habit = Habit("Exercise", "daily")
+        self.db.save_habit(habit)
+        today = datetime.date.today()
+        self.db.save_completions((habit, today - datetime.timedelta(days = day)) for day in range(10))
+        for file_format in ["csv", "jsonl"]:
+            habits, completions = StringIO(), StringIO()
+            if file_format == "csv":
+                self.assertEqual(1, self.importer.export_file(habits, "csv", "habits"))
+            self.assertEqual(10, self.importer.export_file(completions, file_format, "completions"))
+            copy = Database(":memory:")
+            importer = ImportExport(copy, batch_size = 4)
+            if file_format == "csv":
+                importer.import_file(StringIO(habits.getvalue()), "csv")
+            else:
+                self.importer.export_file(habits, "jsonl", "habits")
+                importer.import_file(StringIO(habits.getvalue()), "jsonl")
+            importer.import_file(StringIO(completions.getvalue()), file_format)
+            self.assertEqual(self.db.load_habit()[0].completed_dates, copy.load_habit()[0].completed_dates)
+            copy.close()
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_import_twice(self, mock_stdout):
+        """Testing that importing the same completions again, or a date twice in one file, doesn't save duplicate rows,
+        the completions that are already saved count as skipped."""
+        habit = Habit("Exercise", "daily")
+        self.db.save_habit(habit)
+        self.db.save_completion(habit, datetime.date(2024, 1, 1))
+        exported = StringIO()
+        self.importer.export_file(exported, "csv", "completions")
+        for _ in range(2):
+            counts = self.importer.import_file(StringIO(exported.getvalue()))
+            self.assertEqual({'habits' : 0, 'completions' : 0, 'skipped' : 1}, counts)
+        counts = self.importer.import_file(StringIO("Exercise,2024-01-02\nExercise,2024-01-02\n"))
+        self.assertEqual({'habits' : 0, 'completions' : 1, 'skipped' : 1}, counts)
+        self.assertEqual(2, self.db.connection.execute("SELECT COUNT(*) FROM completions").fetchone()[0])
+        exported = StringIO()
+        self.assertEqual(2, self.importer.export_file(exported, "csv", "completions"))
+
+    def test_unknown_format(self):
+        """Testing that an unknown format is refused."""
+        with self.assertRaises(ValueError):
+            self.importer.import_file(StringIO(""), "xml")
+        with self.assertRaises(ValueError):
+            self.importer.export_file(StringIO(), "xml")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""This class is testing the instrumentation-class, which counts and times the database- and analytics-methods"""
+import unittest
+import datetime
+from unittest.mock import patch
+from io import StringIO
+from Database import Database
+from Habit import Habit
+from User import User
+from Analytics import Analytics
+from CLI import CLI
+from Instrumentation import Instrumentation, Counter
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        """Creating an in-memory database and an analytics-object, both instrumented."""
+        self.db = Database(":memory:")
+        self.user = User("test_user")
+        self.analytics = Analytics(self.user.habits)
+        self.instrumentation = Instrumentation()
+        self.instrumentation.instrument_database(self.db)
+        self.instrumentation.instrument_analytics(self.analytics)
+
+    def tearDown(self):
+        """Cleaning up after each test."""
+        self.db.close()
+        del self.db
+        del self.user
+        del self.analytics
+        del self.instrumentation
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_counts_methods_rows_and_statements(self, mock_stdout):
+        """Testing the calls, rows and traced statements, with statements that only differ in their values counted together."""
+        today = datetime.date.today()
+        for name in ["Exercise", "Reading"]:
+            self.db.save_habit(Habit(name, "daily"))
+        self.db.save_completions((name, today) for name in ["Exercise", "Reading"])
+        with self.assertLogs("habit_tracker.sql", level = "DEBUG") as logs:
+            habits = self.db.load_habit()
+        self.assertTrue(any("JOIN completions" in line for line in logs.output))
+        for habit in habits:
+            self.user.add_habit(habit)
+        self.analytics.get_statistics()
+        counters = self.instrumentation.counters
+        self.assertEqual(2, counters["Database.save_habit"].calls)
+        self.assertEqual(2, counters["Database.load_habit"].rows)
+        self.assertEqual(1, counters["Analytics.get_statistics"].calls)
+        # get_statistics calls the other analytics-methods, which are counted as well
+        self.assertEqual(2, counters["Analytics.get_current_streak"].calls)
+        self.assertEqual(2, counters["SQL INSERT INTO habits (user_id, name, frequency, start_day) VALUES (?, ?,"].calls)
+        self.assertGreater(counters["Database.load_habit"].total, 0)
+        report = self.instrumentation.report()
+        self.assertIn("Database.save_completions", report)
+        self.assertIn("p99 ms", report)
+        self.instrumentation.reset()
+        self.assertEqual({}, self.instrumentation.counters)
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_generators_and_transactions(self, mock_stdout):
+        """Testing that a returned generator is counted once it's used up, with the rows it yielded,
+        and that the transaction-block isn't counted as a call of its own."""
+        with self.db.transaction():
+            self.db.save_habit(Habit("Exercise", "daily"))
+            self.db.save_completions(("Exercise", datetime.date(2024, 1, day)) for day in range(1, 11))
+        self.assertNotIn("Database.transaction", self.instrumentation.counters)
+        completions = self.db.iterate_completions()
+        self.assertNotIn("Database.iterate_completions", self.instrumentation.counters)
+        self.assertEqual(10, len(list(completions)))
+        counter = self.instrumentation.counters["Database.iterate_completions"]
+        self.assertEqual((1, 10), (counter.calls, counter.rows))
+        # a generator that's closed early counts the rows it yielded until then
+        habits = self.db.iterate_habits()
+        next(habits)
+        habits.close()
+        counter = self.instrumentation.counters["Database.iterate_habits"]
+        self.assertEqual((1, 1), (counter.calls, counter.rows))
+
+    def test_percentiles(self):
+        """Testing the p50 and p99 of a counter."""
+        counter = Counter()
+        self.assertEqual(0.0, counter.percentile(50))
+        for milliseconds in range(1, 101):
+            counter.add(milliseconds / 1000, rows = 1)
+        self.assertEqual((100, 100), (counter.calls, counter.rows))
+        self.assertAlmostEqual(0.050, counter.percentile(50))
+        self.assertAlmostEqual(0.099, counter.percentile(99))
+
+    @patch('builtins.input', side_effect = ["8", "7"])
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_timings_in_menu(self, mock_stdout, mock_input):
+        """Testing the menu entry that shows the timings, which only exists with the instrumentation."""
+        CLI(self.user, self.db, self.analytics, self.instrumentation).input_command()
+        self.assertIn("8. Show timings", mock_stdout.getvalue())
+        self.assertIn("total ms", mock_stdout.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""This class is testing that the NumPy-analytics-class calculates exactly the same statistics as the analytics-class,
+using randomly created habits, with and without NumPy being installed"""
+import unittest
+import datetime
+import random
+from unittest.mock import patch
+import NumpyAnalytics
+from Habit import Habit
+from Analytics import Analytics
+from NumpyAnalytics import NumpyAnalytics as VectorAnalytics
+
+class TestNumpyAnalytics(unittest.TestCase) :
+    def setUp(self) :
+        """Creating 300 habits with random frequencies, start dates and completions,
+        including habits without completions, completions before the start date and a habit starting in the future."""
+        generator = random.Random(7)
+        today = datetime.date.today()
+        self.habits = []
+        for i in range(300) :
+            habit = Habit(f"Habit {i}", generator.choice(["daily", "weekly", "monthly"]),
+                          today - datetime.timedelta(days = generator.randrange(-5, 400)))
+            count = generator.choice([0, 1, 5, 40, 200])
+            habit.completed_dates = [today - datetime.timedelta(days = generator.randrange(-2, 420)) for _ in range(count)]
+            # some habits are completed every day/week until today, so they have a current streak
+            if i % 4 == 0 :
+                step = {"daily" : 1, "weekly" : 7, "monthly" : 30}[habit.frequency]
+                habit.completed_dates.extend(today - datetime.timedelta(days = step * n) for n in range(10))
+            self.habits.append(habit)
+        self.habits.append(Habit("Unknown frequency", "yearly", today - datetime.timedelta(days = 30)))
+        self.habits[-1].completed_dates = [today]
+        self.analytics = Analytics(self.habits)
+
+    def tearDown(self) :
+        """Cleaning up after each test."""
+        del self.habits
+        del self.analytics
+
+    def assert_same_results(self, vector_analytics) :
+        """Comparing every result of the NumPy-analytics with the analytics-class."""
+        self.assertEqual(self.analytics.get_statistics(), vector_analytics.get_statistics())
+        self.assertEqual(self.analytics.get_all_missed_habits(), vector_analytics.get_all_missed_habits())
+        self.assertEqual(self.analytics.get_longest_streak_for_all(), vector_analytics.get_longest_streak_for_all())
+        current, longest, missed = vector_analytics.calculate()
+        for index, habit in enumerate(self.habits) :
+            self.assertEqual(self.analytics.get_current_streak(habit), current[index], habit.name)
+            self.assertEqual(self.analytics.get_longest_streak(habit), longest[index], habit.name)
+            self.assertEqual(self.analytics.get_missed_habits(habit), missed[index], habit.name)
+
+    @unittest.skipUnless(VectorAnalytics.is_available(), "NumPy is not installed")
+    def test_same_results_with_numpy(self) :
+        """Testing the NumPy calculations against the analytics-class."""
+        self.assert_same_results(VectorAnalytics(self.habits))
+
+    def test_same_results_without_numpy(self) :
+        """Testing that the methods fall back to the analytics-class if NumPy isn't installed."""
+        with patch.object(NumpyAnalytics, "np", None) :
+            self.assertFalse(VectorAnalytics.is_available())
+            self.assert_same_results(VectorAnalytics(self.habits))
+
+    @unittest.skipUnless(VectorAnalytics.is_available(), "NumPy is not installed")
+    def test_no_habits(self) :
+        """Testing the NumPy calculations without any habits or completions."""
+        vector_analytics = VectorAnalytics([])
+        self.assertEqual((None, 0), vector_analytics.get_longest_streak_for_all())
+        self.assertEqual(0, vector_analytics.get_all_missed_habits())
+        self.assertEqual({}, vector_analytics.get_statistics())
+        self.assertEqual(([0], [0], [0]), VectorAnalytics([Habit("Exercise", "daily")]).calculate())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""This class is testing the parallel analytics-class, which has to return the same statistics as the analytics-class"""
+import unittest
+import datetime
+import os
+import random
+import tempfile
+from array import array
+from unittest.mock import patch
+from io import StringIO
+from Database import Database
+from Habit import Habit
+from Analytics import Analytics
+from ParallelAnalytics import ParallelAnalytics, pack, calculate_chunk, get_statistics_for_users
+
+class TestParallelAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Creating 60 habits with random frequencies, start dates and completions (seeded, so every run is the same)."""
+        generator = random.Random(7)
+        today = datetime.date.today()
+        self.habits = []
+        for i in range(60):
+            habit = Habit(f"Habit {i}", generator.choice(["daily", "weekly", "monthly"]),
+                          today - datetime.timedelta(days = generator.randrange(1, 400)))
+            habit.completed_dates = [today - datetime.timedelta(days = generator.randrange(0, 400))
+                                     for _ in range(generator.randrange(0, 80))]
+            self.habits.append(habit)
+
+    def test_pack_and_calculate_chunk(self):
+        """Testing that the packed arrays hold the day numbers, and that a chunk gives the results of the analytics-class."""
+        frequencies, starts, counts, days = pack(self.habits[:3])
+        self.assertIsInstance(days, array)
+        self.assertEqual(sum(len(habit.completed_dates) for habit in self.habits[:3]), len(days))
+        self.assertEqual(list(self.habits[0].completed_dates.day_numbers), list(days[:counts[0]]))
+        analytics = Analytics(self.habits)
+        expected = [(analytics.get_current_streak(habit), analytics.get_longest_streak(habit),
+                     analytics.get_missed_habits(habit)) for habit in self.habits[:3]]
+        self.assertEqual(expected, calculate_chunk(frequencies, starts, counts, days))
+
+    def test_same_statistics_as_serial(self):
+        """Testing that the statistics of the process pool are the same as the ones of the analytics-class."""
+        expected = Analytics(self.habits).get_statistics(recent = 5)
+        parallel = ParallelAnalytics(self.habits, workers = 2, min_habits = 0)
+        statistics = parallel.get_statistics(recent = 5)
+        self.assertEqual(list(expected), list(statistics))
+        self.assertEqual(expected, statistics)
+        self.assertEqual(Analytics(self.habits).get_all_missed_habits(), parallel.get_all_missed_habits())
+        self.assertEqual(Analytics(self.habits).get_longest_streak_for_all(), parallel.get_longest_streak_for_all())
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_statistics_for_users(self, mock_stdout):
+        """Testing the statistics of every user of a database file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "habits.db")
+            db = Database(path)
+            db.save_habits(self.habits[:2])
+            other = db.for_user("alice")
+            other.save_habits(self.habits[2:5])
+            other.save_completions((habit.name, date) for habit in self.habits[2:5] for date in habit.completed_dates)
+            db.close()
+            statistics = get_statistics_for_users(path, workers = 2)
+        self.assertEqual(["default_user", "alice"], list(statistics))
+        self.assertEqual([habit.name for habit in self.habits[:2]], list(statistics["default_user"]))
+        self.assertEqual(Analytics(self.habits[2:5]).get_statistics(), statistics["alice"])
+        with self.assertRaises(ValueError):
+            get_statistics_for_users(":memory:")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""This class is testing the period-module, which numbers the days, calendar weeks and calendar months,
+and that every way of calculating the statistics agrees on registered frequencies"""
+import unittest
+import datetime
+import random
+from unittest.mock import patch
+from io import StringIO
+import Period
+from Period import (FREQUENCIES, period_index, period_indexes, count_missed, every_n_days, on_weekdays,
+                    register_frequency)
+from Streak import Streak
+from Habit import Habit
+from Analytics import Analytics
+from NumpyAnalytics import NumpyAnalytics
+from Database import Database
+
+def day(year, month, day) :
+    """Returns the day number of a date."""
+    return datetime.date(year, month, day).toordinal()
+
+class TestPeriod(unittest.TestCase) :
+    def setUp(self) :
+        """Registering 2 more frequencies, which are removed again after each test."""
+        self.registry = patch.dict(Period.FREQUENCIES)
+        self.registry.start()
+        register_frequency("every 3 days", every_n_days(3))
+        register_frequency("mon wed fri", on_weekdays(0, 2, 4))
+
+    def tearDown(self) :
+        """Removing the registered frequencies."""
+        self.registry.stop()
+
+    def test_calendar_periods(self) :
+        """Testing that calendar weeks start on Monday and that calendar months of any length follow each other."""
+        # 2024-01-07 was a Sunday, 2024-01-08 a Monday
+        self.assertEqual(period_index("weekly", day(2024, 1, 1)), period_index("weekly", day(2024, 1, 7)))
+        self.assertEqual(period_index("weekly", day(2024, 1, 7)) + 1, period_index("weekly", day(2024, 1, 8)))
+        self.assertEqual(period_index("monthly", day(2023, 12, 31)) + 1, period_index("monthly", day(2024, 1, 1)))
+        self.assertEqual(period_index("monthly", day(2024, 1, 31)) + 1, period_index("monthly", day(2024, 2, 29)))
+        self.assertEqual(period_index("monthly", day(2024, 2, 1)), period_index("monthly", day(2024, 2, 29)))
+        self.assertIsNone(period_index("yearly", day(2024, 1, 1)))
+        self.assertEqual([1, 3], list(period_indexes("every 3 days", [3, 4, 5, 9, 10])))
+        # Monday, Tuesday and Wednesday : Tuesday counts for Monday
+        monday = day(2024, 1, 8)
+        self.assertEqual(period_index("mon wed fri", monday), period_index("mon wed fri", monday + 1))
+        self.assertEqual(period_index("mon wed fri", monday) + 1, period_index("mon wed fri", monday + 2))
+        # Sunday counts for the Friday before it, the next Monday is the next period
+        self.assertEqual(period_index("mon wed fri", monday - 3), period_index("mon wed fri", monday - 1))
+        self.assertEqual(period_index("mon wed fri", monday - 1) + 1, period_index("mon wed fri", monday))
+
+    def test_monthly_streak_over_months_of_different_lengths(self) :
+        """Testing that a monthly streak continues from January to February to March,
+        even though the completions are 1 and 59 days apart."""
+        streak = Streak.from_day_numbers("monthly", [day(2024, 1, 31), day(2024, 2, 1), day(2024, 3, 31)])
+        self.assertEqual(3, streak.get_longest())
+        self.assertEqual(3, streak.get_current(datetime.date(2024, 3, 1)))
+        self.assertEqual(0, streak.get_current(datetime.date(2024, 4, 1)))
+        streak = Streak.from_day_numbers("monthly", [day(2024, 1, 1), day(2024, 3, 1)])
+        self.assertEqual(1, streak.get_longest())
+
+    def test_count_missed(self) :
+        """Testing the missed calendar weeks and months for fixed dates."""
+        # started on Sunday 2024-01-07, done in that week only, today is Monday 2024-01-15 : the week of the 8th was missed
+        periods = period_indexes("weekly", [day(2024, 1, 7)])
+        self.assertEqual(1, count_missed("weekly", day(2024, 1, 7), periods, day(2024, 1, 15)))
+        # started on 2024-01-31, done on 2024-03-01 and today (2024-05-31) : February and April were missed
+        periods = period_indexes("monthly", [day(2024, 3, 1), day(2024, 5, 31)])
+        self.assertEqual(3, count_missed("monthly", day(2024, 1, 31), periods, day(2024, 5, 31)))
+        # a completion before the start doesn't make up for a missed period
+        periods = period_indexes("daily", [day(2024, 1, 1), day(2024, 1, 11)])
+        self.assertEqual(1, count_missed("daily", day(2024, 1, 10), periods, day(2024, 1, 12)))
+        self.assertEqual(0, count_missed("daily", day(2024, 1, 13), periods, day(2024, 1, 12)))
+        self.assertEqual(0, count_missed("yearly", day(2024, 1, 1), None, day(2024, 1, 12)))
+
+    @patch('sys.stdout', new_callable = StringIO)
+    def test_same_statistics_everywhere(self, mock_stdout) :
+        """Testing that the analytics-class, NumpyAnalytics and the database calculate the same statistics
+        for random habits of every registered frequency and an unknown one."""
+        generator = random.Random(11)
+        today = datetime.date.today()
+        db = Database(":memory:")
+        self.addCleanup(db.close)
+        frequencies = list(FREQUENCIES) + ["yearly"]
+        for i in range(80) :
+            habit = Habit(f"Habit {i}", frequencies[i % len(frequencies)],
+                          today - datetime.timedelta(days = generator.randrange(-3, 200)))
+            db.save_habit(habit)
+            dates = [today - datetime.timedelta(days = generator.randrange(-2, 220))
+                     for _ in range(generator.choice([0, 2, 30, 120]))]
+            dates += [today - datetime.timedelta(days = n) for n in range(generator.randrange(0, 20))]
+            db.save_completions((habit.name, date) for date in dates)
+        habits = db.load_habit()
+        expected = Analytics(habits).get_statistics()
+        self.assertEqual(expected, NumpyAnalytics(habits).get_statistics())
+        in_database = db.get_statistics_in_database()
+        for habit in habits :
+            self.assertEqual({key : expected[habit.name][key] for key in ('current_streak', 'longest_streak', 'missed')},
+                             {key : in_database[habit.name][key] for key in ('current_streak', 'longest_streak', 'missed')},
+                             habit.name)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,95 @@
 """This class represents a user, with a username and habits."""
+from collections.abc import MutableSequence
+
+# The user of a database without a user name, and of all habits from before there were users (see the database-class)
+DEFAULT_USER = "default_user"
+
+class HabitList(MutableSequence) :
+    """A list of habits, which also keeps the habits in a dictionary by name and by frequency,
+    so finding a habit or the habits of one frequency doesn't have to go through the whole list.
+    It can be used like a normal list (looping, indexing, len, "in")."""
+    __slots__ = ('_habits', '_by_name', '_by_frequency')
+
+    def __init__(self, habits = ()) :
+        self._habits = [] # the habits, in the order they were added
+        self._by_name = {} # name -> {id(habit) : habit}, the first one is the first habit added with that name
+        self._by_frequency = {} # frequency -> {id(habit) : habit}, dictionaries keep the order of adding
+        for habit in habits :
+            self.append(habit)
+
+    def _add_to_index(self, habit) :
+        self._by_name.setdefault(habit.name, {})[id(habit)] = habit
+        self._by_frequency.setdefault(habit.frequency, {})[id(habit)] = habit
+
+    def _remove_from_index(self, habit) :
+        self._by_frequency.get(habit.frequency, {}).pop(id(habit), None)
+        # without scanning the list, if the same name was added twice, the next habit with that name takes its place
+        habits = self._by_name.get(habit.name)
+        if habits is not None :
+            habits.pop(id(habit), None)
+            if not habits :
+                del self._by_name[habit.name]
+
+    def get(self, name) :
+        """Returns the habit with this name, or None if there isn't one."""
+        habits = self._by_name.get(name)
+        return next(iter(habits.values())) if habits else None
+
+    def get_by_frequency(self, frequency) :
+        """Returns the habits with this frequency, in the order they were added."""
+        return list(self._by_frequency.get(frequency, {}).values())
+
+    def remove_by_name(self, name) :
+        """Removes all habits with this name, returns whether there was one."""
+        if name not in self._by_name :
+            return False
+        while name in self._by_name :
+            habit = self.get(name)
+            # "is" instead of "==", so exactly this habit is removed
+            index = next(i for i, h in enumerate(self._habits) if h is habit)
+            del self[index]
+        return True
+
+    def __getitem__(self, index) :
+        return self._habits[index]
+
+    def __setitem__(self, index, habit) :
+        del self[index]
+        self.insert(index, habit)
+
+    def __delitem__(self, index) :
+        removed = self._habits[index]
+        del self._habits[index]
+        for habit in (removed if isinstance(index, slice) else [removed]) :
+            self._remove_from_index(habit)
+
+    def __len__(self) :
+        return len(self._habits)
+
+    def __contains__(self, habit) :
+        return self._by_frequency.get(getattr(habit, 'frequency', None), {}).get(id(habit)) is habit
+
+    def __iter__(self) :
+        return iter(self._habits)
+
+    def insert(self, index, habit) :
+        self._habits.insert(index, habit)
+        self._add_to_index(habit)
+
+    def append(self, habit) :
+        self._habits.append(habit)
+        self._add_to_index(habit)
+
+    def __repr__(self) :
+        return f"HabitList({self._habits!r})"
+
 class User :
+    __slots__ = ('username', 'habits', '__weakref__')
 
     def __init__(self, username) :
         """Constructor to initialize a "user", "self" is referencing that "user"."""
         self.username = username # sets the username
-        self.habits = [] # an empty list to store habits or habit objects
+        self.habits = HabitList() # an empty list to store habits or habit objects, indexed by name and frequency
 
     def add_habit(self, habit) :
         """Method to add a new habit to the user's habit list."""
@@ -12,13 +97,10 @@ class User :
 
     def remove_habit(self, habit_name) :
         """Method to remove a habit from the user's habit list, using the habit name."""
-        # List comprehension, creating a new list filtering out the named habit
-        self.habits = [habit for habit in self.habits if habit.name != habit_name]
-
+        # The list itself is changed (instead of creating a new one),
+        # so e.g. the analytics-class, which uses the same list, doesn't keep the removed habit
+        self.habits.remove_by_name(habit_name)
 
     def get_habit_by_name(self, name) :
-        """Method to find a habit by its name, using a for-loop."""
-        for habit in self.habits :
-            if habit.name == name :
-                return habit
-        return None # If habit is not found
\ No newline at end of file
+        """Method to find a habit by its name, using the name index of the habit list."""
+        return self.habits.get(name) # None, if habit is not found